@@ -0,0 +1,344 @@
+"""
+Árvore B+ persistida em disco, com as páginas armazenadas como blocos de um arquivo txt e lidas sob demanda.
+Cada entrada é a chave (valor do campo, bloco, registro), de modo que valores repetidos formam entradas distintas.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+
+from Buffered_Reader import read_lines
+from External_Sort import external_sort, MEMORY_BUDGET
+from Header_Layout import Header_Layout, write_header
+from Record_Format import text_key
+from Util import interval_contains
+
+PAGE_SIZE = 4096
+CACHE_SIZE = 256
+
+# Pages built by the bulk load are left partially empty, so that the first insertions do not split them
+BULK_LOAD_FILL = 0.7
+
+LEAF = 'L'
+INTERNAL = 'I'
+
+class B_Plus_Tree_Node:
+    def __init__(self, leaf, keys, children=None, next_page=-1):
+        self.leaf = leaf
+        # Sorted keys of a leaf, or separator keys of an internal node
+        self.keys = keys
+        # Pages of the children of an internal node, one more than its keys
+        self.children = children if children != None else []
+        # Page of the next leaf, so that intervals are read without going back up the tree
+        self.next_page = next_page
+
+def entry_text(key):
+    return f'{key[0]},{key[1]},{key[2]}'
+
+def entry_key(entry, key_type):
+    # Values are fields of the csv records, so they never contain commas
+    value, block_id, record_id = entry.rsplit(',', 2)
+    return (text_key(field_type=key_type, value=value), int(block_id), int(record_id))
+
+def encode_node(node):
+    if node.leaf:
+        fields = [LEAF, str(node.next_page), str(len(node.keys))]
+        fields += [entry_text(key=key) for key in node.keys]
+    else:
+        fields = [INTERNAL, str(len(node.keys)), str(node.children[0])]
+        fields += [f'{entry_text(key=node.keys[i])},{node.children[i + 1]}' for i in range(len(node.keys))]
+    return ','.join(fields).encode()
+
+def decode_node(page, key_type):
+    # Values are fields of the csv records, so they never contain commas
+    fields = page.decode().rstrip().split(',')
+    if fields[0] == LEAF:
+        number_of_keys = int(fields[2])
+        keys = [
+            (text_key(field_type=key_type, value=fields[3 + 3 * i]), int(fields[4 + 3 * i]), int(fields[5 + 3 * i]))
+            for i in range(number_of_keys)
+        ]
+        return B_Plus_Tree_Node(leaf=True, keys=keys, next_page=int(fields[1]))
+    number_of_keys = int(fields[1])
+    keys = [
+        (text_key(field_type=key_type, value=fields[3 + 4 * i]), int(fields[4 + 4 * i]), int(fields[5 + 4 * i]))
+        for i in range(number_of_keys)
+    ]
+    children = [int(fields[2])] + [int(fields[6 + 4 * i]) for i in range(number_of_keys)]
+    return B_Plus_Tree_Node(leaf=False, keys=keys, children=children)
+
+class B_Plus_Tree:
+    def __init__(self, index_filepath, page_size=PAGE_SIZE, cache_size=CACHE_SIZE):
+        self.index_filepath = index_filepath
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.layout = None
+        self.file = None
+        # Decoded pages, the least recently used ones are written back and dropped when the cache is full
+        self.cache = OrderedDict()
+        self.dirty_pages = set()
+        self.accessed_pages = 0
+
+    def _write_header(self):
+        header = ''
+        header += self.index_filepath.split('/')[-1].split('.')[0] + '\n'
+        header += self.field_name + '\n'
+        header += self.key_type + '\n'
+        header += str(self.page_size) + '\n'
+        header += str(self.root_page) + '\n'
+        header += str(self.number_of_pages) + '\n'
+        header += str(self.number_of_entries) + '\n'
+        self.layout = write_header(txt_file=self.file, header=header, layout=self.layout, block_size=self.page_size)
+
+    def _read_header(self):
+        self.file.seek(0, 0)
+        header_lines = read_lines(file=self.file, number_of_lines=7)
+        self.field_name = header_lines[1].strip()
+        self.key_type = header_lines[2].strip()
+        self.page_size = int(header_lines[3].strip())
+        self.root_page = int(header_lines[4].strip())
+        self.number_of_pages = int(header_lines[5].strip())
+        self.number_of_entries = int(header_lines[6].strip())
+        self.layout = Header_Layout(header_lines=header_lines, block_size=self.page_size)
+
+    def open(self):
+        self.file = open(self.index_filepath, 'rb+')
+        self._read_header()
+
+    def flush(self):
+        for page_id in sorted(self.dirty_pages):
+            self._write_page(page_id=page_id, node=self.cache[page_id])
+        self.dirty_pages = set()
+        self._write_header()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        self.file = None
+        self.cache = OrderedDict()
+
+    def _write_page(self, page_id, node):
+        page = encode_node(node=node)
+        if len(page) > self.page_size:
+            raise Exception('IndexError: Page overflow.')
+        self.file.seek(self.layout.block_offset(block_id=page_id), 0)
+        self.file.write(page.ljust(self.page_size) + b'\n')
+
+    def _read_node(self, page_id):
+        if page_id in self.cache:
+            self.cache.move_to_end(page_id)
+            return self.cache[page_id]
+        self.accessed_pages += 1
+        self.file.seek(self.layout.block_offset(block_id=page_id), 0)
+        node = decode_node(page=self.file.read(self.page_size), key_type=self.key_type)
+        self._cache_node(page_id=page_id, node=node)
+        return node
+
+    def _cache_node(self, page_id, node):
+        self.cache[page_id] = node
+        self.cache.move_to_end(page_id)
+        while len(self.cache) > self.cache_size:
+            evicted_page_id, evicted_node = self.cache.popitem(last=False)
+            if evicted_page_id in self.dirty_pages:
+                self._write_page(page_id=evicted_page_id, node=evicted_node)
+                self.dirty_pages.remove(evicted_page_id)
+
+    def _mark_dirty(self, page_id, node):
+        self._cache_node(page_id=page_id, node=node)
+        self.dirty_pages.add(page_id)
+
+    def _new_page(self, node):
+        page_id = self.number_of_pages
+        self.number_of_pages += 1
+        self._mark_dirty(page_id=page_id, node=node)
+        return page_id
+
+    def _bulk_load(self, keys):
+        # Writes the tree bottom up from the sorted keys, one level at a time
+        self.file.seek(0, 0)
+        self.file.truncate()
+        self.layout = None
+        self.cache = OrderedDict()
+        self.dirty_pages = set()
+        self.root_page = 0
+        self.number_of_pages = 0
+        self.number_of_entries = 0
+        self._write_header()
+        fill = int(self.page_size * BULK_LOAD_FILL)
+        # Leaves, each one pointing to the next, are written as they are filled
+        level = []
+        node_keys = []
+        node_size = 0
+        for key in keys:
+            key_size = len(entry_text(key=key).encode()) + 1
+            if key_size > self.page_size // 4:
+                raise Exception(f'IndexError: Key Too Long: {key[0]}')
+            if node_keys != [] and node_size + key_size > fill:
+                level.append(self._write_leaf(keys=node_keys, next_page=self.number_of_pages + 1))
+                node_keys = []
+                node_size = 0
+            node_keys.append(key)
+            node_size += key_size
+            self.number_of_entries += 1
+        level.append(self._write_leaf(keys=node_keys, next_page=-1))
+        # Internal levels, until a single root is left
+        while len(level) > 1:
+            upper_level = []
+            children = [level[0]]
+            node_size = 0
+            for child in level[1:]:
+                child_size = len(entry_text(key=child[0]).encode()) + len(str(child[1])) + 2
+                if node_size + child_size > fill:
+                    upper_level.append(self._write_internal_node(children=children))
+                    children = []
+                    node_size = 0
+                else:
+                    node_size += child_size
+                children.append(child)
+            upper_level.append(self._write_internal_node(children=children))
+            level = upper_level
+        self.root_page = level[0][1]
+        self._write_header()
+        self.file.flush()
+
+    def _write_leaf(self, keys, next_page):
+        # The level above keeps the first key and the page of each leaf
+        page_id = self.number_of_pages
+        self._write_page(page_id=page_id, node=B_Plus_Tree_Node(leaf=True, keys=keys, next_page=next_page))
+        self.number_of_pages += 1
+        return (keys[0] if keys != [] else None, page_id)
+
+    def _write_internal_node(self, children):
+        # Separators are the first keys of every child but the first
+        node = B_Plus_Tree_Node(leaf=False, keys=[child[0] for child in children[1:]], children=[child[1] for child in children])
+        page_id = self.number_of_pages
+        self._write_page(page_id=page_id, node=node)
+        self.number_of_pages += 1
+        return (children[0][0], page_id)
+
+    def _sorted_keys(self, keys, memory_budget):
+        # Keys are sorted by an external sort, holding at most memory_budget bytes of them in memory,
+        # the runs that do not fit are written as entries
+        return external_sort(
+            records=keys, key=lambda key: key, memory_budget=memory_budget,
+            encode=lambda key: entry_text(key=key), decode=lambda entry: entry_key(entry=entry, key_type=self.key_type)
+        )
+
+    def create(self, field_name, key_type, keys, memory_budget=MEMORY_BUDGET):
+        # Creates the index file from the keys of every record, which may be yielded one at a time
+        self.field_name = field_name
+        self.key_type = key_type
+        self.file = open(self.index_filepath, 'wb+')
+        self._bulk_load(keys=self._sorted_keys(keys=keys, memory_budget=memory_budget))
+
+    def _entries(self):
+        # Every entry of the tree, following the leaves from the leftmost one
+        node = self._read_node(page_id=self.root_page)
+        while not node.leaf:
+            node = self._read_node(page_id=node.children[0])
+        while True:
+            for key in node.keys:
+                yield key
+            if node.next_page == -1:
+                break
+            node = self._read_node(page_id=node.next_page)
+
+    def remap(self, moves):
+        # Records moved by a reorganisation of the table, the tree is loaded again with their new positions,
+        # the entries are read before the bulk load truncates the file
+        keys = []
+        for (value, block_id, record_id) in self._entries():
+            new_block_id, new_record_id = moves.get((block_id, record_id), (block_id, record_id))
+            keys.append((value, new_block_id, new_record_id))
+        self._bulk_load(keys=sorted(keys))
+
+    def _node_size(self, node):
+        return len(encode_node(node=node))
+
+    def _split(self, page_id, node):
+        middle = len(node.keys) // 2
+        if node.leaf:
+            right_node = B_Plus_Tree_Node(leaf=True, keys=node.keys[middle:], next_page=node.next_page)
+            node.keys = node.keys[:middle]
+            right_page = self._new_page(node=right_node)
+            node.next_page = right_page
+            # The first key of the right leaf is copied up
+            separator = right_node.keys[0]
+        else:
+            right_node = B_Plus_Tree_Node(leaf=False, keys=node.keys[middle + 1:], children=node.children[middle + 1:])
+            # The middle key of an internal node is moved up
+            separator = node.keys[middle]
+            node.keys = node.keys[:middle]
+            node.children = node.children[:middle + 1]
+            right_page = self._new_page(node=right_node)
+        self._mark_dirty(page_id=page_id, node=node)
+        return separator, right_page
+
+    def _insert(self, page_id, key):
+        node = self._read_node(page_id=page_id)
+        if node.leaf:
+            insort(node.keys, key)
+        else:
+            child_id = bisect_right(node.keys, key)
+            split = self._insert(page_id=node.children[child_id], key=key)
+            if split == None:
+                return None
+            separator, right_page = split
+            node.keys.insert(child_id, separator)
+            node.children.insert(child_id + 1, right_page)
+        self._mark_dirty(page_id=page_id, node=node)
+        if self._node_size(node=node) <= self.page_size:
+            return None
+        return self._split(page_id=page_id, node=node)
+
+    def insert(self, key):
+        if len(entry_text(key=key).encode()) + 1 > self.page_size // 4:
+            raise Exception(f'IndexError: Key Too Long: {key[0]}')
+        split = self._insert(page_id=self.root_page, key=key)
+        # If the root was split, the tree grows one level
+        if split != None:
+            separator, right_page = split
+            root = B_Plus_Tree_Node(leaf=False, keys=[separator], children=[self.root_page, right_page])
+            self.root_page = self._new_page(node=root)
+        self.number_of_entries += 1
+
+    def _find_leaf(self, key):
+        page_id = self.root_page
+        node = self._read_node(page_id=page_id)
+        while not node.leaf:
+            page_id = node.children[bisect_right(node.keys, key)]
+            node = self._read_node(page_id=page_id)
+        return page_id, node
+
+    def delete(self, key):
+        # Entries are removed from their leaf without merging it with its siblings,
+        # emptied leaves stay linked and are skipped by the searches
+        page_id, node = self._find_leaf(key=key)
+        i = bisect_left(node.keys, key)
+        if i == len(node.keys) or node.keys[i] != key:
+            return False
+        node.keys.pop(i)
+        self._mark_dirty(page_id=page_id, node=node)
+        self.number_of_entries -= 1
+        return True
+
+    def search_interval(self, start_key, end_key, interval_type):
+        # The search starts at the leaf of the smallest entry with start_key, (start_key,) sorts before all of them
+        page_id, node = self._find_leaf(key=(start_key,))
+        i = bisect_left(node.keys, (start_key,))
+        while True:
+            while i < len(node.keys):
+                value, block_id, record_id = node.keys[i]
+                if value > end_key:
+                    return
+                if interval_contains(interval_type=interval_type, value=value, start=start_key, end=end_key):
+                    yield [block_id, record_id]
+                i += 1
+            if node.next_page == -1:
+                return
+            node = self._read_node(page_id=node.next_page)
+            i = 0
+
+    def search(self, key):
+        for (block_id, record_id) in self.search_interval(start_key=key, end_key=key, interval_type=None):
+            yield [block_id, record_id]
@@ -0,0 +1,634 @@
+"""
+Benchmarks de desempenho das organizações primárias de arquivos para o dataset Coffee Shop Sales.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from Buffered_Reader import Buffered_Reader
+from Fixed_Size_Heap_New import Fixed_Size_Heap
+from Variable_Size_Heap import Variable_Size_Heap
+from Ordered_File import Ordered_File
+from Static_External_Hash import Static_External_Hash
+from Extendible_Hash import Extendible_Hash
+from Table import Table
+from Record_Format import PAGE_FORMATS
+from Buffer_Pool import Buffer_Pool, NUMBER_OF_FRAMES, REPLACEMENT_POLICIES, LRU
+from Io_Metrics import COUNTERS
+from Hash_Functions import HASH_FUNCTIONS, INTEGER_HASH_FUNCTIONS
+
+FIELD_NAMES = [
+    'transaction_id', 'transaction_date', 'transaction_time', 'transaction_qty', 'store_id',
+    'store_location', 'product_id', 'unit_price', 'product_category', 'product_type', 'product_detail'
+]
+
+STORES = [(3, 'Astoria'), (5, 'Lower Manhattan'), (8, "Hell's Kitchen")]
+
+PRODUCTS = [
+    (32, '3.0', 'Coffee', 'Gourmet brewed coffee', 'Ethiopia Rg'),
+    (22, '2.0', 'Coffee', 'Drip coffee', 'Our Old Time Diner Blend Sm'),
+    (57, '3.1', 'Tea', 'Brewed Chai tea', 'Spicy Eye Opener Chai Lg'),
+    (41, '2.5', 'Tea', 'Brewed herbal tea', 'Peppermint Rg'),
+    (77, '3.0', 'Bakery', 'Scone', 'Oatmeal Scone'),
+    (69, '3.75', 'Bakery', 'Pastry', 'Chocolate Croissant'),
+    (50, '4.75', 'Drinking Chocolate', 'Hot chocolate', 'Dark chocolate Lg'),
+    (87, '0.8', 'Flavours', 'Regular syrup', 'Hazelnut syrup'),
+]
+
+ENGINES = {
+    'fixed_size_heap': Fixed_Size_Heap,
+    'variable_size_heap': Variable_Size_Heap,
+    'ordered_file': Ordered_File,
+    'static_external_hash': Static_External_Hash,
+    'extendible_hash': Extendible_Hash,
+}
+
+def generate_coffee_shop_csv(csv_filepath, number_of_records, seed=0):
+    # Writes a synthetic table with the same shape as the Coffee Shop Sales dataset
+    rng = random.Random(seed)
+    first_date = datetime(2023, 1, 1)
+    with open(csv_filepath, 'w') as csv_file:
+        csv_file.write(','.join(FIELD_NAMES) + '\n')
+        for transaction_id in range(1, number_of_records + 1):
+            date = first_date + timedelta(days=(transaction_id * 181) // number_of_records)
+            seconds = rng.randint(6 * 3600, 21 * 3600 - 1)
+            time_of_day = f'{seconds // 3600:02d}:{(seconds // 60) % 60:02d}:{seconds % 60:02d}'
+            store_id, store_location = rng.choice(STORES)
+            product_id, unit_price, category, product_type, detail = rng.choice(PRODUCTS)
+            csv_file.write(
+                f'{transaction_id},{date.strftime("%Y-%m-%d")},{time_of_day},{rng.randint(1, 4)},'
+                f'{store_id},{store_location},{product_id},{unit_price},{category},{product_type},{detail}\n'
+            )
+
+def _legacy_read_line(file):
+    # Per-character reader the engines used before the buffered reader
+    char = file.read(1)
+    line = ''
+    while char and char != '\n':
+        line += char
+        char = file.read(1)
+    return line
+
+def _time_call(function):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function()
+    return time.perf_counter() - start, result
+
+def _read_csv_legacy(csv_filepath):
+    number_of_rows = 0
+    with open(csv_filepath, 'r') as csv_file:
+        _legacy_read_line(csv_file)
+        while _legacy_read_line(csv_file) != '':
+            number_of_rows += 1
+    return number_of_rows
+
+def _read_csv_buffered(csv_filepath):
+    number_of_rows = 0
+    with Buffered_Reader(filepath=csv_filepath) as csv_file:
+        csv_file.read_line()
+        for record in csv_file.read_records():
+            number_of_rows += 1
+    return number_of_rows
+
+def _percentile(sorted_values, percentile):
+    index = min(len(sorted_values) - 1, int(round(percentile / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _latency_summary(latencies):
+    sorted_latencies = sorted(latencies)
+    return {
+        'mean_ms': 1000 * sum(sorted_latencies) / len(sorted_latencies),
+        'p50_ms': 1000 * _percentile(sorted_latencies, 50),
+        'p95_ms': 1000 * _percentile(sorted_latencies, 95),
+        'p99_ms': 1000 * _percentile(sorted_latencies, 99),
+    }
+
+def _time_lookups(select_function, keys):
+    latencies = []
+    for key in keys:
+        elapsed, _ = _time_call(lambda: select_function(key))
+        latencies.append(elapsed)
+    return latencies
+
+def _bytes_written():
+    # Bytes written by the process through write system calls, as counted by Linux
+    with open('/proc/self/io', 'r') as io_file:
+        for line in io_file:
+            if line.startswith('wchar:'):
+                return int(line.split()[1])
+
+def _table_size(txt_filepath):
+    table_size = os.path.getsize(txt_filepath)
+    # Extension file of the ordered file and directory of the extendible hash
+    for filepath in [txt_filepath[:-4] + '_Ext.txt', txt_filepath[:-4] + '_Directory.txt']:
+        if os.path.exists(filepath):
+            table_size += os.path.getsize(filepath)
+    return table_size
+
+def benchmark_ingest(csv_filepath, block_size, engines):
+    results = []
+    # Raw csv reading throughput, before (per-character) and after (buffered)
+    for reader_name, reader in [('legacy_read_line', _read_csv_legacy), ('buffered_reader', _read_csv_buffered)]:
+        elapsed, number_of_rows = _time_call(lambda: reader(csv_filepath))
+        results.append((reader_name, number_of_rows, elapsed))
+    # End-to-end load of the csv through each engine
+    for engine_name in engines:
+        engine = ENGINES[engine_name](block_size=block_size)
+        elapsed, _ = _time_call(lambda: engine.from_csv_to_txt(csv_filepath=csv_filepath))
+        results.append((f'{engine_name}.from_csv_to_txt', number_of_rows, elapsed))
+    for name, number_of_rows, elapsed in results:
+        print(f'{name:45s} {number_of_rows:>10d} rows {elapsed:>9.3f} s {number_of_rows / elapsed:>12.0f} rows/s')
+    return results
+
+def benchmark_heap_load(csv_filepath, block_size):
+    # Fixed_Size_Heap load throughput, inferring the schema with a pass over the csv or with the schema declared
+    txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+    results = []
+    schema = None
+    for page_format in PAGE_FORMATS:
+        for schema_name in ['inferred_schema', 'declared_schema']:
+            engine = Fixed_Size_Heap(block_size=block_size)
+            engine.from_csv_to_txt(csv_filepath=csv_filepath, page_format=page_format, schema=schema if schema_name == 'declared_schema' else None)
+            schema = engine.schema
+            stats = engine.last_operation_stats
+            file_size = os.path.getsize(txt_filepath)
+            results.append((page_format, schema_name, engine.number_of_records, stats.wall_time, file_size))
+            print(f'{page_format:8s} {schema_name:16s} {engine.number_of_records:>10d} rows {stats.wall_time:>9.3f} s {engine.number_of_records / stats.wall_time:>10.0f} rows/s  '
+                  f'{file_size / stats.wall_time / 2 ** 20:>8.1f} MiB/s written  block writes {stats.block_writes:>9d}')
+    return results
+
+def benchmark_hash_lookup(csv_filepath, block_size, number_of_lookups, number_of_records):
+    txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+    rng = random.Random(1)
+    keys = [str(rng.randint(1, number_of_records)) for i in range(0, number_of_lookups)]
+    results = []
+    # Compressed mode, decompressing and deleting the txt file on every lookup
+    engine = Static_External_Hash(block_size=block_size, compressed=True)
+    engine.from_csv_to_txt(csv_filepath=csv_filepath)
+    select_function = lambda key: engine.select_by_single_primary_key(txt_filepath=txt_filepath, key=key)
+    results.append(('compressed', _time_lookups(select_function=select_function, keys=keys)))
+    # Uncompressed working mode, seeking directly into the txt file
+    engine = Static_External_Hash(block_size=block_size)
+    engine.from_csv_to_txt(csv_filepath=csv_filepath)
+    select_function = lambda key: engine.select_by_single_primary_key(txt_filepath=txt_filepath, key=key)
+    results.append(('uncompressed', _time_lookups(select_function=select_function, keys=keys)))
+    # Uncompressed working mode through an open table
+    with Table.open(txt_filepath=txt_filepath, engine=engine) as table:
+        results.append(('uncompressed_open_table', _time_lookups(select_function=table.select_by_single_primary_key, keys=keys)))
+    for mode, latencies in results:
+        summary = _latency_summary(latencies)
+        print(f'{mode:25s} {len(latencies):>7d} lookups  mean {summary["mean_ms"]:>9.3f} ms  '
+              f'p50 {summary["p50_ms"]:>9.3f} ms  p99 {summary["p99_ms"]:>9.3f} ms')
+    return results
+
+def benchmark_hash_growth(csv_filepath, block_size, number_of_records, growth, number_of_lookups):
+    # The table grows by batches of inserts, and the blocks read by primary key lookups are measured after each batch,
+    # the inserted keys keep the number of digits of the loaded keys, so that they fit in the primary key field
+    txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+    final_number_of_records = min(growth * number_of_records, 10 ** len(str(number_of_records)) - 1)
+    batch_size = max(1, number_of_records // 2)
+    results = []
+    for engine_name in ['static_external_hash', 'extendible_hash']:
+        rng = random.Random(4)
+        engine = ENGINES[engine_name](block_size=block_size)
+        _time_call(lambda: engine.from_csv_to_txt(csv_filepath=csv_filepath))
+        number_of_rows = number_of_records
+        with Table.open(txt_filepath=txt_filepath, engine=engine) as table:
+            while True:
+                latencies = []
+                logical_reads = []
+                for key in rng.sample(range(1, number_of_rows + 1), min(number_of_lookups, number_of_rows)):
+                    elapsed, _ = _time_call(lambda: table.select_by_single_primary_key(key=str(key)))
+                    latencies.append(elapsed)
+                    logical_reads.append(engine.last_operation_stats.logical_reads)
+                summary = _latency_summary(latencies)
+                results.append((engine_name, number_of_rows, sum(logical_reads) / len(logical_reads), max(logical_reads), summary))
+                print(f'{engine_name:22s} {number_of_rows:>10d} rows  blocks per lookup mean {sum(logical_reads) / len(logical_reads):>8.2f} '
+                      f'max {max(logical_reads):>6d}  mean {summary["mean_ms"]:>9.3f} ms  p99 {summary["p99_ms"]:>9.3f} ms')
+                if number_of_rows >= final_number_of_records:
+                    break
+                records = [f'{key},2023-01-01,07:06:11,2,5,Lower Manhattan,32,3.0,Coffee,Gourmet brewed coffee,Ethiopia Rg,'
+                           for key in range(number_of_rows + 1, min(number_of_rows + batch_size, final_number_of_records) + 1)]
+                try:
+                    _time_call(lambda: table.insert_multiple_records(records=records))
+                except Exception as exception:
+                    # The static hash stops growing once its overflow buckets are full
+                    print(f'{engine_name:22s} {number_of_rows:>10d} rows  {exception}')
+                    break
+                number_of_rows += len(records)
+    return results
+
+def benchmark_hash_load(csv_filepath, block_size, hash_functions):
+    # Static_External_Hash built from the csv by partitioning the records by bucket, and by inserting them one at a time
+    results = []
+    for hash_function in hash_functions:
+        for load_name, bulk_load in [('bulk', True), ('record_at_a_time', False)]:
+            engine = Static_External_Hash(block_size=block_size)
+            engine.from_csv_to_txt(csv_filepath=csv_filepath, hash_function=hash_function, bulk_load=bulk_load)
+            stats = engine.last_operation_stats
+            number_of_rows = engine.number_of_records
+            results.append((hash_function, load_name, number_of_rows, stats))
+            print(f'{hash_function:15s} {load_name:17s} {number_of_rows:>10d} rows {stats.wall_time:>9.3f} s {number_of_rows / stats.wall_time:>10.0f} rows/s  '
+                  f'block writes {stats.block_writes:>9d}  bytes written {stats.bytes_written:>11d}  seeks {stats.seeks:>7d}  physical reads {stats.physical_reads:>8d}')
+    return results
+
+# Primary keys of the hash function benchmark: sequential, in bursts of 100 consecutive ids every 10000, and text
+KEY_SHAPES = {
+    'sequential': lambda transaction_id: str(transaction_id),
+    'bursty': lambda transaction_id: str((transaction_id // 100) * 10000 + transaction_id % 100),
+    'text': lambda transaction_id: f'T{transaction_id:08d}',
+}
+
+def benchmark_hash_functions(csv_filepath, block_size, hash_functions):
+    results = []
+    for key_shape in KEY_SHAPES:
+        key_shape_csv_filepath = csv_filepath[:-4] + '_' + key_shape.capitalize() + '.csv'
+        with Buffered_Reader(filepath=csv_filepath) as csv_file, open(key_shape_csv_filepath, 'w') as key_shape_csv_file:
+            key_shape_csv_file.write(csv_file.read_line() + '\n')
+            for record in csv_file.read_records():
+                transaction_id, fields = record.split(',', 1)
+                key_shape_csv_file.write(f'{KEY_SHAPES[key_shape](int(transaction_id))},{fields}\n')
+        key_shape_txt_filepath = '.' + key_shape_csv_filepath.split('.')[1] + '.txt'
+        for hash_function in hash_functions:
+            # Text keys can only be hashed by their text
+            if key_shape == 'text' and hash_function in INTEGER_HASH_FUNCTIONS:
+                continue
+            engine = Static_External_Hash(block_size=block_size)
+            build_elapsed, _ = _time_call(lambda: engine.from_csv_to_txt(csv_filepath=key_shape_csv_filepath, hash_function=hash_function))
+            diagnostics = engine.hash_diagnostics(txt_filepath=key_shape_txt_filepath)
+            results.append((key_shape, hash_function, build_elapsed, diagnostics))
+            print(f'{key_shape:10s} {hash_function:15s} build {build_elapsed:>8.3f} s  load factor {diagnostics["load_factor"]:>5.2f}  '
+                  f'overflow records {diagnostics["overflow_records"]:>8d}  max chain {diagnostics["max_chain_length"]:>3d}  '
+                  f'probes hit {diagnostics["expected_successful_probes"]:>6.3f} miss {diagnostics["expected_unsuccessful_probes"]:>6.3f}')
+        os.remove(key_shape_csv_filepath)
+    return results
+
+def benchmark_hash_diagnostics(txt_filepath, block_size):
+    # Diagnostics of an existing Static_External_Hash table
+    engine = Static_External_Hash(block_size=block_size)
+    diagnostics = engine.hash_diagnostics(txt_filepath=txt_filepath)
+    print(json.dumps(diagnostics, indent=2))
+    return diagnostics
+
+def benchmark_page_format(csv_filepath, block_size, number_of_scans):
+    txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+    results = []
+    for page_format in PAGE_FORMATS:
+        engine = Fixed_Size_Heap(block_size=block_size)
+        engine.from_csv_to_txt(csv_filepath=csv_filepath, page_format=page_format)
+        file_size = os.path.getsize(txt_filepath)
+        # Full scans by a string, an integer and a date field
+        scans = [('product_detail', 'Hazelnut syrup'), ('transaction_id', '1'), ('transaction_date', '2023-03-01')]
+        latencies = []
+        for i in range(0, number_of_scans):
+            field, value = scans[i % len(scans)]
+            elapsed, _ = _time_call(lambda: engine.select_by_single_field_value(txt_filepath=txt_filepath, field=field, value=value))
+            latencies.append(elapsed)
+        summary = _latency_summary(latencies)
+        results.append((page_format, file_size, engine.record_size, engine.blocking_factor, summary))
+        print(f'{page_format:10s} {file_size:>12d} bytes  record {engine.record_size:>4d} bytes  '
+              f'blocking factor {engine.blocking_factor:>3d}  scan mean {summary["mean_ms"]:>9.3f} ms')
+    return results
+
+def benchmark_interval(csv_filepath, block_size, engines):
+    txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+    intervals = [
+        ('transaction_time', '12:00:00', '12:59:59'),
+        ('transaction_time', '06:00:00', '20:59:59'),
+        ('transaction_date', '2023-03-01', '2023-03-07'),
+        ('transaction_id', '1000', '2000'),
+    ]
+    results = []
+    for engine_name in engines:
+        engine = ENGINES[engine_name](block_size=block_size)
+        _time_call(lambda: engine.from_csv_to_txt(csv_filepath=csv_filepath))
+        for field, start, end in intervals:
+            elapsed, select_container = _time_call(lambda: engine.select_by_field_interval(txt_filepath=txt_filepath, field=field, start=start, end=end))
+            results.append((engine_name, field, start, end, len(select_container), elapsed))
+            print(f'{engine_name:22s} {field:18s} [{start}, {end}] {len(select_container):>9d} records {1000 * elapsed:>10.3f} ms')
+    return results
+
+def benchmark_secondary_index(csv_filepath, block_size, engines):
+    txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+    lookups = [('product_category', 'Flavours'), ('store_id', '3'), ('transaction_date', '2023-03-01')]
+    results = []
+    for engine_name in engines:
+        engine = ENGINES[engine_name](block_size=block_size)
+        _time_call(lambda: engine.from_csv_to_txt(csv_filepath=csv_filepath))
+        for field, value in lookups:
+            scan_elapsed, select_container = _time_call(lambda: engine.select_by_single_field_value(txt_filepath=txt_filepath, field=field, value=value))
+            create_elapsed, _ = _time_call(lambda: engine.create_index(txt_filepath=txt_filepath, field=field))
+            index_elapsed, _ = _time_call(lambda: engine.select_by_single_field_value(txt_filepath=txt_filepath, field=field, value=value))
+            results.append((engine_name, field, len(select_container), scan_elapsed, create_elapsed, index_elapsed))
+            print(f'{engine_name:22s} {field:18s} {len(select_container):>9d} records  scan {1000 * scan_elapsed:>10.3f} ms  '
+                  f'create index {1000 * create_elapsed:>10.3f} ms  index {1000 * index_elapsed:>10.3f} ms')
+        for field, value in lookups:
+            engine.drop_index(txt_filepath=txt_filepath, field=field)
+    return results
+
+def benchmark_external_sort(csv_filepath, block_size, memory_budgets, number_of_records):
+    # The primary keys are permuted (1000003 is prime), so that building the ordered file has to sort the csv
+    shuffled_csv_filepath = csv_filepath[:-4] + '_Shuffled.csv'
+    with Buffered_Reader(filepath=csv_filepath) as csv_file, open(shuffled_csv_filepath, 'w') as shuffled_csv_file:
+        shuffled_csv_file.write(csv_file.read_line() + '\n')
+        for record in csv_file.read_records():
+            transaction_id, fields = record.split(',', 1)
+            shuffled_csv_file.write(f'{(int(transaction_id) * 1000003) % number_of_records + 1},{fields}\n')
+    shuffled_txt_filepath = '.' + shuffled_csv_filepath.split('.')[1] + '.txt'
+    keys = random.Random(2).sample(range(1, number_of_records + 1), 50)
+    results = []
+    for memory_budget in memory_budgets:
+        engine = Ordered_File(block_size=block_size, memory_budget=memory_budget)
+        build_elapsed, _ = _time_call(lambda: engine.from_csv_to_txt(csv_filepath=shuffled_csv_filepath))
+        # The table is kept open, so that only the 50th deletion, which reorganises the whole table, writes it back
+        engine.open_table(txt_filepath=shuffled_txt_filepath)
+        for key in keys[:-1]:
+            _time_call(lambda: engine.delete_record_by_primary_key(txt_filepath=shuffled_txt_filepath, key=str(key)))
+        reordering_elapsed, _ = _time_call(lambda: (engine.delete_record_by_primary_key(txt_filepath=shuffled_txt_filepath, key=str(keys[-1])), engine.close_table()))
+        results.append((memory_budget, number_of_records, build_elapsed, reordering_elapsed))
+        print(f'memory budget {memory_budget / 2 ** 20:>8.1f} MiB {number_of_records:>10d} rows  '
+              f'build {build_elapsed:>9.3f} s {number_of_records / build_elapsed:>10.0f} rows/s  reordering {reordering_elapsed:>9.3f} s')
+    return results
+
+def benchmark_mutation_io(csv_filepath, block_size, engines, number_of_mutations, number_of_records):
+    txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+    rng = random.Random(3)
+    results = []
+    for engine_name in engines:
+        engine = ENGINES[engine_name](block_size=block_size)
+        _time_call(lambda: engine.from_csv_to_txt(csv_filepath=csv_filepath))
+        table_size = _table_size(txt_filepath=txt_filepath)
+        # Fewer than 50 deletions, so that no reorganisation of the table is triggered
+        inserted_bytes = []
+        deleted_bytes = []
+        for k in range(0, number_of_mutations):
+            record = f'{number_of_records + k + 1},2023-01-01,07:06:11,2,5,Lower Manhattan,32,3.0,Coffee,Gourmet brewed coffee,Ethiopia Rg,'
+            bytes_written = _bytes_written()
+            _time_call(lambda: engine.insert_single_record(txt_filepath=txt_filepath, record=record))
+            inserted_bytes.append(_bytes_written() - bytes_written)
+            key = str(rng.randint(1, number_of_records))
+            bytes_written = _bytes_written()
+            try:
+                _time_call(lambda: engine.delete_record_by_primary_key(txt_filepath=txt_filepath, key=key))
+            except Exception:
+                # The key was already deleted
+                continue
+            deleted_bytes.append(_bytes_written() - bytes_written)
+        results.append((engine_name, table_size, sum(inserted_bytes) / len(inserted_bytes), sum(deleted_bytes) / len(deleted_bytes)))
+        print(f'{engine_name:22s} table {table_size:>12d} bytes  insert {sum(inserted_bytes) / len(inserted_bytes):>12.0f} bytes  '
+              f'delete {sum(deleted_bytes) / len(deleted_bytes):>12.0f} bytes')
+    return results
+
+def benchmark_buffer_pool(csv_filepath, block_size, engines, number_of_selects, number_of_frames, replacement_policy):
+    txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+    # Repeated selections of the most popular products
+    product_ids = [str(PRODUCTS[i][0]) for i in range(0, 3)]
+    results = []
+    for engine_name in engines:
+        buffer_pool = Buffer_Pool(number_of_frames=number_of_frames, replacement_policy=replacement_policy)
+        engine = ENGINES[engine_name](block_size=block_size, buffer_pool=buffer_pool)
+        _time_call(lambda: engine.from_csv_to_txt(csv_filepath=csv_filepath))
+        buffer_pool.reset_stats()
+        cold_elapsed, _ = _time_call(lambda: engine.select_by_single_field_value(txt_filepath=txt_filepath, field='product_id', value=product_ids[0]))
+        cold_misses = buffer_pool.misses
+        buffer_pool.reset_stats()
+        latencies = _time_lookups(select_function=lambda product_id: engine.select_by_single_field_value(txt_filepath=txt_filepath, field='product_id', value=product_id),
+                                  keys=[product_ids[i % len(product_ids)] for i in range(0, number_of_selects)])
+        summary = _latency_summary(latencies)
+        stats = buffer_pool.stats()
+        hit_ratio = stats['hits'] / max(1, stats['hits'] + stats['misses'])
+        results.append((engine_name, cold_misses, cold_elapsed, stats, summary))
+        print(f'{engine_name:22s} cold {cold_misses:>8d} misses {1000 * cold_elapsed:>10.3f} ms  warm {stats["misses"]:>8d} misses  '
+              f'hit ratio {hit_ratio:>6.3f}  evictions {stats["evictions"]:>8d}  mean {summary["mean_ms"]:>10.3f} ms')
+    return results
+
+def _workload(number_of_records, number_of_operations, batch_size, seed):
+    # Operations of the workload mix, in the order they are run, as (name, rows written or requested by it, call)
+    rng = random.Random(seed)
+    first_date = datetime(2023, 1, 1)
+    random_date = lambda: (first_date + timedelta(days=rng.randint(0, 180))).strftime('%Y-%m-%d')
+    steps = []
+    for i in range(0, number_of_operations):
+        key = str(rng.randint(1, number_of_records))
+        steps.append(('pk_select', 1, lambda table, key=key: table.select_by_single_primary_key(key=key)))
+    for i in range(0, number_of_operations):
+        keys = [str(rng.randint(1, number_of_records)) for j in range(0, 10)]
+        steps.append(('multi_key_select', len(keys), lambda table, keys=keys: table.select_by_multiple_primary_key(keys=keys)))
+    for i in range(0, number_of_operations):
+        # A week of transactions, intervals must have a start before their end
+        start = first_date + timedelta(days=rng.randint(0, 174))
+        start, end = start.strftime('%Y-%m-%d'), (start + timedelta(days=6)).strftime('%Y-%m-%d')
+        steps.append(('interval_select_date', 0, lambda table, start=start, end=end: table.select_by_field_interval(field='transaction_date', start=start, end=end)))
+    for i in range(0, number_of_operations):
+        hour = rng.randint(6, 20)
+        start, end = f'{hour:02d}:00:00', f'{hour:02d}:09:59'
+        steps.append(('interval_select_time', 0, lambda table, start=start, end=end: table.select_by_field_interval(field='transaction_time', start=start, end=end)))
+    for i in range(0, number_of_operations):
+        detail = rng.choice(PRODUCTS)[4]
+        steps.append(('field_value_select', 0, lambda table, detail=detail: table.select_by_single_field_value(field='product_detail', value=detail)))
+    records = [f'{number_of_records + k + 1},2023-01-01,07:06:11,2,5,Lower Manhattan,32,3.0,Coffee,Gourmet brewed coffee,Ethiopia Rg,' for k in range(0, batch_size)]
+    steps.append(('bulk_insert', len(records), lambda table: table.insert_multiple_records(records=records)))
+    for key in rng.sample(range(1, number_of_records + 1), min(number_of_operations, number_of_records)):
+        steps.append(('pk_delete', 1, lambda table, key=str(key): table.delete_record_by_primary_key(key=key)))
+    # Each criterion deletes the records of one day
+    for date in sorted(set(random_date() for i in range(0, 3))):
+        steps.append(('criterion_delete', 0, lambda table, date=date: table.delete_record_by_criterion(field='transaction_date', value=date)))
+    return steps
+
+def _workload_result(engine_name, number_of_records, block_size, operation, operations, number_of_rows, file_size):
+    # Latencies and block I/O of the runs of an operation of the workload
+    latencies = [stats.wall_time for stats in operations]
+    wall_time = sum(latencies)
+    result = {
+        'engine': engine_name,
+        'rows': number_of_records,
+        'block_size': block_size,
+        'operation': operation,
+        'count': len(operations),
+        'latency': _latency_summary(latencies),
+        'throughput_ops_per_s': len(operations) / wall_time if wall_time > 0 else None,
+        'throughput_rows_per_s': number_of_rows / wall_time if wall_time > 0 and number_of_rows > 0 else None,
+        'io': dict((counter, sum(getattr(stats, counter) for stats in operations)) for counter in COUNTERS),
+        'file_size_bytes': file_size,
+    }
+    return result
+
+def benchmark_workload(scales, block_sizes, engines, number_of_operations, batch_size, report_filepath):
+    results = []
+    for number_of_records in scales:
+        csv_filepath = f'./dataset/Workload_{number_of_records}.csv'
+        txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+        generate_coffee_shop_csv(csv_filepath=csv_filepath, number_of_records=number_of_records)
+        for block_size in block_sizes:
+            for engine_name in engines:
+                # Each run has its own buffer pool, so that no block is cached by a previous run
+                engine = ENGINES[engine_name](block_size=block_size, buffer_pool=Buffer_Pool())
+                _time_call(lambda: engine.from_csv_to_txt(csv_filepath=csv_filepath))
+                file_size = _table_size(txt_filepath=txt_filepath)
+                results.append(_workload_result(engine_name=engine_name, number_of_records=number_of_records, block_size=block_size, operation='bulk_load',
+                                                operations=[engine.last_operation_stats], number_of_rows=number_of_records, file_size=file_size))
+                table = Table(engine=engine, txt_filepath=txt_filepath)
+                # Statistics and rows of the runs of each operation, in the order of the workload
+                operations = dict()
+                number_of_rows = dict()
+                for operation, rows, step in _workload(number_of_records=number_of_records, number_of_operations=number_of_operations, batch_size=batch_size, seed=number_of_records):
+                    try:
+                        _time_call(lambda: step(table))
+                    except Exception:
+                        # Keys already deleted and empty selections are part of the workload
+                        pass
+                    operations.setdefault(operation, []).append(engine.last_operation_stats)
+                    number_of_rows[operation] = number_of_rows.get(operation, 0) + rows
+                file_size = _table_size(txt_filepath=txt_filepath)
+                for operation in operations:
+                    results.append(_workload_result(engine_name=engine_name, number_of_records=number_of_records, block_size=block_size, operation=operation,
+                                                    operations=operations[operation], number_of_rows=number_of_rows[operation], file_size=file_size))
+                for result in results[-len(operations) - 1:]:
+                    print(f'{engine_name:22s} {number_of_records:>9d} rows {block_size:>6d} B  {result["operation"]:30s} {result["count"]:>5d} ops  '
+                          f'p50 {result["latency"]["p50_ms"]:>10.3f} ms  p99 {result["latency"]["p99_ms"]:>10.3f} ms  '
+                          f'{result["io"]["logical_reads"]:>10d} logical  {result["io"]["physical_reads"]:>9d} physical  {result["io"]["block_writes"]:>8d} written')
+        # The csv and every file of the tables built from it (txt, extension, fence, index and compressed files)
+        for filepath in glob.glob(f'./dataset/Workload_{number_of_records}.*') + glob.glob(f'./dataset/Workload_{number_of_records}_*'):
+            os.remove(filepath)
+    report = {
+        'benchmark': 'workload',
+        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'scales': scales,
+        'block_sizes': block_sizes,
+        'engines': engines,
+        'operations': number_of_operations,
+        'batch_size': batch_size,
+        'results': results,
+    }
+    with open(report_filepath, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Coffee Shop Sales benchmarks.')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='csv ingest throughput in rows per second')
+    ingest_parser.add_argument('--rows', type=int, default=100000)
+    ingest_parser.add_argument('--block-size', type=int, default=512)
+    ingest_parser.add_argument('--engines', nargs='*', default=list(ENGINES), choices=list(ENGINES))
+
+    heap_load_parser = subparsers.add_parser('heap_load', help='Fixed_Size_Heap load throughput, with inferred and declared schemas, text and binary pages')
+    heap_load_parser.add_argument('--rows', type=int, default=1000000)
+    heap_load_parser.add_argument('--block-size', type=int, default=4096)
+
+    hash_lookup_parser = subparsers.add_parser('hash_lookup', help='Static_External_Hash point lookup latency, compressed and uncompressed')
+    hash_lookup_parser.add_argument('--rows', type=int, default=100000)
+    hash_lookup_parser.add_argument('--block-size', type=int, default=512)
+    hash_lookup_parser.add_argument('--lookups', type=int, default=200)
+
+    hash_growth_parser = subparsers.add_parser('hash_growth', help='blocks read by primary key lookups as the static and extendible hashes grow by inserts')
+    hash_growth_parser.add_argument('--rows', type=int, default=100000)
+    hash_growth_parser.add_argument('--block-size', type=int, default=512)
+    hash_growth_parser.add_argument('--growth', type=int, default=9, help='final size of the table, in multiples of the loaded size')
+    hash_growth_parser.add_argument('--lookups', type=int, default=200)
+
+    hash_functions_parser = subparsers.add_parser('hash_functions', help='Static_External_Hash bucket fill and probe cost of each hash function on sequential, bursty and text keys')
+    hash_functions_parser.add_argument('--rows', type=int, default=100000)
+    hash_functions_parser.add_argument('--block-size', type=int, default=512)
+    hash_functions_parser.add_argument('--hash-functions', nargs='*', default=HASH_FUNCTIONS, choices=HASH_FUNCTIONS)
+
+    hash_load_parser = subparsers.add_parser('hash_load', help='Static_External_Hash build time and writes, bulk load against inserting one record at a time')
+    hash_load_parser.add_argument('--rows', type=int, default=100000)
+    hash_load_parser.add_argument('--block-size', type=int, default=512)
+    hash_load_parser.add_argument('--hash-functions', nargs='*', default=INTEGER_HASH_FUNCTIONS, choices=INTEGER_HASH_FUNCTIONS)
+
+    hash_diagnostics_parser = subparsers.add_parser('hash_diagnostics', help='bucket fill histogram, overflow usage and expected probe cost of a Static_External_Hash table')
+    hash_diagnostics_parser.add_argument('--table', required=True, help='txt file of the table')
+    hash_diagnostics_parser.add_argument('--block-size', type=int, default=512)
+
+    page_format_parser = subparsers.add_parser('page_format', help='Fixed_Size_Heap file size and scan time, text and binary pages')
+    page_format_parser.add_argument('--rows', type=int, default=100000)
+    page_format_parser.add_argument('--block-size', type=int, default=512)
+    page_format_parser.add_argument('--scans', type=int, default=9)
+
+    interval_parser = subparsers.add_parser('interval', help='select_by_field_interval latency on time, date and primary key intervals')
+    interval_parser.add_argument('--rows', type=int, default=100000)
+    interval_parser.add_argument('--block-size', type=int, default=512)
+    interval_parser.add_argument('--engines', nargs='*', default=list(ENGINES), choices=list(ENGINES))
+
+    secondary_index_parser = subparsers.add_parser('secondary_index', help='select_by_single_field_value latency with and without a secondary index')
+    secondary_index_parser.add_argument('--rows', type=int, default=100000)
+    secondary_index_parser.add_argument('--block-size', type=int, default=512)
+    secondary_index_parser.add_argument('--engines', nargs='*', default=list(ENGINES), choices=list(ENGINES))
+
+    external_sort_parser = subparsers.add_parser('external_sort', help='Ordered_File build and reordering time under several external sort memory budgets')
+    external_sort_parser.add_argument('--rows', type=int, default=1000000, help='1000000 and 10000000 are the reference sizes')
+    external_sort_parser.add_argument('--block-size', type=int, default=512)
+    external_sort_parser.add_argument('--memory-budgets', nargs='*', type=int, default=[2 ** 20, 16 * 2 ** 20, 256 * 2 ** 20], help='bytes')
+
+    mutation_io_parser = subparsers.add_parser('mutation_io', help='bytes written by each single row insert and delete (Linux only)')
+    mutation_io_parser.add_argument('--rows', type=int, default=100000)
+    mutation_io_parser.add_argument('--block-size', type=int, default=512)
+    mutation_io_parser.add_argument('--mutations', type=int, default=20)
+    mutation_io_parser.add_argument('--engines', nargs='*', default=list(ENGINES), choices=list(ENGINES))
+
+    buffer_pool_parser = subparsers.add_parser('buffer_pool', help='buffer pool hits and misses of repeated selections of popular product_ids')
+    buffer_pool_parser.add_argument('--rows', type=int, default=10000)
+    buffer_pool_parser.add_argument('--block-size', type=int, default=512)
+    buffer_pool_parser.add_argument('--selects', type=int, default=30)
+    buffer_pool_parser.add_argument('--frames', type=int, default=NUMBER_OF_FRAMES)
+    buffer_pool_parser.add_argument('--policy', default=LRU, choices=REPLACEMENT_POLICIES)
+    buffer_pool_parser.add_argument('--engines', nargs='*', default=list(ENGINES), choices=list(ENGINES))
+
+    workload_parser = subparsers.add_parser('workload', help='workload mix on every engine, scale and block size, reported as json')
+    workload_parser.add_argument('--rows', nargs='*', type=int, default=[100000], help='scales, from 100000 to 10000000 rows')
+    workload_parser.add_argument('--block-sizes', nargs='*', type=int, default=[512, 4096])
+    workload_parser.add_argument('--operations', type=int, default=20, help='repetitions of each selection and single row deletion')
+    workload_parser.add_argument('--batch-size', type=int, default=1000, help='rows of the bulk insert')
+    workload_parser.add_argument('--engines', nargs='*', default=list(ENGINES), choices=list(ENGINES))
+    workload_parser.add_argument('--output', default='./dataset/Workload_Report.json')
+
+    args = parser.parse_args()
+    os.makedirs('./dataset', exist_ok=True)
+    # The workload generates a table for each of its scales
+    if args.benchmark == 'workload':
+        benchmark_workload(scales=args.rows, block_sizes=args.block_sizes, engines=args.engines, number_of_operations=args.operations, batch_size=args.batch_size, report_filepath=args.output)
+        return
+    # The diagnostics read an existing table
+    if args.benchmark == 'hash_diagnostics':
+        benchmark_hash_diagnostics(txt_filepath=args.table, block_size=args.block_size)
+        return
+    csv_filepath = './dataset/Benchmark.csv'
+    generate_coffee_shop_csv(csv_filepath=csv_filepath, number_of_records=args.rows)
+
+    if args.benchmark == 'ingest':
+        benchmark_ingest(csv_filepath=csv_filepath, block_size=args.block_size, engines=args.engines)
+    elif args.benchmark == 'heap_load':
+        benchmark_heap_load(csv_filepath=csv_filepath, block_size=args.block_size)
+    elif args.benchmark == 'hash_lookup':
+        benchmark_hash_lookup(csv_filepath=csv_filepath, block_size=args.block_size, number_of_lookups=args.lookups, number_of_records=args.rows)
+    elif args.benchmark == 'hash_growth':
+        benchmark_hash_growth(csv_filepath=csv_filepath, block_size=args.block_size, number_of_records=args.rows, growth=args.growth, number_of_lookups=args.lookups)
+    elif args.benchmark == 'hash_functions':
+        benchmark_hash_functions(csv_filepath=csv_filepath, block_size=args.block_size, hash_functions=args.hash_functions)
+    elif args.benchmark == 'hash_load':
+        benchmark_hash_load(csv_filepath=csv_filepath, block_size=args.block_size, hash_functions=args.hash_functions)
+    elif args.benchmark == 'interval':
+        benchmark_interval(csv_filepath=csv_filepath, block_size=args.block_size, engines=args.engines)
+    elif args.benchmark == 'page_format':
+        benchmark_page_format(csv_filepath=csv_filepath, block_size=args.block_size, number_of_scans=args.scans)
+    elif args.benchmark == 'secondary_index':
+        benchmark_secondary_index(csv_filepath=csv_filepath, block_size=args.block_size, engines=args.engines)
+    elif args.benchmark == 'mutation_io':
+        benchmark_mutation_io(csv_filepath=csv_filepath, block_size=args.block_size, engines=args.engines, number_of_mutations=args.mutations, number_of_records=args.rows)
+    elif args.benchmark == 'external_sort':
+        benchmark_external_sort(csv_filepath=csv_filepath, block_size=args.block_size, memory_budgets=args.memory_budgets, number_of_records=args.rows)
+    elif args.benchmark == 'buffer_pool':
+        benchmark_buffer_pool(csv_filepath=csv_filepath, block_size=args.block_size, engines=args.engines, number_of_selects=args.selects, number_of_frames=args.frames, replacement_policy=args.policy)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Acesso aos blocos dos arquivos txt através do buffer pool. Os blocos que não estão no pool são lidos do mapeamento
+em memória (mmap) do arquivo, e os registros são fatiados dos blocos sem cópia.
+"""
+
+import mmap
+import os
+
+from Buffer_Pool import BUFFER_POOL, pool_key
+from Io_Metrics import Io_Counters
+
+# First byte of deleted records and of block padding
+DELETED_MARK = ord('#')
+
+def field_bounds(field_sizes, field_id):
+    # Each field is followed by a comma
+    start = sum(field_sizes[:field_id]) + field_id
+    return start, start + field_sizes[field_id]
+
+def encode_field_value(value, field_size):
+    # Field values are stored left aligned and padded with spaces up to the field size
+    return value.encode().ljust(field_size)
+
+class Block_Manager:
+    def __init__(self, file, layout, block_size, buffer_pool=BUFFER_POOL, io_counters=None):
+        self.file = file
+        self.pool_key = pool_key(filepath=file.name)
+        self.layout = layout
+        self.block_size = block_size
+        self.buffer_pool = buffer_pool
+        self.mapped_size = 0
+        self.mapping = None
+        self.view = None
+        # Reads and writes are counted in the counters of the engine, the position of the file is kept to count seeks
+        self.io_counters = io_counters if io_counters != None else Io_Counters()
+        self.position = None
+
+    def refresh(self, layout):
+        # The header may have been rewritten since the last access
+        self.layout = layout
+        # Writes made through the file are flushed so that the mapping sees them
+        self.file.flush()
+        file_size = os.fstat(self.file.fileno()).st_size
+        if self.view == None or file_size != self.mapped_size:
+            self._unmap()
+            # Empty files can not be mapped
+            if file_size > 0:
+                self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.view = memoryview(self.mapping)
+            else:
+                self.view = memoryview(b'')
+            self.mapped_size = file_size
+
+    def flush(self, layout):
+        # Dirty blocks are written back after the header, which may have moved them
+        self.layout = layout
+        self.buffer_pool.flush(client=self)
+
+    def release(self):
+        # Changes that were not flushed are lost, as when a file is closed without being written
+        self.buffer_pool.discard_dirty(client=self)
+        self._unmap()
+
+    def _unmap(self):
+        if self.view == None:
+            return
+        self.view.release()
+        try:
+            if self.mapping != None:
+                self.mapping.close()
+        except BufferError:
+            # A record view is still referenced, the mapping is closed when it is garbage collected
+            pass
+        self.mapping = None
+        self.view = None
+        self.mapped_size = 0
+
+    def number_of_blocks(self):
+        # The last block may not be followed by a new line character
+        return (self.mapped_size - self.layout.data_start + 1) // self.layout.block_stride
+
+    def read_block(self, block_id):
+        # Called by the buffer pool when the block is not in it, blocks past the end of the file are returned empty
+        offset = self.layout.block_offset(block_id=block_id)
+        if offset + self.block_size > self.mapped_size:
+            self.refresh(layout=self.layout)
+        block = bytes(self.view[offset:offset + self.block_size])
+        self.io_counters.count_read(number_of_blocks=1, number_of_bytes=len(block), seek=offset != self.position)
+        self.position = offset + self.layout.block_stride
+        return block
+
+    def write_blocks(self, first_block_id, blocks):
+        # Consecutive blocks are written with a single seek and write, flushed so that the mapping sees them
+        data = b''.join(block + b'\n' for block in blocks)
+        offset = self.layout.block_offset(block_id=first_block_id)
+        self.file.seek(offset, 0)
+        self.file.write(data)
+        self.file.flush()
+        self.io_counters.count_write(number_of_blocks=len(blocks), number_of_bytes=len(data), seek=offset != self.position)
+        self.position = offset + len(data)
+
+    def block(self, block_id):
+        self.io_counters.logical_reads += 1
+        return memoryview(self.buffer_pool.fetch(client=self, block_id=block_id))
+
+    def write_block(self, block_id, block):
+        # The block is written to the file when it is flushed or evicted from the buffer pool
+        self.buffer_pool.write(client=self, block_id=block_id, block=block)
+
+    def record(self, block_id, record_id, record_size):
+        block = self.block(block_id=block_id)
+        return block[record_size * record_id:record_size * (record_id + 1)]
+
+    def pointer(self, block_id, pointer_size):
+        # Block id stored at the end of a block whose records were just read, such as the next bucket of a hash chain
+        return int(bytes(self.buffer_pool.fetch(client=self, block_id=block_id)[-pointer_size:]))
+
+    def records(self, block_id, record_size, blocking_factor):
+        # Yields the position and the view of each record in the block, skipping deleted records and padding,
+        # the block stays pinned in the buffer pool while its records are read
+        self.io_counters.logical_reads += 1
+        block = memoryview(self.buffer_pool.pin(client=self, block_id=block_id))
+        try:
+            number_of_records_in_block = min(blocking_factor, len(block) // record_size)
+            for record_id in range(0, number_of_records_in_block):
+                record = block[record_size * record_id:record_size * (record_id + 1)]
+                if record[0] != DELETED_MARK:
+                    self.io_counters.records_examined += 1
+                    yield record_id, record
+        finally:
+            self.buffer_pool.unpin(client=self, block_id=block_id)
@@ -0,0 +1,100 @@
+"""
+Blocos de um arquivo txt lidos sob demanda, como uma sequência, através do buffer pool. Os blocos modificados são
+marcados como sujos no pool e somente eles são escritos de volta no arquivo, nas suas posições.
+"""
+
+import os
+
+from Buffer_Pool import BUFFER_POOL, pool_key
+from Io_Metrics import Io_Counters
+
+class Block_Store:
+    def __init__(self, filepath, layout, block_size, buffer_pool=BUFFER_POOL, io_counters=None):
+        self.filepath = filepath
+        self.pool_key = pool_key(filepath=filepath)
+        self.layout = layout
+        self.block_size = block_size
+        self.buffer_pool = buffer_pool
+        # Blocks are read and written without buffering, so that header rewrites made through other files are seen
+        self.file = open(filepath, 'rb+', buffering=0)
+        # The last block may not be followed by a new line character
+        file_size = os.fstat(self.file.fileno()).st_size
+        self.number_of_blocks = max(0, (file_size - self.layout.data_start + 1) // self.layout.block_stride)
+        # Set when the store has fewer blocks than the file, which is truncated on the next flush
+        self.truncate = False
+        # Reads and writes are counted in the counters of the engine, the position of the file is kept to count seeks
+        self.io_counters = io_counters if io_counters != None else Io_Counters()
+        self.position = None
+
+    def __len__(self):
+        return self.number_of_blocks
+
+    def __iter__(self):
+        for block_id in range(0, self.number_of_blocks):
+            yield self[block_id]
+
+    def __getitem__(self, block_id):
+        if block_id < 0:
+            block_id += self.number_of_blocks
+        if block_id < 0 or block_id >= self.number_of_blocks:
+            raise IndexError('Block_Store index out of range')
+        self.io_counters.logical_reads += 1
+        return self.buffer_pool.fetch(client=self, block_id=block_id)
+
+    def __setitem__(self, block_id, block):
+        if block_id < 0:
+            block_id += self.number_of_blocks
+        if block_id < 0 or block_id >= self.number_of_blocks:
+            raise IndexError('Block_Store assignment index out of range')
+        self.buffer_pool.write(client=self, block_id=block_id, block=block)
+
+    def append(self, block):
+        # New blocks are written at the end of the file on the next flush
+        self.number_of_blocks += 1
+        self[self.number_of_blocks - 1] = block
+
+    def reset(self, blocks):
+        # Replaces every block, as after a reorganisation of the whole table, the blocks may be yielded one at a time
+        # and are written in sequence through the pool, which writes them back as their frames are evicted
+        number_of_blocks = 0
+        for block in blocks:
+            self.buffer_pool.write(client=self, block_id=number_of_blocks, block=block)
+            number_of_blocks += 1
+        # Old blocks past the last new block are dropped, and the file is truncated on the next flush
+        self.buffer_pool.discard(filepath=self.filepath, first_block_id=number_of_blocks)
+        self.number_of_blocks = number_of_blocks
+        self.truncate = True
+
+    def read_block(self, block_id):
+        # Called by the buffer pool when the block is not in it
+        offset = self.layout.block_offset(block_id=block_id)
+        self.file.seek(offset, 0)
+        block = self.file.read(self.block_size)
+        self.io_counters.count_read(number_of_blocks=1, number_of_bytes=len(block), seek=offset != self.position)
+        self.position = offset + self.layout.block_stride
+        return str(block, 'utf-8')
+
+    def write_blocks(self, first_block_id, blocks):
+        # Consecutive blocks are written with a single seek and write
+        data = b''.join(block.encode() + b'\n' for block in blocks)
+        offset = self.layout.block_offset(block_id=first_block_id)
+        self.file.seek(offset, 0)
+        self.file.write(data)
+        self.io_counters.count_write(number_of_blocks=len(blocks), number_of_bytes=len(data), seek=offset != self.position)
+        self.position = offset + len(data)
+
+    def refresh(self, layout):
+        # The header may have been rewritten, moving the blocks
+        self.layout = layout
+
+    def flush(self, layout):
+        self.layout = layout
+        self.buffer_pool.flush(client=self)
+        if self.truncate:
+            self.file.truncate(self.layout.block_offset(block_id=self.number_of_blocks))
+            self.truncate = False
+
+    def close(self):
+        # Changes that were not flushed are lost, as when a file is closed without being written
+        self.buffer_pool.discard_dirty(client=self)
+        self.file.close()
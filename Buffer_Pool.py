@@ -0,0 +1,171 @@
+"""
+Buffer pool compartilhado pelos arquivos das tabelas: um número fixo de quadros guarda os blocos lidos, identificados
+pelo arquivo e pelo número do bloco. Quando não há quadro livre, um bloco é substituído pela política LRU ou CLOCK, e
+os blocos modificados (sujos) são escritos de volta no arquivo antes de serem descartados. Blocos fixados (pin) não
+são substituídos. Os acertos, faltas, substituições e escritas de volta são contados.
+"""
+
+from collections import OrderedDict
+import os
+
+NUMBER_OF_FRAMES = 32768
+
+LRU = 'lru'
+CLOCK = 'clock'
+REPLACEMENT_POLICIES = [LRU, CLOCK]
+
+def pool_key(filepath):
+    # The same file is found by the same key whatever the path used to open it
+    return os.path.abspath(filepath)
+
+class Buffer_Frame:
+    def __init__(self, client, block_id, block):
+        # The client reads the block from its file and writes it back
+        self.client = client
+        self.block_id = block_id
+        self.block = block
+        self.dirty = False
+        self.pin_count = 0
+        # Reference bit of the CLOCK policy
+        self.referenced = True
+
+class Buffer_Pool:
+    def __init__(self, number_of_frames=NUMBER_OF_FRAMES, replacement_policy=LRU):
+        if number_of_frames < 1:
+            raise Exception('BufferPoolError: Number of frames must be positive.')
+        if replacement_policy not in REPLACEMENT_POLICIES:
+            raise Exception('BufferPoolError: Replacement policy nonexistent.')
+        self.number_of_frames = number_of_frames
+        self.replacement_policy = replacement_policy
+        # Frames by (pool key, block id), in LRU order or in the circular order swept by the CLOCK hand
+        self.frames = OrderedDict()
+        # Block ids of the frames of each file, and of the dirty ones
+        self.file_blocks = dict()
+        self.dirty_blocks = dict()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_backs = 0
+
+    def stats(self):
+        return {
+            'frames': self.number_of_frames,
+            'used_frames': len(self.frames),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'write_backs': self.write_backs,
+        }
+
+    def fetch(self, client, block_id):
+        # Returns the block, read from the file of the client only if it is not in the pool
+        frame = self.frames.get((client.pool_key, block_id))
+        if frame != None:
+            self.hits += 1
+            self._reference(frame_key=(client.pool_key, block_id), frame=frame)
+            return frame.block
+        self.misses += 1
+        block = client.read_block(block_id=block_id)
+        self._add_frame(frame=Buffer_Frame(client=client, block_id=block_id, block=block))
+        return block
+
+    def write(self, client, block_id, block):
+        # The block is only written to the file when its frame is evicted or flushed
+        frame_key = (client.pool_key, block_id)
+        frame = self.frames.get(frame_key)
+        if frame == None:
+            frame = Buffer_Frame(client=client, block_id=block_id, block=block)
+            self._add_frame(frame=frame)
+        else:
+            frame.client = client
+            frame.block = block
+            self._reference(frame_key=frame_key, frame=frame)
+        frame.dirty = True
+        self.dirty_blocks.setdefault(client.pool_key, set()).add(block_id)
+
+    def pin(self, client, block_id):
+        # A pinned block stays in the pool until it is unpinned as many times
+        self.fetch(client=client, block_id=block_id)
+        frame = self.frames[(client.pool_key, block_id)]
+        frame.pin_count += 1
+        return frame.block
+
+    def unpin(self, client, block_id):
+        frame = self.frames.get((client.pool_key, block_id))
+        if frame == None or frame.pin_count == 0:
+            raise Exception('BufferPoolError: Block not pinned.')
+        frame.pin_count -= 1
+
+    def flush(self, client):
+        # Dirty blocks of the file are written in runs of consecutive blocks, each with a single seek and write
+        block_ids = sorted(self.dirty_blocks.pop(client.pool_key, set()))
+        first_block_id = None
+        blocks = []
+        for block_id in block_ids:
+            frame = self.frames[(client.pool_key, block_id)]
+            frame.dirty = False
+            self.write_backs += 1
+            if blocks != [] and block_id != first_block_id + len(blocks):
+                client.write_blocks(first_block_id=first_block_id, blocks=blocks)
+                blocks = []
+            if blocks == []:
+                first_block_id = block_id
+            blocks.append(frame.block)
+        if blocks != []:
+            client.write_blocks(first_block_id=first_block_id, blocks=blocks)
+
+    def discard(self, filepath, first_block_id=0):
+        # Drops the blocks of a file rewritten outside of the pool, dirty blocks are dropped without being written
+        key = pool_key(filepath=filepath)
+        block_ids = self.file_blocks.get(key, set())
+        for block_id in [block_id for block_id in block_ids if block_id >= first_block_id]:
+            self._remove_frame(frame_key=(key, block_id))
+
+    def discard_dirty(self, client):
+        # Drops the changes of a client that closes its file without flushing them
+        for block_id in self.dirty_blocks.pop(client.pool_key, set()):
+            self._remove_frame(frame_key=(client.pool_key, block_id))
+
+    def _reference(self, frame_key, frame):
+        if self.replacement_policy == LRU:
+            self.frames.move_to_end(frame_key)
+        else:
+            frame.referenced = True
+
+    def _add_frame(self, frame):
+        while len(self.frames) >= self.number_of_frames:
+            self._evict()
+        frame_key = (frame.client.pool_key, frame.block_id)
+        self.frames[frame_key] = frame
+        self.file_blocks.setdefault(frame_key[0], set()).add(frame.block_id)
+
+    def _remove_frame(self, frame_key):
+        frame = self.frames.pop(frame_key, None)
+        if frame == None:
+            return
+        self.file_blocks[frame_key[0]].discard(frame.block_id)
+        if frame.dirty and frame_key[0] in self.dirty_blocks:
+            self.dirty_blocks[frame_key[0]].discard(frame.block_id)
+        return frame
+
+    def _evict(self):
+        # LRU evicts the least recently used unpinned frame, CLOCK sweeps the frames giving referenced ones a second chance
+        for i in range(0, 2 * len(self.frames)):
+            frame_key, frame = next(iter(self.frames.items()))
+            if frame.pin_count > 0 or (self.replacement_policy == CLOCK and frame.referenced):
+                frame.referenced = False
+                self.frames.move_to_end(frame_key)
+                continue
+            self._remove_frame(frame_key=frame_key)
+            self.evictions += 1
+            if frame.dirty:
+                frame.client.write_blocks(first_block_id=frame.block_id, blocks=[frame.block])
+                self.write_backs += 1
+            return
+        raise Exception('BufferPoolError: All frames are pinned.')
+
+# Pool shared by every engine, so that the hot blocks of a table stay in memory between operations
+BUFFER_POOL = Buffer_Pool()
@@ -0,0 +1,49 @@
+"""
+Leitura bufferizada de linhas e registros dos arquivos csv e txt.
+"""
+
+BUFFER_SIZE = 1024 * 1024
+
+def read_line(file):
+    # Reads a whole line through the file buffer instead of one character at a time
+    line = file.readline()
+    # Lines read from files opened as bytes are decoded
+    if isinstance(line, bytes):
+        line = line.decode()
+    if line[-1:] == '\n':
+        return line[:-1]
+    return line
+
+def read_lines(file, number_of_lines):
+    return [read_line(file=file) for i in range(0, number_of_lines)]
+
+class Buffered_Reader:
+    def __init__(self, filepath, buffer_size=BUFFER_SIZE):
+        self.filepath = filepath
+        self.file = open(filepath, 'r', buffering=buffer_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def readline(self):
+        return self.file.readline()
+
+    def read_line(self):
+        return read_line(file=self.file)
+
+    def read_records(self):
+        # Yields records until the end of the file (or the first empty line), iterating over the lines of the buffer
+        for line in self.file:
+            record = line[:-1] if line[-1:] == '\n' else line
+            if record == '':
+                return
+            yield record
+
+    def seek(self, offset, whence=0):
+        return self.file.seek(offset, whence)
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,699 @@
+"""
+Implementação de Hash Extensível. Um diretório de 2^profundidade_global entradas, indexado pelos bits menos
+significativos do hash da chave primária (o misturador de 64 bits para chaves inteiras e FNV-1a para as outras, de
+`Hash_Functions.py`), aponta para os buckets, e cada bucket ocupa um bloco do arquivo txt. Quando um bucket
+cheio recebe um registro, somente ele é dividido em dois pelo próximo bit do hash (dobrando o diretório se a sua
+profundidade local já for a global), de modo que a tabela cresce sem buckets de overflow e uma busca por chave primária
+lê um único bloco. O diretório é guardado no arquivo `<tabela>_Directory.txt`, com o prefixo e a profundidade local de
+cada bucket. Buckets esvaziados por deleções não são fundidos.
+"""
+
+import math
+from array import array
+from datetime import datetime
+
+import os
+
+from Util import check_interval, interval_contains
+from Buffered_Reader import Buffered_Reader, read_line, read_lines
+from Header_Layout import Header_Layout, write_header
+from Block_Manager import Block_Manager, field_bounds, encode_field_value
+from Buffer_Pool import BUFFER_POOL
+from Io_Metrics import Io_Counters, measured_operation
+from Record_Format import Text_Record_Format
+from Hash_Functions import MIXER, STRING, make_hash_function
+from Secondary_Index import Secondary_Indexes, has_index_files
+from Schema import Schema, read_csv_schema, count_csv_records
+from Record_Validator import Record_Validator, invalid_records_message
+
+# Fraction of the buckets filled by the records of the csv, the free space takes the first inserts without splits
+LOAD_FACTOR = 0.7
+# Keys whose hashes have the same low bits can not be told apart by splitting their bucket, the directory of this depth
+# takes 64 MiB, as 4 bytes per entry
+MAX_GLOBAL_DEPTH = 24
+
+def directory_hash_function(key_type):
+    # Integer keys are mixed and the other keys are hashed from their text, so that strided or bursty ids still spread
+    # over the low bits that index the directory
+    name = MIXER if key_type == 'int' else STRING
+    return make_hash_function(name=name, number_of_buckets=2 ** MAX_GLOBAL_DEPTH)
+
+class Extendible_Hash:
+    def __init__(self, block_size, buffer_pool=BUFFER_POOL, metrics_sink=None):
+        self.block_size = block_size
+        # Buckets are read and written through the buffer pool
+        self.buffer_pool = buffer_pool
+        self.blocks_manager = None
+        self.layout = None
+        self.opened_txt_filepath = None
+        self.opened_txt_file = None
+        self.secondary_indexes = None
+        # Directory of the last table read, kept while its file is not changed
+        self.directory_file_stat = None
+        self.directory_modified = False
+        # I/O of the operations, the statistics of the last operation are also given to the metrics sink
+        self.io_counters = Io_Counters()
+        self.metrics_sink = metrics_sink
+        self.last_operation_stats = None
+        self.operation_in_progress = False
+
+    def _set_field_names(self, fields_names):
+        self.field_names = fields_names.strip().split(',')
+
+    def _set_field_sizes(self, field_sizes):
+        self.field_sizes = field_sizes
+
+    def _set_schema(self, schema):
+        self.schema = schema
+        self.field_names = schema.field_names
+        self.field_types = schema.field_types
+        self._set_field_sizes(field_sizes=schema.field_sizes)
+        self.record_validator = Record_Validator(schema=schema)
+        self.hash_function = directory_hash_function(key_type=self.field_types[0])
+
+    def _set_record_size(self):
+        self.record_size = sum(self.field_sizes) + len(self.field_sizes)
+
+    def _set_blocking_factor(self):
+        self.blocking_factor = math.floor(self.block_size / self.record_size)
+
+    def _read_csv_header(self, file):
+        csv_header = read_line(file=file)
+        self._set_field_names(fields_names=csv_header)
+
+    def _read_csv_schema(self, file, schema):
+        # The csv is only read for the field types and sizes that were not given
+        schema, number_of_records = read_csv_schema(csv_file=file, field_names=self.field_names, schema=schema)
+        self._set_schema(schema=schema)
+        # The initial directory depends on the number of records, which are counted without being parsed if the csv was not read
+        self.number_of_records = number_of_records if number_of_records != None else count_csv_records(csv_filepath=file.filepath)
+
+    def _set_directory(self):
+        # Starts with enough buckets for the records of the csv at the load factor, one bucket per directory entry
+        number_of_buckets = max(1, self.number_of_records / (self.blocking_factor * LOAD_FACTOR))
+        self.global_depth = min(MAX_GLOBAL_DEPTH, math.ceil(math.log2(number_of_buckets)))
+        self.number_of_blocks = 2 ** self.global_depth
+        self.bucket_prefixes = list(range(0, self.number_of_blocks))
+        self.local_depths = [self.global_depth] * self.number_of_blocks
+        self._build_directory()
+
+    def _build_directory(self):
+        # A bucket of local depth l is pointed by every entry whose l low bits are its prefix, the entries are kept
+        # as an array of bucket ids
+        self.directory = array('I', [0]) * (2 ** self.global_depth)
+        for block_id in range(0, self.number_of_blocks):
+            step = 2 ** self.local_depths[block_id]
+            for i in range(self.bucket_prefixes[block_id], len(self.directory), step):
+                self.directory[i] = block_id
+
+    def _hash(self, key):
+        return self.hash_function(key)
+
+    def _bucket_id(self, key):
+        return self.directory[self._hash(key=key) & (len(self.directory) - 1)]
+
+    def _directory_filepath(self, txt_filepath):
+        return txt_filepath[:-4] + "_Directory.txt"
+
+    def _write_directory_file(self, txt_filepath):
+        with open(self._directory_filepath(txt_filepath=txt_filepath), 'w') as directory_file:
+            for block_id in range(0, self.number_of_blocks):
+                directory_file.write(str(self.bucket_prefixes[block_id]) + ',' + str(self.local_depths[block_id]) + '\n')
+        self.directory_modified = False
+        self.directory_file_stat = self._directory_file_stat(txt_filepath=txt_filepath)
+
+    def _directory_file_stat(self, txt_filepath):
+        directory_filepath = self._directory_filepath(txt_filepath=txt_filepath)
+        stat = os.stat(directory_filepath)
+        return (os.path.abspath(directory_filepath), stat.st_mtime_ns, stat.st_size)
+
+    def _read_directory_file(self, txt_filepath):
+        # The directory of the previous operation is reused if its file was not rewritten since
+        directory_file_stat = self._directory_file_stat(txt_filepath=txt_filepath)
+        if directory_file_stat == self.directory_file_stat and not self.directory_modified and len(self.local_depths) == self.number_of_blocks:
+            return
+        self.bucket_prefixes = []
+        self.local_depths = []
+        with Buffered_Reader(filepath=self._directory_filepath(txt_filepath=txt_filepath)) as directory_file:
+            for bucket in directory_file.read_records():
+                prefix, local_depth = bucket.split(',')
+                self.bucket_prefixes.append(int(prefix))
+                self.local_depths.append(int(local_depth))
+        self._build_directory()
+        self.directory_modified = False
+        self.directory_file_stat = directory_file_stat
+
+    def _write_txt_header(self, txt_file, txt_filepath):
+        header = ''
+        # Write table name
+        table_name = txt_filepath.split('/')[2].split('.')[0]
+        header += table_name + '\n'
+        # Write field names, sizes, types
+        field_names = ','.join(str(field_name) for field_name in self.field_names) + '\n'
+        field_sizes = ','.join(str(field_size) for field_size in self.field_sizes) + '\n'
+        field_types = ','.join(str(field_type) for field_type in self.field_types) + '\n'
+        header += field_names
+        header += field_sizes
+        header += field_types
+        # Write primary key
+        header += self.schema.primary_key + '\n'
+        # Write number of records
+        header += str(self.number_of_records) + '\n'
+        # Write blocking factor
+        header += str(self.blocking_factor) + '\n'
+        # Write global depth of the directory
+        header += str(self.global_depth) + '\n'
+        # Write number of buckets
+        header += str(self.number_of_blocks) + '\n'
+        # Write creation timestamp
+        if self.creation_date == None:
+            creation_timestamp = datetime.now()
+            self.creation_date = creation_timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        header += self.creation_date + '\n'
+        # Write alteration timestamp
+        alteration_timestamp = datetime.now()
+        alteration_timestamp = alteration_timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        header += alteration_timestamp + '\n'
+        # Rewrites the header in place, moving the blocks if it outgrew its space
+        self.layout = write_header(txt_file=txt_file, header=header, layout=self.layout, block_size=self.block_size, io_counters=self.io_counters)
+        # Buckets of the table being written are found after the rewritten header
+        if self.blocks_manager != None and self.blocks_manager.file is txt_file:
+            self.blocks_manager.refresh(layout=self.layout)
+
+    def _padding(self, record_field, field_id):
+        diff = self.field_sizes[field_id] - len(record_field)
+        padded_record_field = record_field + (' ' * diff)
+        return padded_record_field
+
+    def _format_record(self, record):
+        formatted_record = ''
+        record_fields = record.strip().split(',')
+        for i in range(len(self.field_names)):
+            if len(record_fields[i]) < self.field_sizes[i]:
+                padded_record_field = self._padding(record_field=record_fields[i], field_id=i)
+                formatted_record += padded_record_field + ','
+            else:
+                formatted_record += record_fields[i] + ','
+        return formatted_record
+
+    def _create_empty_buckets(self, file):
+        # Sets cursor to after header
+        file.seek(self.layout.data_start, 0)
+        empty_bucket = (("#" * self.block_size) + '\n').encode()
+        for i in range(0, self.number_of_blocks):
+            file.write(empty_bucket)
+        self.io_counters.count_write(number_of_blocks=self.number_of_blocks, number_of_bytes=self.number_of_blocks * len(empty_bucket), seek=False)
+
+    def _write_from_csv_to_txt(self, csv_file, csv_filepath):
+        # Creates the txt file, replacing a previous table with the same name
+        txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+        txt_file = open(txt_filepath, 'wb+')
+        self.layout = None
+        self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
+        self._create_empty_buckets(file=txt_file)
+        # Buckets of the previous table that are still in the buffer pool are dropped
+        self.buffer_pool.discard(filepath=txt_filepath)
+        self.blocks_manager = Block_Manager(file=txt_file, layout=self.layout, block_size=self.block_size, buffer_pool=self.buffer_pool, io_counters=self.io_counters)
+        self.blocks_manager.refresh(layout=self.layout)
+        # Indexes of a previous table with the same name are built again afterwards
+        self.secondary_indexes = None
+        # Return to begin of csv_file
+        csv_file.seek(0, 0)
+        # Skip csv_file header
+        read_line(csv_file)
+        # Inserts each record in its bucket, splitting the buckets that fill up
+        self.number_of_records = 0
+        for record in csv_file.read_records():
+            self._insert(record=self._format_record(record=record))
+        # Updates the header with the buckets created by the splits
+        self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
+        self.blocks_manager.flush(layout=self.layout)
+        self.blocks_manager.release()
+        txt_file.close()
+        self._write_directory_file(txt_filepath=txt_filepath)
+
+    @measured_operation
+    def from_csv_to_txt(self, csv_filepath, schema=None):
+        # Open csv file
+        file = Buffered_Reader(filepath=csv_filepath)
+        # Read csv file header
+        self._read_csv_header(file=file)
+        # Calculates field sizes and some other fields, unless they are given by the schema
+        self._read_csv_schema(file=file, schema=schema)
+        # Calculates record size and blocking factor
+        self._set_record_size()
+        self._set_blocking_factor()
+        # Sets creation date and the initial directory
+        self.creation_date = None
+        self._set_directory()
+        # Writes csv file to a txt file
+        self._write_from_csv_to_txt(csv_file=file, csv_filepath=csv_filepath)
+        file.close()
+        # Indexes of a previous table with the same name are built again
+        txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+        self._rebuild_secondary_indexes(txt_filepath=txt_filepath)
+
+    def _read_txt_header(self, file):
+        header_lines = read_lines(file=file, number_of_lines=11)
+        self.table_name = header_lines[0]
+        field_names = header_lines[1].strip().split(',')
+        field_sizes = [int(field_size) for field_size in header_lines[2].strip().split(',')]
+        field_types = header_lines[3].strip().split(',')
+        self._set_schema(schema=Schema(field_names=field_names, field_types=field_types, field_sizes=field_sizes, primary_key=header_lines[4].strip()))
+        self.record_format = Text_Record_Format(field_sizes=self.field_sizes, field_types=self.field_types)
+        self._set_record_size()
+        self._set_blocking_factor()
+        self.number_of_records = int(header_lines[5].strip())
+        self.blocking_factor = int(header_lines[6].strip())
+        self.global_depth = int(header_lines[7].strip())
+        self.number_of_blocks = int(header_lines[8].strip())
+        self.creation_date = header_lines[9].strip()
+        self.alteration_date = header_lines[10].strip()
+        # Computes the header layout once, it only changes when the header is rewritten
+        self.layout = Header_Layout(header_lines=header_lines, block_size=self.block_size)
+
+    def _read_txt_file(self, txt_filepath):
+        # If the table is open, reuses its file, parsed header and directory
+        if self._is_open(txt_filepath=txt_filepath):
+            return self.opened_txt_file
+        # Opened as bytes, the buckets are written back by the buffer pool
+        file = open(txt_filepath, 'rb+')
+        self._read_txt_header(file=file)
+        self._read_directory_file(txt_filepath=txt_filepath)
+        self.blocks_manager = Block_Manager(file=file, layout=self.layout, block_size=self.block_size, buffer_pool=self.buffer_pool, io_counters=self.io_counters)
+        self.secondary_indexes = Secondary_Indexes(txt_filepath=txt_filepath, field_names=self.field_names, field_types=self.field_types)
+        return file
+
+    def _is_open(self, txt_filepath):
+        return self.opened_txt_file != None and self.opened_txt_filepath == txt_filepath
+
+    def _save_directory(self, txt_filepath):
+        # The directory is only rewritten when buckets were split
+        if self.directory_modified:
+            self._write_directory_file(txt_filepath=txt_filepath)
+
+    def _close_txt_file(self, file, txt_filepath, modified):
+        # The file of an open table stays open until close_table
+        if file is self.opened_txt_file:
+            return
+        self.blocks_manager.flush(layout=self.layout)
+        self.blocks_manager.release()
+        self.secondary_indexes.close()
+        file.close()
+        if modified:
+            self._save_directory(txt_filepath=txt_filepath)
+
+    @measured_operation
+    def open_table(self, txt_filepath):
+        if self.opened_txt_file != None:
+            self.close_table()
+        self.opened_txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self.opened_txt_filepath = txt_filepath
+
+    @measured_operation
+    def flush_table(self):
+        self.blocks_manager.flush(layout=self.layout)
+        self.opened_txt_file.flush()
+        self.secondary_indexes.flush()
+        self._save_directory(txt_filepath=self.opened_txt_filepath)
+
+    @measured_operation
+    def close_table(self):
+        file = self.opened_txt_file
+        txt_filepath = self.opened_txt_filepath
+        self.opened_txt_file = None
+        self.opened_txt_filepath = None
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
+
+    def _search_by_primary_key(self, key, file):
+        # The directory gives the only bucket where the key can be, compared against the key bytes of each record
+        start, end = field_bounds(field_sizes=self.field_sizes, field_id=0)
+        encoded_key = encode_field_value(value=key, field_size=self.field_sizes[0])
+        self.blocks_manager.refresh(layout=self.layout)
+        bucket_id = self._bucket_id(key=key)
+        for (i, record) in self.blocks_manager.records(block_id=bucket_id, record_size=self.record_size, blocking_factor=self.blocking_factor):
+            if record[start:end] == encoded_key:
+                yield [bucket_id, i]
+                return
+        # If failed to find record
+        yield [-1, -1]
+
+    def _search_by_primary_keys(self, keys, file):
+        # Keys are grouped by bucket, so that each bucket is read once for every key hashed to it
+        start, end = field_bounds(field_sizes=self.field_sizes, field_id=0)
+        keys_by_bucket = dict()
+        for key in keys:
+            try:
+                bucket_id = self._bucket_id(key=key)
+            except ValueError:
+                # Keys that are not integers never match any record of a table with integer keys
+                continue
+            encoded_key = encode_field_value(value=key, field_size=self.field_sizes[0])
+            keys_by_bucket.setdefault(bucket_id, dict())[encoded_key] = key
+        self.blocks_manager.refresh(layout=self.layout)
+        positions = dict()
+        for bucket_id in keys_by_bucket:
+            bucket_keys = keys_by_bucket[bucket_id]
+            for (i, record) in self.blocks_manager.records(block_id=bucket_id, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                key = bucket_keys.get(bytes(record[start:end]))
+                if key != None:
+                    positions[key] = [bucket_id, i]
+        return positions
+
+    def _scan_records(self):
+        # Yields the position and the text of every record of the buckets
+        self.blocks_manager.refresh(layout=self.layout)
+        for i in range(0, self.number_of_blocks):
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                yield i, j, str(record, 'utf-8')
+
+    def _search_index(self, field_id, value):
+        # Positions of the records with the value, read from the secondary index of the field
+        self.blocks_manager.refresh(layout=self.layout)
+        success = False
+        for (i, j) in self.secondary_indexes.search(field_id=field_id, value=value):
+            yield [i, j]
+            success = True
+        self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+        if not success:
+            yield [-1, -1]
+
+    def _search_by_field_value(self, field_id, value, file):
+        # Fields with a secondary index are looked up in it instead of scanning the buckets
+        if self.secondary_indexes.has_index(field_id=field_id):
+            for (i, j) in self._search_index(field_id=field_id, value=value):
+                yield [i, j]
+            return
+        # Compares the padded value against the field bytes of each record, without decoding the records
+        start, end = field_bounds(field_sizes=self.field_sizes, field_id=field_id)
+        encoded_value = encode_field_value(value=value, field_size=self.field_sizes[field_id])
+        self.blocks_manager.refresh(layout=self.layout)
+        success = False
+        for i in range(0, self.number_of_blocks):
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                if record[start:end] == encoded_value:
+                    yield [i, j]
+                    success = True
+        if not success:
+            yield [-1, -1]
+
+    def _search_interval(self, field_id, start, end):
+        # Fields with a secondary index are looked up in it instead of scanning the buckets
+        if self.secondary_indexes.has_index(field_id=field_id):
+            self.blocks_manager.refresh(layout=self.layout)
+            for (i, j) in self.secondary_indexes.search_interval(field_id=field_id, start=start, end=end):
+                yield [i, j]
+            self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+            return
+        # Buckets are not ordered, so the interval is evaluated in a single pass over every bucket
+        field_type = self.field_types[field_id]
+        start_key = self.record_format.value_key(field_id=field_id, value=start)
+        end_key = self.record_format.value_key(field_id=field_id, value=end)
+        self.blocks_manager.refresh(layout=self.layout)
+        for i in range(0, self.number_of_blocks):
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                record_key = self.record_format.field_key(field_id=field_id, record=record)
+                if interval_contains(interval_type=field_type, value=record_key, start=start_key, end=end_key):
+                    yield [i, j]
+
+    def _search(self, field_id, value, file):
+        if field_id == 0:
+            for (i, j) in self._search_by_primary_key(key=value, file=file):
+                yield [i, j]
+        else:
+            for (i, j) in self._search_by_field_value(field_id=field_id, value=value, file=file):
+                yield [i, j]
+
+    def _check_record_type_constraint(self, record):
+        # Each field is checked by the check of its type, compiled with the schema
+        if not self.schema.check_record_types(record=record):
+            return -1
+        return 0
+
+    def _check_record_size_constraint(self, record):
+        record_fields = record.strip().split(',')
+        record_field_sizes = [len(field) for field in record_fields]
+        for i in range(len(self.field_names)):
+            if record_field_sizes[i] > self.field_sizes[i]:
+                return -1
+        return 0
+
+    def _check_record_primary_key_constraint(self, record, file):
+        record_primary_key = record.strip().split(',')[0].strip()
+        search_result = list(self._search(field_id=0, value=record_primary_key, file=file))[0]
+        if search_result[0] != -1 and search_result[1] != -1:
+            return -1
+        return 0
+
+    def _invalid_records(self, records, file):
+        # Every invalid record is reported with its reasons, primary keys are checked in a single search
+        records_primary_keys = [record.strip().split(',')[0].strip() for record in records]
+        return self.record_validator.validate(records=records, primary_keys=records_primary_keys, search_primary_keys=lambda keys : self._search_by_primary_keys(keys=keys, file=file))
+
+    def _check_record_integrity(self, record, file):
+        record_type_constraint = self._check_record_type_constraint(record=record)
+        if record_type_constraint == -1:
+            return -1
+        record_size_constraint = self._check_record_size_constraint(record=record)
+        if record_size_constraint == -1:
+            return -1
+        record_primary_key_constraint = self._check_record_primary_key_constraint(record=record, file=file)
+        if record_primary_key_constraint == -1:
+            return -1
+        return 0
+
+    def _has_secondary_indexes(self):
+        # The table being built from the csv has its indexes built after its records
+        return self.secondary_indexes != None and self.secondary_indexes.has_indexes()
+
+    def _bucket_records(self, bucket):
+        number_of_records_in_bucket = len(bucket.strip('#')) // self.record_size
+        return [bucket[self.record_size * j:self.record_size * (j + 1)] for j in range(0, number_of_records_in_bucket)]
+
+    def _write_bucket(self, bucket_id, records):
+        padding = "#" * (self.block_size - self.record_size * len(records))
+        self.blocks_manager.write_block(block_id=bucket_id, block=(''.join(records) + padding).encode())
+
+    def _split_bucket(self, bucket_id):
+        local_depth = self.local_depths[bucket_id]
+        if local_depth == self.global_depth:
+            if self.global_depth == MAX_GLOBAL_DEPTH:
+                raise Exception("InsertError: Bucket can not be split.")
+            # Doubles the directory, each new entry points to the same bucket as the entry of its low bits
+            self.directory = self.directory + self.directory
+            self.global_depth += 1
+        # The records whose next bit is set move to a new bucket at the end of the file
+        new_bucket_id = self.number_of_blocks
+        self.number_of_blocks += 1
+        new_prefix = self.bucket_prefixes[bucket_id] + 2 ** local_depth
+        self.local_depths[bucket_id] = local_depth + 1
+        self.local_depths.append(local_depth + 1)
+        self.bucket_prefixes.append(new_prefix)
+        for i in range(new_prefix, len(self.directory), 2 ** (local_depth + 1)):
+            self.directory[i] = new_bucket_id
+        self.directory_modified = True
+        records = self._bucket_records(bucket=str(self.blocks_manager.block(block_id=bucket_id), 'utf-8'))
+        kept_records = []
+        moved_records = []
+        for (j, record) in enumerate(records):
+            if (self._hash(key=record[:self.field_sizes[0]]) >> local_depth) & 1:
+                new_position = [new_bucket_id, len(moved_records)]
+                moved_records.append(record)
+            else:
+                new_position = [bucket_id, len(kept_records)]
+                kept_records.append(record)
+            # The records that change position are moved in the secondary indexes
+            if self._has_secondary_indexes() and new_position != [bucket_id, j]:
+                self.secondary_indexes.move_record(record=record, block_id=bucket_id, record_id=j, new_block_id=new_position[0], new_record_id=new_position[1])
+        self._write_bucket(bucket_id=bucket_id, records=kept_records)
+        self._write_bucket(bucket_id=new_bucket_id, records=moved_records)
+
+    def _insert(self, record):
+        # Checks if record to insert is of correct size
+        if len(record) != self.record_size:
+            raise Exception("InsertionError: Incorrect Record Format.")
+        record_primary_key = record.split(',')[0].strip()
+        # Splits the bucket of the key until it has available space
+        while True:
+            bucket_id = self._bucket_id(key=record_primary_key)
+            records = self._bucket_records(bucket=str(self.blocks_manager.block(block_id=bucket_id), 'utf-8'))
+            if len(records) < self.blocking_factor:
+                break
+            self._split_bucket(bucket_id=bucket_id)
+        self._write_bucket(bucket_id=bucket_id, records=records + [record])
+        self.number_of_records += 1
+        # Adds the record to the secondary indexes
+        if self._has_secondary_indexes():
+            self.secondary_indexes.insert_record(record=record, block_id=bucket_id, record_id=len(records))
+
+    @measured_operation
+    def insert_single_record(self, txt_filepath, record):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        # Check if the record respects the database integrity restriction
+        record_integrity = self._check_record_integrity(record=record, file=file)
+        if record_integrity == -1:
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception('InsertError: Invalid Record.')
+        # Formats and inserts record
+        formatted_record = self._format_record(record[:-1])
+        self._insert(formatted_record)
+        # Updates txt file header
+        self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
+
+    @measured_operation
+    def insert_multiple_records(self, txt_filepath, records):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        # Check if the records respect the database integrity restriction
+        invalid_records = self._invalid_records(records=records, file=file)
+        if invalid_records != []:
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception(invalid_records_message(invalid_records=invalid_records))
+        # Formats and inserts records
+        for record in records:
+            formatted_record = self._format_record(record[:-1])
+            self._insert(formatted_record)
+        # Updates txt file header
+        self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
+
+    def _select(self, select_container, block_id, record_id, file):
+        record = self.blocks_manager.record(block_id=block_id, record_id=record_id, record_size=self.record_size)
+        select_container.append(str(record, 'utf-8'))
+
+    @measured_operation
+    def select_by_single_primary_key(self, txt_filepath, key):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        select_container = []
+        for (i, j) in self._search(field_id=0, value=key, file=file):
+            if i == -1 and j == -1:
+                self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+                raise Exception('SelectionError: Primary Key nonexistent.')
+            else:
+                self._select(select_container=select_container, block_id=i, record_id=j, file=file)
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+        return select_container
+
+    @measured_operation
+    def select_by_multiple_primary_key(self, txt_filepath, keys):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        select_container = []
+        exception_counter = 0
+        positions = self._search_by_primary_keys(keys=keys, file=file)
+        for key in keys:
+            if key not in positions:
+                exception_counter += 1
+            else:
+                i, j = positions[key]
+                self._select(select_container=select_container, block_id=i, record_id=j, file=file)
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+        if exception_counter == len(keys):
+            raise Exception('SelectionError: Primary Keys nonexistent.')
+        return select_container
+
+    @measured_operation
+    def select_by_field_interval(self, txt_filepath, field, start, end):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        field_id = self.field_names.index(field)
+        field_type = self.field_types[field_id]
+        possible_field_interval = check_interval(interval_type=field_type, start=start, end=end)
+        if possible_field_interval == -1:
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception('SelectionError: Field Interval incomputable.')
+        select_container = []
+        for (i, j) in self._search_interval(field_id=field_id, start=start, end=end):
+            self._select(select_container=select_container, block_id=i, record_id=j, file=file)
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+        if select_container == []:
+            raise Exception('SelectionError: Requested Records nonexistent.')
+        return select_container
+
+    @measured_operation
+    def select_by_single_field_value(self, txt_filepath, field, value):
+        # Checks if field exists
+        if field not in self.field_names:
+            raise Exception('SelectionError: Field nonexistent.')
+        # If field exists, search for record
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        field_id = self.field_names.index(field)
+        select_container = []
+        for (i, j) in self._search(field_id=field_id, value=value, file=file):
+            if i == -1 and j == -1:
+                self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+                raise Exception('SelectionError: Field Value nonexistent.')
+            else:
+                self._select(select_container=select_container, block_id=i, record_id=j, file=file)
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+        return select_container
+
+    def _delete_record(self, bucket_id, record_id, file):
+        records = self._bucket_records(bucket=str(self.blocks_manager.block(block_id=bucket_id), 'utf-8'))
+        # The record leaves the secondary indexes, and the following records of the bucket move back one slot
+        if self._has_secondary_indexes():
+            self.secondary_indexes.delete_record(record=records[record_id], block_id=bucket_id, record_id=record_id)
+            for j in range(record_id + 1, len(records)):
+                self.secondary_indexes.move_record(record=records[j], block_id=bucket_id, record_id=j, new_block_id=bucket_id, new_record_id=j - 1)
+        del records[record_id]
+        self._write_bucket(bucket_id=bucket_id, records=records)
+        self.number_of_records -= 1
+
+    @measured_operation
+    def delete_record_by_primary_key(self, txt_filepath, key):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        # Searchs for position of record to be deleted
+        for (i, j) in self._search(field_id=0, value=key, file=file):
+            if i == -1 and j == -1:
+                self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+                raise Exception('DeleteError: Primary Key nonexistent.')
+            else:
+                self._delete_record(bucket_id=i, record_id=j, file=file)
+                # Updates txt file header
+                self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
+                self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
+
+    @measured_operation
+    def delete_record_by_criterion(self, txt_filepath, field, value):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        field_id = self.field_names.index(field)
+        # Searchs for positions of records to be deleted
+        positions = list(self._search(field_id=field_id, value=value, file=file))
+        # Deletes from the last position, since deleting a record shifts the following ones in its bucket
+        for (i, j) in reversed(positions):
+            if i == -1 and j == -1:
+                self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+                raise Exception('DeleteError: Field Value nonexistent.')
+            else:
+                self._delete_record(bucket_id=i, record_id=j, file=file)
+        # Updates txt file header
+        self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
+
+    def _rebuild_secondary_indexes(self, txt_filepath):
+        # Tables without indexes are not read again
+        if not has_index_files(txt_filepath=txt_filepath, field_names=self.field_names):
+            return
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        for field_id in list(self.secondary_indexes.indexes):
+            self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+
+    @measured_operation
+    def create_index(self, txt_filepath, field):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        # Checks if field exists
+        if field not in self.field_names:
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception('IndexError: Field nonexistent.')
+        field_id = self.field_names.index(field)
+        # Builds the index from a single scan of the buckets
+        self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+
+    @measured_operation
+    def drop_index(self, txt_filepath, field):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        if field not in self.field_names or not self.secondary_indexes.has_index(field_id=self.field_names.index(field)):
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception('IndexError: Index nonexistent.')
+        self.secondary_indexes.drop_index(field_id=self.field_names.index(field))
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
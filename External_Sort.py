@@ -0,0 +1,88 @@
+"""
+Ordenação externa de registros com memória limitada: os registros são divididos em corridas ordenadas que cabem no
+orçamento de memória, gravadas em arquivos temporários, e depois intercaladas com um heap (intercalação de k vias).
+"""
+
+import heapq
+import sys
+import tempfile
+
+MEMORY_BUDGET = 64 * 1024 * 1024
+MERGE_FAN_IN = 64
+RUN_BUFFER_SIZE = 64 * 1024
+
+def _record_memory(record, key):
+    # Memory held by a buffered record, its key and the list entry that holds them
+    return sys.getsizeof(record) + sys.getsizeof(key) + 64
+
+def _text(record):
+    return record
+
+def _run_file(temp_dir, open_files):
+    # Every run file is kept in open_files, so that the runs left open by an error are closed and removed
+    run_file = tempfile.TemporaryFile(mode='w+', dir=temp_dir, buffering=RUN_BUFFER_SIZE)
+    open_files.append(run_file)
+    return run_file
+
+def _write_run(run, temp_dir, encode, open_files):
+    # Runs are stored one record per line, the records are read back without their line break
+    run_file = _run_file(temp_dir=temp_dir, open_files=open_files)
+    for (key, record) in run:
+        run_file.write(encode(record) + '\n')
+    run_file.seek(0, 0)
+    return run_file
+
+def _read_run(run_file, decode):
+    for line in run_file:
+        yield decode(line[:-1])
+    run_file.close()
+
+def _merge_runs(run_files, key, temp_dir, encode, decode, open_files):
+    # Merges at most MERGE_FAN_IN runs at a time, so that the number of open files is bounded
+    while len(run_files) > MERGE_FAN_IN:
+        merged_run_files = []
+        for i in range(0, len(run_files), MERGE_FAN_IN):
+            runs = [_read_run(run_file=run_file, decode=decode) for run_file in run_files[i:i + MERGE_FAN_IN]]
+            merged_run_file = _run_file(temp_dir=temp_dir, open_files=open_files)
+            for record in heapq.merge(*runs, key=key):
+                merged_run_file.write(encode(record) + '\n')
+            merged_run_file.seek(0, 0)
+            merged_run_files.append(merged_run_file)
+        run_files = merged_run_files
+    runs = [_read_run(run_file=run_file, decode=decode) for run_file in run_files]
+    return heapq.merge(*runs, key=key)
+
+def external_sort(records, key, memory_budget=MEMORY_BUDGET, temp_dir=None, encode=_text, decode=_text):
+    # Yields the records ordered by key, holding at most memory_budget bytes of records in memory,
+    # each key is computed once while the runs are formed and once per merge pass,
+    # records that are not text are written to the runs as encode(record) and read back with decode
+    run = []
+    run_memory = 0
+    run_files = []
+    open_files = []
+    try:
+        for record in records:
+            record_key = key(record)
+            run.append((record_key, record))
+            run_memory += _record_memory(record=record, key=record_key)
+            if run_memory >= memory_budget:
+                run.sort(key=lambda item: item[0])
+                run_files.append(_write_run(run=run, temp_dir=temp_dir, encode=encode, open_files=open_files))
+                run = []
+                run_memory = 0
+        run.sort(key=lambda item: item[0])
+        # Records that fit in the memory budget are never written to disk
+        if run_files == []:
+            for (record_key, record) in run:
+                yield record
+            return
+        if run != []:
+            run_files.append(_write_run(run=run, temp_dir=temp_dir, encode=encode, open_files=open_files))
+        run = []
+        for record in _merge_runs(run_files=run_files, key=key, temp_dir=temp_dir, encode=encode, decode=decode, open_files=open_files):
+            yield record
+    finally:
+        # Runs are closed, and so removed, also when the records or their keys raise an error, or when the sorted
+        # records are not read to the end
+        for run_file in open_files:
+            run_file.close()
@@ -6,10 +6,13 @@ import math
 from datetime import datetime
 
 from Util import infer_types_from_record, check_interval, generate_range
+from Buffered_Reader import Buffered_Reader, read_line, read_lines
+from Header_Layout import Header_Layout, write_header
 
 class Fixed_Size_Heap:
     def __init__(self, block_size):
         self.block_size = block_size
+        self.layout = None
 
     def _set_field_names(self, fields_names):
         self.field_names = fields_names.strip().split(',')
@@ -26,73 +29,65 @@ class Fixed_Size_Heap:
     def _set_blocking_factor(self):
         self.blocking_factor = math.floor(self.block_size / self.record_size)
 
-    def _read_line(self, file):
-        char = file.read(1)
-        line = ''
-
-        while char and char != '\n':
-            line += char
-            char = file.read(1)
-        return line
-
     def _read_csv_header(self, file):
-        csv_header = self._read_line(file=file)
+        csv_header = read_line(file=file)
         self._set_field_names(fields_names=csv_header)
 
     def _calculate_csv_field_sizes(self, file):
         field_sizes = dict()
         for field in self.field_names:
             field_sizes[field] = 0
-        record = self._read_line(file=file)
         self.number_of_records = 0
-        self._set_field_types(record=record)
-        while record != '':
+        for record in file.read_records():
+            # Sets record field types from the first record
+            if self.number_of_records == 0:
+                self._set_field_types(record=record)
             self.number_of_records += 1
             record_fields = record.strip().split(',')
             for i in range(len(self.field_names)):
                 if len(record_fields[i]) > field_sizes[self.field_names[i]]:
                     field_sizes[self.field_names[i]] = int(len(record_fields[i]))
-            record = self._read_line(file=file)
         self._set_field_sizes(field_sizes=list(field_sizes.values()))
     
     def _write_txt_header(self, txt_file, txt_filepath):
-        # Sets txt_file cursor at the beginning of the file
-        txt_file.seek(0, 0)
+        header = ''
         # Write table name
         table_name = txt_filepath.split('/')[2].split('.')[0]
-        txt_file.write(table_name + '\n')
+        header += table_name + '\n'
         # Write field names, sizes, types
         field_names = ','.join(str(field_name) for field_name in self.field_names) + '\n'
         field_sizes = ','.join(str(field_size) for field_size in self.field_sizes) + '\n'
         field_types = ','.join(str(field_type) for field_type in self.field_types) + '\n'
-        txt_file.write(field_names)
-        txt_file.write(field_sizes)
-        txt_file.write(field_types)
+        header += field_names
+        header += field_sizes
+        header += field_types
         # Write number of records
-        txt_file.write(str(self.number_of_records) + '\n')
+        header += str(self.number_of_records) + '\n'
         # Write blocking factor
-        txt_file.write(str(self.blocking_factor) + '\n')
+        header += str(self.blocking_factor) + '\n'
         # Write list of deleted records
         if self.deleted_records == [] or self.deleted_records == None:
-            txt_file.write('\n')
+            header += '\n'
         else:
             txt_deleted_records = ''
             for deleted_record in self.deleted_records:
                 txt_deleted_records += f'{deleted_record[0]}:{deleted_record[1]},'
             txt_deleted_records += '\n'
-            txt_file.write(txt_deleted_records)
+            header += txt_deleted_records
         # Write creation timestamp
         if self.creation_date == None:
             creation_timestamp = datetime.now()
             creation_timestamp = creation_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            txt_file.write(creation_timestamp + '\n')
+            header += creation_timestamp + '\n'
         else:
-            txt_file.write(self.creation_date + '\n')
+            header += self.creation_date + '\n'
         # Write alteration timestamp
         alteration_timestamp = datetime.now()
         alteration_timestamp = alteration_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        txt_file.write(alteration_timestamp + '\n')
-    
+        header += alteration_timestamp + '\n'
+        # Rewrites the header in place, moving the blocks if it outgrew its space
+        self.layout = write_header(txt_file=txt_file, header=header, layout=self.layout, block_size=self.block_size)
+
     def _padding(self, record_field, field_id):
         diff = self.field_sizes[field_id] - len(record_field)
         padded_record_field = record_field + (' ' * diff)
@@ -115,7 +110,7 @@ class Fixed_Size_Heap:
         block = ''
         remaining_records = self.number_of_records - (self.number_of_records % self.blocking_factor)
         for i in range(1, self.number_of_records+1):
-            record = self._read_line(file=csv_file)
+            record = read_line(file=csv_file)
             try:
                 formatted_record = self._format_record(record=record)
                 block += formatted_record
@@ -139,13 +134,13 @@ class Fixed_Size_Heap:
         # Return to begin of csv_file
         csv_file.seek(0, 0)
         # Skip csv_file header
-        self._read_line(csv_file)
+        read_line(csv_file)
         # Write txt file records
         self._write_txt_records(txt_file=txt_file, csv_file=csv_file)
         txt_file.close()
 
     def from_csv_to_txt(self, csv_filepath):
-        file = open(csv_filepath, 'r+')
+        file = Buffered_Reader(filepath=csv_filepath)
         self._read_csv_header(file=file)
         self._calculate_csv_field_sizes(file=file)
         self._set_record_size()
@@ -155,14 +150,6 @@ class Fixed_Size_Heap:
         self._write_from_csv_to_txt(csv_file=file, csv_filepath=csv_filepath)
         file.close()
     
-    def _header_length(self, file):
-        header_length = 0
-        for i in range(0, 9):
-            file.seek(header_length, 0)
-            line = self._read_line(file)
-            header_length += len(line)+1
-        return header_length
-
     def _read_txt_deleted_records(self, txt_deleted_records):
         self.deleted_records = []
         if txt_deleted_records.strip() != '':
@@ -172,16 +159,19 @@ class Fixed_Size_Heap:
                 self.deleted_records.append([i, j])
 
     def _read_txt_header(self, file):
-        self.table_name = self._read_line(file)
-        self.field_names = self._read_line(file).strip().split(',')
-        self.field_sizes = self._read_line(file).strip().split(',')
+        header_lines = read_lines(file=file, number_of_lines=9)
+        self.table_name = header_lines[0]
+        self.field_names = header_lines[1].strip().split(',')
+        self.field_sizes = header_lines[2].strip().split(',')
         self.field_sizes = [int(field_size) for field_size in self.field_sizes]
-        self.field_types = self._read_line(file).strip().split(',')
-        self.number_of_records = int(self._read_line(file).strip())
-        self.blocking_factor = int(self._read_line(file).strip())
-        self.deleted_records = self._read_txt_deleted_records(self._read_line(file).strip())
-        self.creation_date = self._read_line(file).strip()
-        self.alteration_date = self._read_line(file).strip()
+        self.field_types = header_lines[3].strip().split(',')
+        self.number_of_records = int(header_lines[4].strip())
+        self.blocking_factor = int(header_lines[5].strip())
+        self.deleted_records = self._read_txt_deleted_records(header_lines[6].strip())
+        self.creation_date = header_lines[7].strip()
+        self.alteration_date = header_lines[8].strip()
+        # Computes the header layout once, it only changes when the header is rewritten
+        self.layout = Header_Layout(header_lines=header_lines, block_size=self.block_size)
 
     def _read_txt_file(self, txt_filepath):
         file = open(txt_filepath, 'r+')
@@ -192,13 +182,12 @@ class Fixed_Size_Heap:
         field_size = self.field_sizes[field_id]
         success = False
         number_of_blocks = self.number_of_records // self.blocking_factor
-        header_length = self._header_length(file)
         for i in range(0, number_of_blocks):
             # If found the record and we are doing a select by primary key, end search
             if success and field_id == 0:
                 break
             for j in range(0, self.blocking_factor):
-                offset = header_length + self.block_size * i + i + self.record_size * j
+                offset = self.layout.record_offset(block_id=i, record_id=j, record_size=self.record_size)
                 # Check if end of file
                 file.seek(offset, 0)
                 record = file.read(self.record_size).strip()
@@ -265,8 +254,7 @@ class Fixed_Size_Heap:
         if self.deleted_records:
             # Read from the first deleted record
             block_id, record_id = self.deleted_records[0]
-            offset = self._header_length(file)
-            offset += self.block_size * block_id + block_id
+            offset = self.layout.block_offset(block_id=block_id)
             file.seek(offset, 0)
             block = file.read(self.block_size)
             
@@ -281,8 +269,7 @@ class Fixed_Size_Heap:
             self.deleted_records.pop(0)
         
         else:
-            offset = self._header_length(file)
-            offset += self.block_size * block_id + block_id
+            offset = self.layout.block_offset(block_id=block_id)
             file.seek(offset, 0)
             block = file.read(self.block_size)
             
@@ -335,8 +322,7 @@ class Fixed_Size_Heap:
         file.close()
 
     def _select(self, select_container, block_id, record_id, file):
-        offset = self._header_length(file)
-        offset += self.block_size * block_id + block_id + self.record_size * record_id
+        offset = self.layout.record_offset(block_id=block_id, record_id=record_id, record_size=self.record_size)
         file.seek(offset, 0)
         record = file.read(self.record_size)
         select_container.append(record)
@@ -412,8 +398,7 @@ class Fixed_Size_Heap:
 
     def _delete_record(self, block_id, record_id, file):
         # Read block
-        offset = self._header_length(file)
-        offset += self.block_size * block_id + block_id
+        offset = self.layout.block_offset(block_id=block_id)
         file.seek(offset, 0)
         block = file.read(self.block_size)
         # Deletes record from block
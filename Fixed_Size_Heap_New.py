@@ -5,12 +5,35 @@ Implementação da Heap com registros de tamanho fixo.
 import math
 from datetime import datetime
 
-from Util import infer_types_from_record, check_interval, generate_range
+from Util import check_interval, interval_contains
+from Buffered_Reader import Buffered_Reader, read_line, read_lines
+from Header_Layout import Header_Layout, write_header
+from Block_Manager import Block_Manager, DELETED_MARK
+from Buffer_Pool import BUFFER_POOL
+from Io_Metrics import Io_Counters, measured_operation
+from Record_Format import TEXT_FORMAT, record_format
+from Secondary_Index import Secondary_Indexes, has_index_files
+from Schema import Schema, read_csv_schema
+from Record_Validator import Record_Validator, invalid_records_message
+
+# Blocks are formatted in a buffer of this many bytes, which is written at once when it is full
+WRITE_BUFFER_SIZE = 1024 * 1024
 
 class Fixed_Size_Heap:
-    def __init__(self, block_size):
+    def __init__(self, block_size, buffer_pool=BUFFER_POOL, metrics_sink=None):
         self.block_size = block_size
-        self.accessed_blocks = 0
+        # Blocks are read and written through the buffer pool
+        self.buffer_pool = buffer_pool
+        self.blocks_manager = None
+        self.layout = None
+        self.opened_txt_filepath = None
+        self.opened_txt_file = None
+        self.secondary_indexes = None
+        # I/O of the operations, the statistics of the last operation are also given to the metrics sink
+        self.io_counters = Io_Counters()
+        self.metrics_sink = metrics_sink
+        self.last_operation_stats = None
+        self.operation_in_progress = False
 
     def _set_field_names(self, fields_names):
         self.field_names = fields_names.strip().split(',')
@@ -18,216 +41,353 @@ class Fixed_Size_Heap:
     def _set_field_sizes(self, field_sizes):
         self.field_sizes = field_sizes
     
-    def _set_field_types(self, record):
-        self.field_types = infer_types_from_record(record, len(self.field_names))
+    def _set_schema(self, schema):
+        self.schema = schema
+        self.field_names = schema.field_names
+        self.field_types = schema.field_types
+        self._set_field_sizes(field_sizes=schema.field_sizes)
+        self.record_validator = Record_Validator(schema=schema)
+
+    def _set_record_format(self, page_format):
+        self.record_format = record_format(page_format=page_format, field_sizes=self.field_sizes, field_types=self.field_types)
 
     def _set_record_size(self):
-        self.record_size = sum(self.field_sizes) + len(self.field_sizes)
+        self.record_size = self.record_format.record_size
     
     def _set_blocking_factor(self):
         self.blocking_factor = math.floor(self.block_size / self.record_size)
 
-    def _read_line(self, file):
-        char = file.read(1)
-        line = ''
-
-        while char and char != '\n':
-            line += char
-            char = file.read(1)
-        return line
-
     def _read_csv_header(self, file):
-        csv_header = self._read_line(file=file)
+        csv_header = read_line(file=file)
         self._set_field_names(fields_names=csv_header)
 
-    def _calculate_csv_field_sizes(self, file):
-        field_sizes = dict()
-        for field in self.field_names:
-            field_sizes[field] = 0
-        record = self._read_line(file=file)
-        self.number_of_records = 0
-        self._set_field_types(record=record)
-        while record != '':
-            self.number_of_records += 1
-            record_fields = record.strip().split(',')
-            for i in range(len(self.field_names)):
-                if len(record_fields[i]) > field_sizes[self.field_names[i]]:
-                    field_sizes[self.field_names[i]] = int(len(record_fields[i]))
-            record = self._read_line(file=file)
-        self._set_field_sizes(field_sizes=list(field_sizes.values()))
-    
+    def _read_csv_schema(self, file, schema):
+        # The csv is only read for the field types and sizes that were not given
+        schema, number_of_records = read_csv_schema(csv_file=file, field_names=self.field_names, schema=schema)
+        self._set_schema(schema=schema)
+        # Records are counted again while they are written
+        self.number_of_records = number_of_records if number_of_records != None else 0
+
     def _write_txt_header(self, txt_file, txt_filepath):
-        # Sets txt_file cursor at the beginning of the file
-        txt_file.seek(0, 0)
+        header = ''
         # Write table name
         table_name = txt_filepath.split('/')[2].split('.')[0]
-        txt_file.write(table_name + '\n')
+        header += table_name + '\n'
         # Write field names, sizes, types
         field_names = ','.join(str(field_name) for field_name in self.field_names) + '\n'
         field_sizes = ','.join(str(field_size) for field_size in self.field_sizes) + '\n'
         field_types = ','.join(str(field_type) for field_type in self.field_types) + '\n'
-        txt_file.write(field_names)
-        txt_file.write(field_sizes)
-        txt_file.write(field_types)
+        header += field_names
+        header += field_sizes
+        header += field_types
+        # Write primary key
+        header += self.schema.primary_key + '\n'
+        # Write page format
+        header += self.record_format.page_format + '\n'
         # Write number of records
-        txt_file.write(str(self.number_of_records) + '\n')
+        header += str(self.number_of_records) + '\n'
         # Write blocking factor
-        txt_file.write(str(self.blocking_factor) + '\n')
+        header += str(self.blocking_factor) + '\n'
         # Write number of blocks
-        txt_file.write(str(self.number_of_blocks) + '\n')
+        header += str(self.number_of_blocks) + '\n'
         # Write list of deleted records
         if self.deleted_records == [] or self.deleted_records == None:
-            txt_file.write('\n')
+            header += '\n'
         else:
             txt_deleted_records = ''
             for deleted_record in self.deleted_records:
                 txt_deleted_records += f'{deleted_record[0]}:{deleted_record[1]},'
             txt_deleted_records += '\n'
-            txt_file.write(txt_deleted_records)
+            header += txt_deleted_records
         # Write creation timestamp
         if self.creation_date == None:
             creation_timestamp = datetime.now()
             creation_timestamp = creation_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            txt_file.write(creation_timestamp + '\n')
+            header += creation_timestamp + '\n'
         else:
-            txt_file.write(self.creation_date + '\n')
+            header += self.creation_date + '\n'
         # Write alteration timestamp
         alteration_timestamp = datetime.now()
         alteration_timestamp = alteration_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        txt_file.write(alteration_timestamp + '\n')
-    
-    def _padding(self, record_field, field_id):
-        diff = self.field_sizes[field_id] - len(record_field)
-        padded_record_field = record_field + (' ' * diff)
-        return padded_record_field
+        header += alteration_timestamp + '\n'
+        # Rewrites the header in place, moving the blocks if it outgrew its space
+        self.layout = write_header(txt_file=txt_file, header=header, layout=self.layout, block_size=self.block_size, io_counters=self.io_counters)
+        # Blocks of the table being written are found after the rewritten header
+        if self.blocks_manager != None and self.blocks_manager.file is txt_file:
+            self.blocks_manager.refresh(layout=self.layout)
 
     def _format_record(self, record):
-        formatted_record = ''
-        record_fields = record.strip().split(',')
-        for i in range(len(self.field_names)):
-            if len(record_fields[i]) < self.field_sizes[i]:
-                padded_record_field = self._padding(record_field=record_fields[i], field_id=i)
-                formatted_record += padded_record_field + ','
-            else:
-                formatted_record += record_fields[i] + ','
-        return formatted_record
-
-    def _write_txt_records(self, txt_file, csv_file):
-        block_remaining = self.block_size - self.blocking_factor * self.record_size
-        block_padding = "#" * block_remaining
-        block = ''
-        remaining_records = self.number_of_records - (self.number_of_records // self.blocking_factor)
-        for i in range(1, self.number_of_records+1):
-            record = self._read_line(file=csv_file)
+        return self.record_format.encode_record(record=record)
+
+    def _write_txt_records(self, txt_file, records):
+        # Records are formatted into a preallocated buffer of whole blocks, which is written when it is full
+        block_stride = self.block_size + 1
+        blocks_per_write = max(1, WRITE_BUFFER_SIZE // block_stride)
+        buffer = bytearray((b'#' * self.block_size + b'\n') * blocks_per_write)
+        # Offset of each record in the buffer, the padding at the end of the blocks is never overwritten
+        record_offsets = [block_stride * (k // self.blocking_factor) + self.record_size * (k % self.blocking_factor) for k in range(0, blocks_per_write * self.blocking_factor)]
+        number_of_records = 0
+        k = 0
+        for record in records:
             try:
                 formatted_record = self._format_record(record=record)
-                block += formatted_record
-                if i % self.blocking_factor == 0:
-                    block += block_padding + '\n'
-                    txt_file.write(block)
-                    block = ''
-                elif i == self.number_of_records:
-                    additional_padding = "#" * (self.block_size - self.record_size * remaining_records)
-                    block += additional_padding + '\n'
-                    txt_file.write(block)
             except:
                 raise Exception(f"WriteError: Could Not Write Record: {record}")
+            # Fields longer than their sizes would overwrite the next record
+            if len(formatted_record) != self.record_size:
+                raise Exception(f"WriteError: Could Not Write Record: {record}")
+            buffer[record_offsets[k]:record_offsets[k] + self.record_size] = formatted_record
+            k += 1
+            if k == len(record_offsets):
+                txt_file.write(buffer)
+                number_of_records += k
+                k = 0
+        # Writes the last blocks, the records of the previous write left in the last block are padded
+        if k > 0:
+            number_of_blocks = math.ceil(k / self.blocking_factor)
+            last_record_end = record_offsets[k - 1] + self.record_size
+            last_block_end = block_stride * number_of_blocks - 1
+            buffer[last_record_end:last_block_end] = b'#' * (last_block_end - last_record_end)
+            txt_file.write(memoryview(buffer)[:block_stride * number_of_blocks])
+            number_of_records += k
+        return number_of_records
 
-    def _write_from_csv_to_txt(self, csv_file, csv_filepath):
-        # Create txt file
-        txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
-        txt_file = open(txt_filepath, 'w')
+    def _write_records_to_txt(self, records, txt_filepath):
+        # Create txt file, records are written as bytes in both page formats
+        txt_file = open(txt_filepath, 'wb+')
         # Write txt file header
         self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
+        # Write txt file records
+        self.number_of_records = self._write_txt_records(txt_file=txt_file, records=records)
+        self._set_number_of_blocks()
+        # The blocks are written sequentially after the header
+        self.io_counters.count_write(number_of_blocks=self.number_of_blocks, number_of_bytes=txt_file.tell() - self.layout.data_start, seek=False)
+        # The header is written again with the number of records and blocks written
+        self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
+        txt_file.close()
+        # Blocks of the previous table that are still in the buffer pool are dropped
+        self.buffer_pool.discard(filepath=txt_filepath)
+
+    def _write_from_csv_to_txt(self, csv_file, csv_filepath):
+        txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
         # Return to begin of csv_file
         csv_file.seek(0, 0)
         # Skip csv_file header
-        self._read_line(csv_file)
-        # Write txt file records
-        self._write_txt_records(txt_file=txt_file, csv_file=csv_file)
-        txt_file.close()
+        read_line(csv_file)
+        self._write_records_to_txt(records=csv_file.read_records(), txt_filepath=txt_filepath)
 
-    def from_csv_to_txt(self, csv_filepath):
-        file = open(csv_filepath, 'r+')
+    def _set_number_of_blocks(self):
+        # The last block is counted even if it is not full
+        self.number_of_blocks = math.ceil(self.number_of_records / self.blocking_factor)
+
+    @measured_operation
+    def from_csv_to_txt(self, csv_filepath, page_format=TEXT_FORMAT, primary_key_index=False, schema=None):
+        file = Buffered_Reader(filepath=csv_filepath)
         self._read_csv_header(file=file)
-        self._calculate_csv_field_sizes(file=file)
+        # A schema with the field sizes skips the pass over the csv that computes them, so the csv is read only once
+        self._read_csv_schema(file=file, schema=schema)
+        self._set_record_format(page_format=page_format)
         self._set_record_size()
         self._set_blocking_factor()
-        self.number_of_blocks = self.number_of_records // self.blocking_factor
+        self._set_number_of_blocks()
         self.deleted_records = []
         self.creation_date = None
         self._write_from_csv_to_txt(csv_file=file, csv_filepath=csv_filepath)
         file.close()
-    
-    def _header_length(self, file):
-        header_length = 0
-        for i in range(0, 10):
-            file.seek(header_length, 0)
-            line = self._read_line(file)
-            header_length += len(line)+1
-        return header_length
+        # Indexes of a previous table with the same name are built again
+        txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+        self._rebuild_secondary_indexes(txt_filepath=txt_filepath)
+        # The primary key index, if requested, is created with the table
+        if primary_key_index:
+            self._create_primary_key_index(txt_filepath=txt_filepath)
 
-    def _read_txt_deleted_records(self, txt_deleted_records):
+    @measured_operation
+    def convert_page_format(self, txt_filepath, converted_txt_filepath, page_format):
+        # Rewrites the table in another page format, compacting its blocks
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        self.blocks_manager.refresh(layout=self.layout)
+        records = []
+        for i in range(0, self.number_of_blocks):
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                records.append(self.record_format.decode_record(record=record))
+        self._close_txt_file(file=file)
+        self._set_record_format(page_format=page_format)
+        self._set_record_size()
+        self._set_blocking_factor()
+        self.number_of_records = len(records)
+        self._set_number_of_blocks()
         self.deleted_records = []
+        self._write_records_to_txt(records=records, txt_filepath=converted_txt_filepath)
+        self._rebuild_secondary_indexes(txt_filepath=converted_txt_filepath)
+
+    def _read_txt_deleted_records(self, txt_deleted_records):
+        deleted_records = []
         if txt_deleted_records.strip() != '':
             for deleted_record in txt_deleted_records[:-1].split(','):
-                i = deleted_record.split(':')[0]
-                j = deleted_record.split(':')[1]
-                self.deleted_records.append([i, j])
+                i = int(deleted_record.split(':')[0])
+                j = int(deleted_record.split(':')[1])
+                deleted_records.append([i, j])
+        return deleted_records
 
     def _read_txt_header(self, file):
-        self.table_name = self._read_line(file)
-        self.field_names = self._read_line(file).strip().split(',')
-        self.field_sizes = self._read_line(file).strip().split(',')
-        self.field_sizes = [int(field_size) for field_size in self.field_sizes]
-        self.field_types = self._read_line(file).strip().split(',')
+        header_lines = read_lines(file=file, number_of_lines=12)
+        self.table_name = header_lines[0]
+        field_names = header_lines[1].strip().split(',')
+        field_sizes = [int(field_size) for field_size in header_lines[2].strip().split(',')]
+        field_types = header_lines[3].strip().split(',')
+        self._set_schema(schema=Schema(field_names=field_names, field_types=field_types, field_sizes=field_sizes, primary_key=header_lines[4].strip()))
+        self._set_record_format(page_format=header_lines[5].strip())
         self._set_record_size()
         self._set_blocking_factor()
-        self.number_of_records = int(self._read_line(file).strip())
-        self.blocking_factor = int(self._read_line(file).strip())
-        self.number_of_blocks = int(self._read_line(file).strip())
-        self.deleted_records = self._read_txt_deleted_records(self._read_line(file).strip())
-        self.creation_date = self._read_line(file).strip()
-        self.alteration_date = self._read_line(file).strip()
+        self.number_of_records = int(header_lines[6].strip())
+        self.blocking_factor = int(header_lines[7].strip())
+        self.number_of_blocks = int(header_lines[8].strip())
+        self.deleted_records = self._read_txt_deleted_records(header_lines[9].strip())
+        self.creation_date = header_lines[10].strip()
+        self.alteration_date = header_lines[11].strip()
+        # Computes the header layout once, it only changes when the header is rewritten
+        self.layout = Header_Layout(header_lines=header_lines, block_size=self.block_size)
 
     def _read_txt_file(self, txt_filepath):
-        file = open(txt_filepath, 'r+')
+        # If the table is open, reuses its file and its already parsed header
+        if self._is_open(txt_filepath=txt_filepath):
+            return self.opened_txt_file
+        # Opened as bytes, since binary pages are not text
+        file = open(txt_filepath, 'rb+')
         self._read_txt_header(file=file)
+        self.blocks_manager = Block_Manager(file=file, layout=self.layout, block_size=self.block_size, buffer_pool=self.buffer_pool, io_counters=self.io_counters)
+        self.secondary_indexes = Secondary_Indexes(txt_filepath=txt_filepath, field_names=self.field_names, field_types=self.field_types)
         return file
 
+    def _is_open(self, txt_filepath):
+        return self.opened_txt_file != None and self.opened_txt_filepath == txt_filepath
+
+    def _close_txt_file(self, file):
+        # The file of an open table is only closed by close_table
+        if file is not self.opened_txt_file:
+            self.blocks_manager.flush(layout=self.layout)
+            self.blocks_manager.release()
+            self.secondary_indexes.close()
+            file.close()
+
+    @measured_operation
+    def open_table(self, txt_filepath):
+        if self.opened_txt_file != None:
+            self.close_table()
+        self.opened_txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self.opened_txt_filepath = txt_filepath
+
+    @measured_operation
+    def flush_table(self):
+        self.blocks_manager.flush(layout=self.layout)
+        self.opened_txt_file.flush()
+        self.secondary_indexes.flush()
+
+    @measured_operation
+    def close_table(self):
+        self.flush_table()
+        self.blocks_manager.release()
+        self.secondary_indexes.close()
+        self.opened_txt_file.close()
+        self.opened_txt_file = None
+        self.opened_txt_filepath = None
+
+    def _scan_records(self):
+        # Yields the position and the text of every record of the table
+        self.blocks_manager.refresh(layout=self.layout)
+        for i in range(0, self.number_of_blocks):
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                yield i, j, self.record_format.decode_record(record=record)
+
+    def _search_index(self, field_id, value):
+        # Positions of the records with the value, read from the secondary index of the field
+        self.blocks_manager.refresh(layout=self.layout)
+        success = False
+        for (i, j) in self.secondary_indexes.search(field_id=field_id, value=value):
+            yield [i, j]
+            success = True
+        self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+        if not success:
+            yield [-1, -1]
+
     def _search(self, field_id, value, file):
-        field_size = self.field_sizes[field_id]
+        # Fields with a secondary index are looked up in it instead of scanning the blocks
+        if self.secondary_indexes.has_index(field_id=field_id):
+            for (i, j) in self._search_index(field_id=field_id, value=value):
+                yield [i, j]
+            return
+        # Compares the padded value against the field bytes of each record, without decoding the records
+        field_slice = self.record_format.field_slice(field_id=field_id)
+        encoded_value = self.record_format.encode_field(field_id=field_id, value=value)
+        self.blocks_manager.refresh(layout=self.layout)
         success = False
-        header_length = self._header_length(file)
-        for i in range(0, self.number_of_blocks+1):
-            self.accessed_blocks += 1
+        for i in range(0, self.number_of_blocks):
             # If found the record and we are doing a select by primary key, end search
             if success and field_id == 0:
                 break
             # Checks if record is in block[i]
-            offset = header_length + self.block_size * i + i
-            file.seek(offset, 0)
-            block = file.read(self.block_size)
-            number_of_records_in_block = len(block.strip('#')) // self.record_size
-            for j in range(0, number_of_records_in_block):
-                if success and field_id == 0:
-                    break
-                record = block[j * self.record_size: (j + 1) * self.record_size]
-                record_fields = record.strip().split(',')
-                record_field_value = record_fields[field_id].strip()
-                if value == record_field_value:
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                if record[field_slice] == encoded_value:
                     yield [i, j]
                     success = True
+                    if field_id == 0:
+                        break
         # If failed to find record
         if not success:
             yield [-1, -1]
 
+    def _search_primary_keys(self, keys):
+        # With a primary key index, each key is looked up in it instead of scanning the blocks
+        if self.secondary_indexes.has_index(field_id=0):
+            self.blocks_manager.refresh(layout=self.layout)
+            positions = dict()
+            for key in keys:
+                for (i, j) in self.secondary_indexes.search(field_id=0, value=key):
+                    positions[key] = [i, j]
+            self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+            return positions
+        # Single pass over the blocks, looking up the primary key of each record in the requested keys
+        field_slice = self.record_format.field_slice(field_id=0)
+        encoded_keys = dict()
+        for key in keys:
+            encoded_key = self.record_format.encode_field(field_id=0, value=key)
+            if encoded_key != None:
+                encoded_keys[encoded_key] = key
+        positions = dict()
+        self.blocks_manager.refresh(layout=self.layout)
+        for i in range(0, self.number_of_blocks):
+            # Primary keys are unique, so the search ends when every key was found
+            if len(positions) == len(encoded_keys):
+                break
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                key = encoded_keys.get(bytes(record[field_slice]))
+                if key != None:
+                    positions[key] = [i, j]
+        return positions
+
+    def _search_interval(self, field_id, start, end):
+        # Fields with a secondary index are looked up in it instead of scanning the blocks
+        if self.secondary_indexes.has_index(field_id=field_id):
+            self.blocks_manager.refresh(layout=self.layout)
+            for (i, j) in self.secondary_indexes.search_interval(field_id=field_id, start=start, end=end):
+                yield [i, j]
+            self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+            return
+        # Single pass over the blocks, comparing each field as a typed value
+        field_type = self.field_types[field_id]
+        start_key = self.record_format.value_key(field_id=field_id, value=start)
+        end_key = self.record_format.value_key(field_id=field_id, value=end)
+        self.blocks_manager.refresh(layout=self.layout)
+        for i in range(0, self.number_of_blocks):
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                record_key = self.record_format.field_key(field_id=field_id, record=record)
+                if interval_contains(interval_type=field_type, value=record_key, start=start_key, end=end_key):
+                    yield [i, j]
+
     def _check_record_type_constraint(self, record):
-        record_fields = record.strip().split(',')
-        record_field_types = infer_types_from_record(record, len(record_fields))
-        for i in range(len(self.field_names)):
-            if record_field_types[i] != self.field_types[i]:
-                return -1
+        # Each field is checked by the check of its type, compiled with the schema
+        if not self.schema.check_record_types(record=record):
+            return -1
         return 0
     
     def _check_record_size_constraint(self, record):
@@ -245,6 +405,11 @@ class Fixed_Size_Heap:
             return -1
         return 0
 
+    def _invalid_records(self, records, file):
+        # Every invalid record is reported with its reasons, primary keys are checked in a single search
+        records_primary_keys = [record.strip().split(',')[0] for record in records]
+        return self.record_validator.validate(records=records, primary_keys=records_primary_keys, search_primary_keys=lambda keys : self._search_primary_keys(keys=keys))
+
     def _check_record_integrity(self, record, file):
         record_type_constraint = self._check_record_type_constraint(record=record)
         if record_type_constraint == -1:
@@ -257,174 +422,143 @@ class Fixed_Size_Heap:
             return -1
         return 0
 
+    def _number_of_used_slots(self, block):
+        # Slots after the last record are free, the block is not stripped since binary records may end with '#'
+        for j in range(self.blocking_factor - 1, -1, -1):
+            if self.record_size * j < len(block) and block[self.record_size * j] != DELETED_MARK:
+                return j + 1
+        return 0
+
     def _insert(self, record, file):
         if len(record) != self.record_size:
             raise Exception("InsertionError: Incorrect Record Format.")
         
         # Check if there is a deleted record to reuse space
         if self.deleted_records:
-            self.accessed_blocks += 1
             # Read from the first deleted record
             block_id, record_id = self.deleted_records[0]
-            offset = self._header_length(file)
-            offset += self.block_size * block_id + block_id
-            file.seek(offset, 0)
-            block = file.read(self.block_size)
+            block = bytes(self.blocks_manager.block(block_id=block_id))
             
             # Write record to block
             head = block[:self.record_size * record_id]
             tail = block[self.record_size * (record_id + 1):]
-            block = head + record + tail + '\n'
+            block = head + record + tail
             
             # Write block back to file
-            file.seek(offset, 0)
-            file.write(block)
+            self.blocks_manager.write_block(block_id=block_id, block=block)
             self.deleted_records.pop(0)
             self.number_of_records += 1
+            position = [block_id, record_id]
         else:
             # If not, then get the last block
-            offset = self._header_length(file)
-            offset += self.block_size * (self.number_of_blocks - 1) + (self.number_of_blocks - 1)
-            file.seek(offset, 0)
-            block = file.read(self.block_size)
-            self.accessed_blocks += 1
+            block = bytes(self.blocks_manager.block(block_id=self.number_of_blocks - 1))
 
             # Check if there is space available in the last block
-            number_of_records_in_block = len(block.strip('#')) // self.record_size
+            number_of_records_in_block = self._number_of_used_slots(block=block)
             if number_of_records_in_block < self.blocking_factor:
                 # If there is, then write record to last block
                 body = block[:self.record_size * number_of_records_in_block]
-                padding = "#" * (self.block_size - self.record_size * (number_of_records_in_block + 1))
-                block = body + record + padding + '\n'
-                file.seek(offset, 0)
-                file.write(block)
+                padding = b"#" * (self.block_size - self.record_size * (number_of_records_in_block + 1))
+                block = body + record + padding
+                self.blocks_manager.write_block(block_id=self.number_of_blocks - 1, block=block)
                 self.number_of_records += 1
+                position = [self.number_of_blocks - 1, number_of_records_in_block]
             else:
                 # If there is not, then create a new block
-                self.accessed_blocks += 1
-                padding = "#" * (self.block_size - self.record_size)
-                block = record + padding + '\n'
+                padding = b"#" * (self.block_size - self.record_size)
+                block = record + padding
                 # Writes new block to the end of the file
-                offset = self._header_length(file)
-                offset += self.block_size * self.number_of_blocks + self.number_of_blocks
-                file.seek(offset, 0)
-                file.write(block)
+                self.blocks_manager.write_block(block_id=self.number_of_blocks, block=block)
+                position = [self.number_of_blocks, 0]
                 self.number_of_blocks += 1
                 self.number_of_records += 1
+        # Adds the record to the secondary indexes
+        if self.secondary_indexes.has_indexes():
+            self.secondary_indexes.insert_record(record=self.record_format.decode_record(record=record), block_id=position[0], record_id=position[1])
 
+    @measured_operation
     def insert_single_record(self, txt_filepath, record):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         # Check if the record respects the database integrity restriction
         record_integrity = self._check_record_integrity(record=record, file=file)
         if record_integrity == -1:
-            file.close()
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
+            self._close_txt_file(file=file)
             raise Exception('InsertError: Invalid Record.')
         # Formats and inserts record
         formatted_record = self._format_record(record[:-1])
         self._insert(formatted_record, file)
         # Updates txt file header
         self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+        self._close_txt_file(file=file)
 
+    @measured_operation
     def insert_multiple_records(self, txt_filepath, records):
         file = self._read_txt_file(txt_filepath=txt_filepath)
-        # Check if the record respects the database integrity restriction
-        for record in records:
-            record_integrity = self._check_record_integrity(record=record, file=file)
-            if record_integrity == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
-                raise Exception('InsertError: Invalid Record.')
+        # Check if the records respect the database integrity restriction
+        invalid_records = self._invalid_records(records=records, file=file)
+        if invalid_records != []:
+            self._close_txt_file(file=file)
+            raise Exception(invalid_records_message(invalid_records=invalid_records))
         # Formats and inserts records
         for record in records:
             formatted_record = self._format_record(record[:-1])
             self._insert(formatted_record, file)
         # Updates txt file header
         self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+        self._close_txt_file(file=file)
 
     def _select(self, select_container, block_id, record_id, file):
-        offset = self._header_length(file)
-        offset += self.block_size * block_id + block_id + self.record_size * record_id
-        file.seek(offset, 0)
-        record = file.read(self.record_size)
-        select_container.append(record)
+        record = self.blocks_manager.record(block_id=block_id, record_id=record_id, record_size=self.record_size)
+        select_container.append(self.record_format.decode_record(record=record))
 
+    @measured_operation
     def select_by_single_primary_key(self, txt_filepath, key):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         select_container = []
         for (i, j) in self._search(field_id=0, value=key, file=file):
             if i == -1 and j == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._close_txt_file(file=file)
                 raise Exception('SelectionError: Primary Key nonexistent.')
             else:
                 self._select(select_container=select_container, block_id=i, record_id=j, file=file)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+        self._close_txt_file(file=file)
         return select_container
 
+    @measured_operation
     def select_by_multiple_primary_key(self, txt_filepath, keys):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         select_container = []
         exception_counter = 0
+        positions = self._search_primary_keys(keys=keys)
         for key in keys:
-            for (i, j) in self._search(field_id=0, value=key, file=file):
-                if i == -1 and j == -1:
-                    exception_counter += 1
-                else:
-                    self._select(select_container=select_container, block_id=i, record_id=j, file=file)
-        file.close()
+            if key not in positions:
+                exception_counter += 1
+            else:
+                i, j = positions[key]
+                self._select(select_container=select_container, block_id=i, record_id=j, file=file)
+        self._close_txt_file(file=file)
         if exception_counter == len(keys):
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
             raise Exception('SelectionError: Primary Keys nonexistent.')
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
         return select_container
     
+    @measured_operation
     def select_by_field_interval(self, txt_filepath, field, start, end):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         field_id = self.field_names.index(field)
         field_type = self.field_types[field_id]
         possible_field_interval = check_interval(interval_type=field_type, start=start, end=end)
         if possible_field_interval == -1:
-            file.close()
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
-            raise Exception('SelectionError: Field Interval incomputable.')
-        value_range = generate_range(range_type=field_type, start=start, end=end)
-        if value_range == -1:
-            file.close()
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
+            self._close_txt_file(file=file)
             raise Exception('SelectionError: Field Interval incomputable.')
         select_container = []
-        exception_counter = 0
-        for value in value_range:
-            for (i, j) in self._search(field_id=field_id, value=str(value), file=file):
-                if i == -1 and j == -1:
-                    exception_counter += 1
-                else:
-                    self._select(select_container=select_container, block_id=i, record_id=j, file=file)
-        file.close()
-        if exception_counter == len(value_range):
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
+        for (i, j) in self._search_interval(field_id=field_id, start=start, end=end):
+            self._select(select_container=select_container, block_id=i, record_id=j, file=file)
+        self._close_txt_file(file=file)
+        if select_container == []:
             raise Exception('SelectionError: Requested Records nonexistent.')
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
         return select_container
     
+    @measured_operation
     def select_by_single_field_value(self, txt_filepath, field, value):
         # Checks if field exists
         if field not in self.field_names:
@@ -435,72 +569,99 @@ class Fixed_Size_Heap:
         select_container = []
         for (i, j) in self._search(field_id=field_id, value=value, file=file):
             if i == -1 and j == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._close_txt_file(file=file)
                 raise Exception('SelectionError: Field Value nonexistent.')
             else:
                 self._select(select_container=select_container, block_id=i, record_id=j, file=file)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+        self._close_txt_file(file=file)
         return select_container
 
     def _delete_record(self, block_id, record_id, file):
         # Read block
-        offset = self._header_length(file)
-        offset += self.block_size * block_id + block_id
-        file.seek(offset, 0)
-        block = file.read(self.block_size)
-        self.accessed_blocks += 1
+        block = bytes(self.blocks_manager.block(block_id=block_id))
+        # Removes the record from the secondary indexes
+        if self.secondary_indexes.has_indexes():
+            record = block[self.record_size * record_id:self.record_size * (record_id + 1)]
+            self.secondary_indexes.delete_record(record=self.record_format.decode_record(record=record), block_id=block_id, record_id=record_id)
         # Deletes record from block
         head = block[:self.record_size * record_id]
-        body = "#" * self.record_size
+        body = b"#" * self.record_size
         tail = block[self.record_size * (record_id + 1):]
-        block = head + body + tail + '\n'
+        block = head + body + tail
         # Checks if new block has the expected size
-        if len(block) != self.block_size+1:
+        if len(block) != self.block_size:
             raise Exception("DeleteError: Invalid Block Format.")
         # Writes block back to file
-        file.seek(offset, 0)
-        file.write(block)
+        self.blocks_manager.write_block(block_id=block_id, block=block)
         if self.deleted_records == None:
             self.deleted_records = []
         self.deleted_records.append([block_id, record_id])
+        self.number_of_records -= 1
 
+    @measured_operation
     def delete_record_by_primary_key(self, txt_filepath, key):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         # Searchs for position of record to be deleted
         for (i, j) in self._search(field_id=0, value=key, file=file):
             if i == -1 and j == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._close_txt_file(file=file)
                 raise Exception('DeleteError: Primary Key nonexistent.')
             else:
                 # Deletes the record
                 self._delete_record(block_id=i, record_id=j, file=file)
                 # Updates txt file header
                 self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._close_txt_file(file=file)
     
+    @measured_operation
     def delete_record_by_criterion(self, txt_filepath, field, value):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         field_id = self.field_names.index(field)
         # Searchs for positions of records to be deleted
         for (i, j) in self._search(field_id=field_id, value=value, file=file):
             if i == -1 and j == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._close_txt_file(file=file)
                 raise Exception('DeleteError: Field Value nonexistent.')
             else:
                 # Deletes the record
                 self._delete_record(block_id=i, record_id=j, file=file)
         # Updates txt file header
         self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
\ No newline at end of file
+        self._close_txt_file(file=file)
+
+    def _rebuild_secondary_indexes(self, txt_filepath):
+        # Tables without indexes are not read again
+        if not has_index_files(txt_filepath=txt_filepath, field_names=self.field_names):
+            return
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        for field_id in list(self.secondary_indexes.indexes):
+            self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+        self._close_txt_file(file=file)
+
+    def _create_primary_key_index(self, txt_filepath):
+        # Maps each primary key to its block and slot, used by the selections, deletions and the uniqueness check
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        if not self.secondary_indexes.has_index(field_id=0):
+            self.secondary_indexes.create_index(field_id=0, records=self._scan_records())
+        self._close_txt_file(file=file)
+
+    @measured_operation
+    def create_index(self, txt_filepath, field):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        # Checks if field exists
+        if field not in self.field_names:
+            self._close_txt_file(file=file)
+            raise Exception('IndexError: Field nonexistent.')
+        field_id = self.field_names.index(field)
+        # Builds the index from a single scan of the table
+        self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+        self._close_txt_file(file=file)
+
+    @measured_operation
+    def drop_index(self, txt_filepath, field):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        if field not in self.field_names or not self.secondary_indexes.has_index(field_id=self.field_names.index(field)):
+            self._close_txt_file(file=file)
+            raise Exception('IndexError: Index nonexistent.')
+        self.secondary_indexes.drop_index(field_id=self.field_names.index(field))
+        self._close_txt_file(file=file)
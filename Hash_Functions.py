@@ -0,0 +1,90 @@
+"""
+Funções de hash das chaves primárias do Hash Externo Estático, escolhidas ao construir a tabela e guardadas pelo nome no
+cabeçalho: resto da divisão por um primo, multiplicativa (método de Knuth), um misturador de 64 bits (finalizador do
+splitmix64), que espalha chaves sequenciais ou em rajadas, e FNV-1a, para chaves de texto. O número primo de buckets é
+encontrado com o teste de Miller-Rabin.
+"""
+
+MODULO_PRIME = 'modulo_prime'
+MULTIPLICATIVE = 'multiplicative'
+MIXER = 'mixer'
+STRING = 'string'
+HASH_FUNCTIONS = [MODULO_PRIME, MULTIPLICATIVE, MIXER, STRING]
+# Functions of the integer value of the key, the others hash its text
+INTEGER_HASH_FUNCTIONS = [MODULO_PRIME, MULTIPLICATIVE, MIXER]
+
+MASK_64 = 2 ** 64 - 1
+# 2^64 divided by the golden ratio
+GOLDEN_RATIO_64 = 0x9E3779B97F4A7C15
+FNV_OFFSET_BASIS_64 = 0xCBF29CE484222325
+FNV_PRIME_64 = 0x100000001B3
+# Bases for which the Miller-Rabin test is exact for every 64 bit number
+MILLER_RABIN_BASES = [2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37]
+
+def is_prime(n):
+    if n < 2:
+        return False
+    for base in MILLER_RABIN_BASES:
+        if n % base == 0:
+            return n == base
+    # n - 1 = d * 2^s, with d odd
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for base in MILLER_RABIN_BASES:
+        x = pow(base, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for i in range(0, s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def previous_prime(n):
+    # Largest prime not greater than n, or 2, primes are dense enough that only a few numbers are tested
+    for candidate in range(n, 1, -1):
+        if is_prime(candidate):
+            return candidate
+    return 2
+
+def modulo_prime_hash(key, number_of_buckets):
+    return int(key) % number_of_buckets
+
+def multiplicative_hash(key, number_of_buckets):
+    # Fractional part of the key times the golden ratio, scaled to the number of buckets
+    return (((int(key) * GOLDEN_RATIO_64) & MASK_64) * number_of_buckets) >> 64
+
+def mixer_hash(key, number_of_buckets):
+    # Each bit of the key changes about half of the bits of the mixed value
+    z = (int(key) + GOLDEN_RATIO_64) & MASK_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return (z ^ (z >> 31)) % number_of_buckets
+
+def string_hash(key, number_of_buckets):
+    # Keys are hashed without the padding of their field
+    h = FNV_OFFSET_BASIS_64
+    for byte in key.strip().encode():
+        h = ((h ^ byte) * FNV_PRIME_64) & MASK_64
+    return h % number_of_buckets
+
+def default_hash_function(key_type):
+    return MODULO_PRIME if key_type == 'int' else STRING
+
+def make_hash_function(name, number_of_buckets):
+    # Hash function from the text of a key to its bucket
+    hash_functions = {
+        MODULO_PRIME: modulo_prime_hash,
+        MULTIPLICATIVE: multiplicative_hash,
+        MIXER: mixer_hash,
+        STRING: string_hash,
+    }
+    if name not in hash_functions:
+        raise Exception('HashError: Hash function nonexistent.')
+    hash_function = hash_functions[name]
+    return lambda key : hash_function(key, number_of_buckets)
@@ -0,0 +1,54 @@
+"""
+Layout do cabeçalho dos arquivos txt, calculado uma única vez a cada leitura ou escrita do cabeçalho.
+"""
+
+# Free space left at the end of the header, so that it can grow without overwriting the first block
+HEADER_RESERVE = 64
+
+class Header_Layout:
+    def __init__(self, header_lines, block_size):
+        # Each header line is followed by a new line character
+        self.header_length = sum(len(header_line) + 1 for header_line in header_lines)
+        # Blocks start right after the header
+        self.data_start = self.header_length
+        # Each block is followed by a new line character
+        self.block_stride = block_size + 1
+
+    def block_offset(self, block_id):
+        return self.data_start + self.block_stride * block_id
+
+    def record_offset(self, block_id, record_id, record_size):
+        return self.block_offset(block_id=block_id) + record_size * record_id
+
+def write_header(txt_file, header, layout, block_size, io_counters=None):
+    txt_file.seek(0, 2)
+    file_length = txt_file.tell()
+    data = b'' if 'b' in txt_file.mode else ''
+    if file_length == 0 or layout == None:
+        # New file, the header is written with some free space
+        header_length = len(header) + HEADER_RESERVE
+    elif len(header) <= layout.header_length:
+        # The header fits in the space of the previous one, so it is rewritten in place
+        header_length = layout.header_length
+    else:
+        # The header outgrew its space, so the blocks after it are moved, and its space is at least doubled and rounded
+        # up to whole blocks, so that a header that keeps growing moves the blocks only a logarithmic number of times
+        txt_file.seek(layout.data_start, 0)
+        data = txt_file.read()
+        header_length = max(2 * layout.header_length, len(header) + HEADER_RESERVE)
+        header_length = -(-header_length // (block_size + 1)) * (block_size + 1)
+    # The free space pads the last header line, which is stripped when the header is read
+    padded_header = header[:-1] + ' ' * (header_length - len(header)) + '\n'
+    txt_file.seek(0, 0)
+    # Files opened as bytes get the encoded header
+    if 'b' in txt_file.mode:
+        txt_file.write(padded_header.encode())
+    else:
+        txt_file.write(padded_header)
+    txt_file.write(data)
+    if io_counters != None:
+        # The blocks moved after the header are read and written again
+        number_of_moved_blocks = len(data) // (block_size + 1)
+        io_counters.count_read(number_of_blocks=number_of_moved_blocks, number_of_bytes=len(data), seek=len(data) > 0)
+        io_counters.count_write(number_of_blocks=number_of_moved_blocks, number_of_bytes=header_length + len(data), seek=True)
+    return Header_Layout(header_lines=padded_header.split('\n')[:-1], block_size=block_size)
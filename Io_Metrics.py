@@ -0,0 +1,105 @@
+"""
+Métricas de E/S das operações das organizações primárias. Os blocos lidos e escritos são contados em contadores
+acumulados de cada organização, e ao fim de cada operação pública a diferença dos contadores e o tempo de relógio
+formam as estatísticas da operação, que ficam em `last_operation_stats` e podem ser coletadas por um sink.
+"""
+
+import functools
+import time
+
+COUNTERS = ['logical_reads', 'physical_reads', 'block_writes', 'bytes_read', 'bytes_written', 'seeks', 'records_examined']
+
+class Io_Counters:
+    def __init__(self):
+        # Blocks and index pages requested by the engine, whether they were in the buffer pool or not
+        self.logical_reads = 0
+        # Blocks read from and written to the files
+        self.physical_reads = 0
+        self.block_writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        # Physical accesses that do not start where the previous access of the same file ended
+        self.seeks = 0
+        # Records read from the blocks by searches and scans
+        self.records_examined = 0
+
+    def count_read(self, number_of_blocks, number_of_bytes, seek):
+        self.physical_reads += number_of_blocks
+        self.bytes_read += number_of_bytes
+        if seek:
+            self.seeks += 1
+
+    def count_write(self, number_of_blocks, number_of_bytes, seek):
+        self.block_writes += number_of_blocks
+        self.bytes_written += number_of_bytes
+        if seek:
+            self.seeks += 1
+
+    def snapshot(self):
+        return [getattr(self, counter) for counter in COUNTERS]
+
+class Operation_Stats:
+    def __init__(self, engine, operation, counters, wall_time):
+        self.engine = engine
+        self.operation = operation
+        for counter, value in zip(COUNTERS, counters):
+            setattr(self, counter, value)
+        self.wall_time = wall_time
+
+    def as_dict(self):
+        stats = {'engine': self.engine, 'operation': self.operation}
+        for counter in COUNTERS:
+            stats[counter] = getattr(self, counter)
+        stats['wall_time'] = self.wall_time
+        return stats
+
+    def __repr__(self):
+        return f'Operation_Stats({self.as_dict()})'
+
+class Metrics_Sink:
+    # Keeps the statistics of every operation, in order
+    def __init__(self):
+        self.operations = []
+
+    def collect(self, stats):
+        self.operations.append(stats)
+
+    def totals(self, operation=None):
+        # Sums the statistics of the collected operations, or only of the operations with the given name
+        totals = dict((counter, 0) for counter in COUNTERS + ['wall_time'])
+        totals['operations'] = 0
+        for stats in self.operations:
+            if operation != None and stats.operation != operation:
+                continue
+            totals['operations'] += 1
+            for counter in COUNTERS + ['wall_time']:
+                totals[counter] += getattr(stats, counter)
+        return totals
+
+    def clear(self):
+        self.operations = []
+
+class Print_Metrics_Sink:
+    # Prints one line per operation, as the engines used to print their accessed blocks
+    def collect(self, stats):
+        print(' '.join(f'{key}={value}' for key, value in stats.as_dict().items()))
+
+def measured_operation(method):
+    # Measures a public operation of an engine, operations called by another operation are measured as part of it
+    @functools.wraps(method)
+    def measured_method(engine, *args, **kwargs):
+        if engine.operation_in_progress:
+            return method(engine, *args, **kwargs)
+        engine.operation_in_progress = True
+        counters = engine.io_counters.snapshot()
+        start = time.perf_counter()
+        try:
+            return method(engine, *args, **kwargs)
+        finally:
+            wall_time = time.perf_counter() - start
+            engine.operation_in_progress = False
+            counters = [value - previous_value for value, previous_value in zip(engine.io_counters.snapshot(), counters)]
+            engine.last_operation_stats = Operation_Stats(engine=type(engine).__name__, operation=method.__name__, counters=counters, wall_time=wall_time)
+            if engine.metrics_sink != None:
+                engine.metrics_sink.collect(stats=engine.last_operation_stats)
+    return measured_method
@@ -2,16 +2,44 @@
 Implementação do arquivo ordenado.
 """
 
+import bisect
 import math
 from datetime import datetime
 import os
 
-from Util import infer_types_from_record, check_interval, generate_range
+from Util import check_interval, interval_contains
+from Buffered_Reader import Buffered_Reader, read_line, read_lines
+from Header_Layout import Header_Layout, write_header
+from Block_Manager import DELETED_MARK, field_bounds
+from Block_Store import Block_Store
+from Buffer_Pool import BUFFER_POOL
+from Io_Metrics import Io_Counters, measured_operation
+from Record_Format import text_key
+from Secondary_Index import Secondary_Indexes, has_index_files
+from External_Sort import external_sort, MEMORY_BUDGET
+from Schema import Schema, read_csv_schema
+from Record_Validator import Record_Validator, invalid_records_message
 
 class Ordered_File:
-    def __init__(self, block_size):
+    def __init__(self, block_size, memory_budget=MEMORY_BUDGET, buffer_pool=BUFFER_POOL, metrics_sink=None):
         self.block_size = block_size
-        self.accessed_blocks = 0
+        # Bytes of records the external sort keeps in memory, larger tables are sorted in runs on disk
+        self.memory_budget = memory_budget
+        # Blocks of the txt and ext files are read and written through the buffer pool
+        self.buffer_pool = buffer_pool
+        self.layout = None
+        self.opened_txt_filepath = None
+        self.opened_txt_file = None
+        self.txt_modified = False
+        self.ext_modified = False
+        self.secondary_indexes = None
+        self.blocks = None
+        self.ext_blocks = None
+        # I/O of the operations, the statistics of the last operation are also given to the metrics sink
+        self.io_counters = Io_Counters()
+        self.metrics_sink = metrics_sink
+        self.last_operation_stats = None
+        self.operation_in_progress = False
 
     def _set_field_names(self, fields_names):
         self.field_names = fields_names.strip().split(',')
@@ -19,8 +47,12 @@ class Ordered_File:
     def _set_field_sizes(self, field_sizes):
         self.field_sizes = field_sizes
     
-    def _set_field_types(self, record):
-        self.field_types = infer_types_from_record(record, len(self.field_names))
+    def _set_schema(self, schema):
+        self.schema = schema
+        self.field_names = schema.field_names
+        self.field_types = schema.field_types
+        self._set_field_sizes(field_sizes=schema.field_sizes)
+        self.record_validator = Record_Validator(schema=schema)
 
     def _set_record_size(self):
         self.record_size = sum(self.field_sizes) + len(self.field_sizes)
@@ -28,68 +60,61 @@ class Ordered_File:
     def _set_blocking_factor(self):
         self.blocking_factor = math.floor(self.block_size / self.record_size)
 
-    def _read_line(self, file):
-        char = file.read(1)
-        line = ''
-
-        while char and char != '\n':
-            line += char
-            char = file.read(1)
-        return line
-
     def _read_csv_header(self, file):
-        csv_header = self._read_line(file=file)
+        csv_header = read_line(file=file)
         self._set_field_names(fields_names=csv_header)
 
-    def _calculate_csv_field_sizes(self, file):
-        field_sizes = dict()
-        for field in self.field_names:
-            field_sizes[field] = 0
-        record = self._read_line(file=file)
-        self.number_of_records = 0
-        self._set_field_types(record=record)
-        while record != '':
-            self.number_of_records += 1
-            record_fields = record.strip().split(',')
-            for i in range(len(self.field_names)):
-                if len(record_fields[i]) > field_sizes[self.field_names[i]]:
-                    field_sizes[self.field_names[i]] = int(len(record_fields[i]))
-            record = self._read_line(file=file)
-        self._set_field_sizes(field_sizes=list(field_sizes.values()))
+    def _read_csv_schema(self, file, schema):
+        # The csv is only read for the field types and sizes that were not given
+        schema, number_of_records = read_csv_schema(csv_file=file, field_names=self.field_names, schema=schema)
+        self._set_schema(schema=schema)
+        # Records are counted again while they are written
+        self.number_of_records = number_of_records if number_of_records != None else 0
     
-    def _write_txt_header(self, txt_file, txt_filepath):
-        # Sets txt_file cursor at the beginning of the file
-        txt_file.seek(0, 0)
+    def _get_txt_header(self, txt_filepath):
+        header = ''
         # Write table name
         table_name = txt_filepath.split('/')[2].split('.')[0]
-        txt_file.write(table_name + '\n')
+        header += table_name + '\n'
         # Write field names, sizes, types
         field_names = ','.join(str(field_name) for field_name in self.field_names) + '\n'
         field_sizes = ','.join(str(field_size) for field_size in self.field_sizes) + '\n'
         field_types = ','.join(str(field_type) for field_type in self.field_types) + '\n'
-        txt_file.write(field_names)
-        txt_file.write(field_sizes)
-        txt_file.write(field_types)
+        header += field_names
+        header += field_sizes
+        header += field_types
+        # Write primary key
+        header += self.schema.primary_key + '\n'
         # Write number of records
-        txt_file.write(str(self.number_of_records) + '\n')
+        header += str(self.number_of_records) + '\n'
         # Write blocking factor
-        txt_file.write(str(self.blocking_factor) + '\n')
+        header += str(self.blocking_factor) + '\n'
         # Write number of blocks
-        txt_file.write(str(self.number_of_blocks) + '\n')
+        header += str(self.number_of_blocks) + '\n'
         # Write number of deleted records
-        txt_file.write(str(self.number_of_deleted_records) + '\n')
+        header += str(self.number_of_deleted_records) + '\n'
         # Write creation timestamp
         if self.creation_date == None:
             creation_timestamp = datetime.now()
             creation_timestamp = creation_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            txt_file.write(creation_timestamp + '\n')
+            header += creation_timestamp + '\n'
         else:
-            txt_file.write(self.creation_date + '\n')
+            header += self.creation_date + '\n'
         # Write alteration timestamp
         alteration_timestamp = datetime.now()
         alteration_timestamp = alteration_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        txt_file.write(alteration_timestamp + '\n')
-    
+        header += alteration_timestamp + '\n'
+        return header
+
+    def _write_txt_header(self, txt_file, txt_filepath):
+        header = self._get_txt_header(txt_filepath=txt_filepath)
+        # Rewrites the header in place, moving the blocks if it outgrew its space
+        self.layout = write_header(txt_file=txt_file, header=header, layout=self.layout, block_size=self.block_size, io_counters=self.io_counters)
+        # Blocks read from now on are found after the rewritten header
+        txt_file.flush()
+        if self.blocks != None:
+            self.blocks.refresh(layout=self.layout)
+
     def _padding(self, record_field, field_id):
         diff = self.field_sizes[field_id] - len(record_field)
         padded_record_field = record_field + (' ' * diff)
@@ -106,228 +131,416 @@ class Ordered_File:
                 formatted_record += record_fields[i] + ','
         return formatted_record
 
-    def _get_csv_records(self, csv_file):
-        # Sets cursor to beginning of file
-        csv_file.seek(0, 0)
-        # Skips csv header
-        self._read_line(file=csv_file)
-        # Read and store records
-        records = []
-        record = self._read_line(file=csv_file)
-        while record != "":
-            records.append(record)
-            record = self._read_line(file=csv_file)
-        return records
-    
-    def _merge_sort(self, records):
-        # Base case. A list of zero or one elements is sorted, by definition.
-        if len(records) <= 1:
-            return records
-
-        # Recursive case. First, divide the list into equal-sized sublists
-        # consisting of the first half and second half of the list.
-        left = []
-        right = []
-        for i in range(len(records)):
-            if i < len(records) / 2:
-                left.append(records[i])
-            else:
-                right.append(records[i])
-
-        # Recursively sort both sublists.
-        left = self._merge_sort(records=left)
-        right = self._merge_sort(records=right)
-
-        # Then merge the now-sorted sublists.
-        return self._merge(left=left, right=right)
-    
     def _primary_key(self, record):
         record_fields = record.strip().split(",")
         record_primary_key = int(record_fields[0].strip())
         return record_primary_key
 
-    def _merge(self, left, right):
-        result = []
-
-        while left != [] and right != []:
-            # if left[0] <= right[0]:
-            if self._primary_key(record=left[0]) <= self._primary_key(record=right[0]):
-                result.append(left[0])
-                left.pop(0)
-            else:
-                result.append(right[0])
-                right.pop(0)
-
-        # Either left or right may have elements left; consume them.
-        # (Only one of the following loops will actually be entered.)
-        while left != []:
-            result.append(left[0])
-            left.pop(0)
-        while right != []:
-            result.append(right[0])
-            right.pop(0)
-        return result
+    def _sort_records(self, records):
+        # Sorts by the primary key within the memory budget, spilling sorted runs to temporary files
+        return external_sort(records=records, key=self._primary_key, memory_budget=self.memory_budget)
 
     def _write_txt_records(self, txt_file, csv_file):
+        # Records are read from the csv file and written in order, block by block, without loading the whole table
         block_remaining = self.block_size - self.blocking_factor * self.record_size
         block_padding = "#" * block_remaining
         block = ''
-        remaining_records = self.number_of_records - (self.number_of_records // self.blocking_factor)
-        records = self._get_csv_records(csv_file=csv_file)
-        ordered_records = self._merge_sort(records=records)
-        for i in range(0, len(ordered_records)):
-            record = ordered_records[i]
+        records_in_block = 0
+        number_of_records = 0
+        self._clear_fences()
+        for record in self._sort_records(records=csv_file.read_records()):
             try:
+                # The first record of each block is its fence
+                if records_in_block == 0:
+                    self._add_fence(block_id=len(self.fence_block_ids), record=record)
                 formatted_record = self._format_record(record=record)
+                # Fields longer than their sizes in the schema would overwrite the next record
+                if len(formatted_record) != self.record_size:
+                    raise Exception()
                 block += formatted_record
-                if (i + 1) % self.blocking_factor == 0:
+                number_of_records += 1
+                records_in_block += 1
+                if records_in_block == self.blocking_factor:
                     block += block_padding + '\n'
                     txt_file.write(block)
                     block = ''
-                elif i == self.number_of_records:
-                    additional_padding = "#" * (self.block_size - self.record_size * remaining_records)
-                    block += additional_padding + '\n'
-                    txt_file.write(block)
+                    records_in_block = 0
             except:
                 raise Exception(f"WriteError: Could Not Write Record: {record}")
+        # The last block is padded up to the block size
+        if records_in_block > 0:
+            additional_padding = "#" * (self.block_size - self.record_size * records_in_block)
+            txt_file.write(block + additional_padding + '\n')
+        return number_of_records
 
     def _write_from_csv_to_txt(self, csv_file, csv_filepath):
         # Create txt file
         txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
-        txt_file = open(txt_filepath, 'w')
+        txt_file = open(txt_filepath, 'w+')
         # Write txt file header
         self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
         # Return to begin of csv_file
         csv_file.seek(0, 0)
         # Skip csv_file header
-        self._read_line(csv_file)
+        read_line(csv_file)
         # Write txt file records
-        self._write_txt_records(txt_file=txt_file, csv_file=csv_file)
+        self.number_of_records = self._write_txt_records(txt_file=txt_file, csv_file=csv_file)
+        self._set_number_of_blocks()
+        # The blocks are written sequentially after the header
+        self.io_counters.count_write(number_of_blocks=self.number_of_blocks, number_of_bytes=txt_file.tell() - self.layout.data_start, seek=False)
+        # The header is written again with the number of records and blocks written
+        self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
         txt_file.close()
-
-    def from_csv_to_txt(self, csv_filepath):
-        file = open(csv_filepath, 'r+')
+        self._write_fence_file(txt_filepath=txt_filepath)
+        # The ext file of a previous table with the same name is emptied
+        ext_file = open(txt_filepath[:-4] + "_Ext.txt", 'w')
+        ext_file.close()
+        # Blocks of the previous table that are still in the buffer pool are dropped
+        self.buffer_pool.discard(filepath=txt_filepath)
+        self.buffer_pool.discard(filepath=txt_filepath[:-4] + "_Ext.txt")
+
+    def _set_number_of_blocks(self):
+        # The last block is counted even if it is not full
+        self.number_of_blocks = math.ceil(self.number_of_records / self.blocking_factor)
+
+    @measured_operation
+    def from_csv_to_txt(self, csv_filepath, schema=None):
+        # Blocks of a previously read table are not kept
+        self._close_block_stores()
+        file = Buffered_Reader(filepath=csv_filepath)
         self._read_csv_header(file=file)
-        self._calculate_csv_field_sizes(file=file)
+        # A schema with the field sizes skips the pass over the csv that computes them, so the csv is read only once
+        self._read_csv_schema(file=file, schema=schema)
         self._set_record_size()
         self._set_blocking_factor()
-        self.number_of_blocks = self.number_of_records // self.blocking_factor
+        self._set_number_of_blocks()
         self.number_of_deleted_records = 0
         self.creation_date = None
         self._write_from_csv_to_txt(csv_file=file, csv_filepath=csv_filepath)
         file.close()
+        # Indexes of a previous table with the same name are built again
+        txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+        self._rebuild_secondary_indexes(txt_filepath=txt_filepath)
     
-    def _header_length(self, file):
-        header_length = 0
-        for i in range(0, 10):
-            file.seek(header_length, 0)
-            line = self._read_line(file)
-            header_length += len(line)+1
-        return header_length
-
     def _read_txt_header(self, file):
-        self.table_name = self._read_line(file)
-        self.field_names = self._read_line(file).strip().split(',')
-        self.field_sizes = self._read_line(file).strip().split(',')
-        self.field_sizes = [int(field_size) for field_size in self.field_sizes]
-        self.field_types = self._read_line(file).strip().split(',')
+        header_lines = read_lines(file=file, number_of_lines=11)
+        self.table_name = header_lines[0]
+        field_names = header_lines[1].strip().split(',')
+        field_sizes = [int(field_size) for field_size in header_lines[2].strip().split(',')]
+        field_types = header_lines[3].strip().split(',')
+        self._set_schema(schema=Schema(field_names=field_names, field_types=field_types, field_sizes=field_sizes, primary_key=header_lines[4].strip()))
         self._set_record_size()
         self._set_blocking_factor()
-        self.number_of_records = int(self._read_line(file).strip())
-        self.blocking_factor = int(self._read_line(file).strip())
-        self.number_of_blocks = int(self._read_line(file).strip())
-        self.number_of_deleted_records = int(self._read_line(file).strip())
-        self.creation_date = self._read_line(file).strip()
-        self.alteration_date = self._read_line(file).strip()
-
-    def _read_txt_blocks(self, file):
-        header_length = self._header_length(file=file)
-        self.blocks = []
-        for i in range(0, self.number_of_blocks):
-            offset = header_length + self.block_size * i + i
-            file.seek(offset, 0)
-            block = file.read(self.block_size)
-            self.blocks.append(block)
-
-    def _read_ext_blocks(self, file):
-        self.ext_blocks = []
-        offset = 0
-        file.seek(offset, 0)
-        block = file.read(self.block_size)
-        while block != "":
-            self.ext_blocks.append(block)
-            offset += self.block_size + 1
-            file.seek(offset, 0)
-            block = file.read(self.block_size)
+        self.number_of_records = int(header_lines[5].strip())
+        self.blocking_factor = int(header_lines[6].strip())
+        self.number_of_blocks = int(header_lines[7].strip())
+        self.number_of_deleted_records = int(header_lines[8].strip())
+        self.creation_date = header_lines[9].strip()
+        self.alteration_date = header_lines[10].strip()
+        # Computes the header layout once, it only changes when the header is rewritten
+        self.layout = Header_Layout(header_lines=header_lines, block_size=self.block_size)
+
+    def _read_txt_blocks(self, txt_filepath):
+        # Blocks are read on demand, the number of blocks in the header also counts the blocks of the ext file
+        if self.blocks != None:
+            self.blocks.close()
+        self.blocks = Block_Store(filepath=txt_filepath, layout=self.layout, block_size=self.block_size, buffer_pool=self.buffer_pool, io_counters=self.io_counters)
+
+    def _read_ext_blocks(self, ext_filepath):
+        # The ext file has no header, its blocks start at the beginning of the file
+        self.ext_layout = Header_Layout(header_lines=[], block_size=self.block_size)
+        if self.ext_blocks != None:
+            self.ext_blocks.close()
+        self.ext_blocks = Block_Store(filepath=ext_filepath, layout=self.ext_layout, block_size=self.block_size, buffer_pool=self.buffer_pool, io_counters=self.io_counters)
+
+    def _close_block_stores(self):
+        for blocks in [self.blocks, self.ext_blocks]:
+            if blocks != None:
+                blocks.close()
+        self.blocks = None
+        self.ext_blocks = None
 
     def _read_extension_file(self, txt_filepath):
-        # Creates ext file if does not already exists
         ext_filepath = txt_filepath[:-4] + "_Ext.txt"
+        # If the table is open, its ext blocks are already loaded
+        if self._is_open(txt_filepath=txt_filepath):
+            return ext_filepath
+        # Creates ext file if does not already exists
         try:
             file = open(ext_filepath, 'r')
             file.close()
         except:
             file = open(ext_filepath, 'w')
             file.close()
-        file = open(ext_filepath, 'r+')
-        self._read_ext_blocks(file=file)
+        self._read_ext_blocks(ext_filepath=ext_filepath)
         return ext_filepath
 
+    def _fence_filepath(self, txt_filepath):
+        return txt_filepath[:-4] + "_Fence.txt"
+
+    def _clear_fences(self):
+        # First primary key of each non empty block from txt file, with the id of the block
+        self.fence_keys = []
+        self.fence_block_ids = []
+
+    def _add_fence(self, block_id, record):
+        self.fence_keys.append(text_key(field_type=self.field_types[0], value=record.split(',')[0]))
+        self.fence_block_ids.append(block_id)
+
+    def _compute_fences(self):
+        # Blocks whose records were all deleted have no fence
+        self._clear_fences()
+        for i in range(0, len(self.blocks)):
+            for (j, record) in self._block_records(block=self.blocks[i]):
+                self._add_fence(block_id=i, record=record)
+                break
+
+    def _write_fence_file(self, txt_filepath):
+        with open(self._fence_filepath(txt_filepath=txt_filepath), 'w') as fence_file:
+            for k in range(0, len(self.fence_keys)):
+                fence_file.write(str(self.fence_block_ids[k]) + ',' + str(self.fence_keys[k]) + '\n')
+
+    def _read_fence_file(self, txt_filepath):
+        # The fences are read from their own file, without reading the blocks, and are computed from the blocks
+        # only for tables written before the fence file existed
+        fence_filepath = self._fence_filepath(txt_filepath=txt_filepath)
+        if not os.path.exists(fence_filepath):
+            self._compute_fences()
+            self._write_fence_file(txt_filepath=txt_filepath)
+            return
+        self._clear_fences()
+        with Buffered_Reader(filepath=fence_filepath) as fence_file:
+            for fence in fence_file.read_records():
+                block_id, key = fence.split(',', 1)
+                self.fence_keys.append(text_key(field_type=self.field_types[0], value=key))
+                self.fence_block_ids.append(int(block_id))
+
     def _read_txt_file(self, txt_filepath):
+        # If the table is open, reuses its file, its already parsed header and its loaded blocks
+        if self._is_open(txt_filepath=txt_filepath):
+            return self.opened_txt_file
         file = open(txt_filepath, 'r+')
         self._read_txt_header(file=file)
-        self._read_txt_blocks(file=file)
+        self._read_txt_blocks(txt_filepath=txt_filepath)
+        self._read_fence_file(txt_filepath=txt_filepath)
+        self._open_secondary_indexes(txt_filepath=txt_filepath)
         return file
 
-    def _search(self, field_id, value):
-        field_size = self.field_sizes[field_id]
+    def _open_secondary_indexes(self, txt_filepath):
+        # Indexes stay open after the txt file is closed, since the blocks are only written back afterwards,
+        # and are flushed with the txt and ext files
+        if self.secondary_indexes != None:
+            self.secondary_indexes.close()
+        self.secondary_indexes = Secondary_Indexes(txt_filepath=txt_filepath, field_names=self.field_names, field_types=self.field_types)
+
+    def _is_open(self, txt_filepath):
+        return self.opened_txt_file != None and self.opened_txt_filepath == txt_filepath
+
+    def _close_txt_file(self, file):
+        # The file of an open table is only closed by close_table
+        if file is not self.opened_txt_file:
+            file.close()
+
+    @measured_operation
+    def open_table(self, txt_filepath):
+        if self.opened_txt_file != None:
+            self.close_table()
+        self.opened_txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self._read_extension_file(txt_filepath=txt_filepath)
+        self.opened_txt_filepath = txt_filepath
+        self.txt_modified = False
+        self.ext_modified = False
+
+    @measured_operation
+    def flush_table(self):
+        self.opened_txt_file.flush()
+        if self.txt_modified:
+            self._write_txt_file(txt_filepath=self.opened_txt_filepath)
+            self.txt_modified = False
+        if self.ext_modified:
+            self._write_ext_file(ext_filepath=self.opened_txt_filepath[:-4] + "_Ext.txt")
+            self.ext_modified = False
+
+    @measured_operation
+    def close_table(self):
+        self.flush_table()
+        self.secondary_indexes.close()
+        self._close_block_stores()
+        self.opened_txt_file.close()
+        self.opened_txt_file = None
+        self.opened_txt_filepath = None
+
+    def _block_records(self, block):
+        # Yields the position and the text of each record in the block, skipping deleted records and padding
+        for j in range(0, min(self.blocking_factor, len(block) // self.record_size)):
+            record = block[j * self.record_size:(j + 1) * self.record_size]
+            if ord(record[0]) != DELETED_MARK:
+                self.io_counters.records_examined += 1
+                yield j, record
+
+    def _scan_records(self):
+        # Yields the position and the text of every record of the txt and ext blocks
+        for blocks, first_block_id in [(self.blocks, 0), (self.ext_blocks, len(self.blocks))]:
+            for i in range(0, len(blocks)):
+                for (j, record) in self._block_records(block=blocks[i]):
+                    yield first_block_id + i, j, record
+
+    def _search_index(self, field_id, value):
+        # Positions of the records with the value, read from the secondary index of the field
         success = False
-        # Search for record in blocks from txt file
-        for i in range(0, len(self.blocks)):
-            self.accessed_blocks += 1
-            # If found the record and we are doing a select by primary key, end search
-            if success and field_id == 0:
-                break
-            # Checks if record is in block[i]
-            block = self.blocks[i]
-            number_of_records_in_block = len(block.strip('#')) // self.record_size
-            for j in range(0, number_of_records_in_block):
-                if success and field_id == 0:
-                    break
-                record = block[j * self.record_size: (j + 1) * self.record_size]
-                record_fields = record.strip().split(',')
-                record_field_value = record_fields[field_id].strip()
-                if value == record_field_value:
+        for (i, j) in self.secondary_indexes.search(field_id=field_id, value=value):
+            yield [i, j]
+            success = True
+        self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+        if not success:
+            yield [-1, -1]
+
+    def _search_blocks(self, blocks, first_block_id, field_id, value):
+        # Compares the padded value against the field of each record, skipping deleted records and padding
+        start, end = field_bounds(field_sizes=self.field_sizes, field_id=field_id)
+        padded_value = value.ljust(self.field_sizes[field_id])
+        for i in range(0, len(blocks)):
+            for (j, record) in self._block_records(block=blocks[i]):
+                if record[start:end] == padded_value:
+                    yield [first_block_id + i, j]
+                    # Primary keys are unique, so the search ends at the first match
+                    if field_id == 0:
+                        return
+
+    def _record_key(self, record, field_id):
+        start, end = field_bounds(field_sizes=self.field_sizes, field_id=field_id)
+        return text_key(field_type=self.field_types[field_id], value=record[start:end])
+
+    def _first_block_of_interval(self, start_key):
+        # The records of the interval can only start in the last block whose fence is not greater than start_key
+        k = bisect.bisect_right(self.fence_keys, start_key) - 1
+        if k < 0:
+            return 0
+        return self.fence_block_ids[k]
+
+    def _search_ordered_blocks(self, key):
+        # The fence index gives the only block from txt file where the primary key can be, without reading any other block
+        k = bisect.bisect_right(self.fence_keys, key) - 1
+        if k < 0:
+            return
+        i = self.fence_block_ids[k]
+        for (j, record) in self._block_records(block=self.blocks[i]):
+            if self._record_key(record=record, field_id=0) == key:
+                yield [i, j]
+                return
+
+    def _search_interval(self, field_id, start, end):
+        # Fields with a secondary index are looked up in it instead of scanning the blocks
+        if field_id != 0 and self.secondary_indexes.has_index(field_id=field_id):
+            for (i, j) in self.secondary_indexes.search_interval(field_id=field_id, start=start, end=end):
+                yield [i, j]
+            self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+            return
+        field_type = self.field_types[field_id]
+        start_key = text_key(field_type=field_type, value=start)
+        end_key = text_key(field_type=field_type, value=end)
+        # Blocks from txt file are ordered by the primary key, so the scan is bounded by a binary search
+        if field_id == 0:
+            first_block_id = self._first_block_of_interval(start_key=start_key)
+        else:
+            first_block_id = 0
+        for i in range(first_block_id, len(self.blocks)):
+            past_interval = False
+            for (j, record) in self._block_records(block=self.blocks[i]):
+                record_key = self._record_key(record=record, field_id=field_id)
+                if interval_contains(interval_type=field_type, value=record_key, start=start_key, end=end_key):
                     yield [i, j]
-                    success = True
-        # Search for record in blocks from ext file
+                elif field_id == 0 and record_key > start_key:
+                    past_interval = True
+                    break
+            if past_interval:
+                break
+        # Blocks from ext file are not ordered
         for i in range(0, len(self.ext_blocks)):
-            self.accessed_blocks += 1
-            # If found the record and we are doing a select by primary key, end search
-            if success and field_id == 0:
+            for (j, record) in self._block_records(block=self.ext_blocks[i]):
+                record_key = self._record_key(record=record, field_id=field_id)
+                if interval_contains(interval_type=field_type, value=record_key, start=start_key, end=end_key):
+                    yield [len(self.blocks) + i, j]
+
+    def _search_primary_keys(self, keys):
+        # Requested keys are sorted, so that they are matched against the ordered blocks in a single merge
+        requested_keys = dict()
+        for key in keys:
+            try:
+                requested_keys.setdefault(text_key(field_type=self.field_types[0], value=key), []).append(key)
+            except ValueError:
+                # Keys that can not be parsed as the primary key type never match any record
+                pass
+        sorted_keys = sorted(requested_keys)
+        positions = dict()
+        k = 0
+        if sorted_keys != []:
+            first_block_id = self._first_block_of_interval(start_key=sorted_keys[0])
+        else:
+            first_block_id = len(self.blocks)
+        for i in range(first_block_id, len(self.blocks)):
+            if k == len(sorted_keys):
                 break
-            # Checks if record is in block[i]
-            block = self.ext_blocks[i]
-            number_of_records_in_block = len(block.strip('#')) // self.record_size
-            for j in range(0, number_of_records_in_block):
-                if success and field_id == 0:
+            for (j, record) in self._block_records(block=self.blocks[i]):
+                record_key = self._record_key(record=record, field_id=0)
+                # Requested keys smaller than the record key are not in the txt file
+                while k < len(sorted_keys) and sorted_keys[k] < record_key:
+                    k += 1
+                if k == len(sorted_keys):
                     break
-                record = block[j * self.record_size: (j + 1) * self.record_size]
-                record_fields = record.strip().split(',')
-                record_field_value = record_fields[field_id].strip()
-                if value == record_field_value:
-                    yield [len(self.blocks) + i, j]
+                if sorted_keys[k] == record_key:
+                    for key in requested_keys[record_key]:
+                        positions[key] = [i, j]
+                    k += 1
+        # Blocks from ext file are not ordered, the keys not found yet are looked up in a single pass
+        remaining_keys = set(key for key in requested_keys if requested_keys[key][0] not in positions)
+        for i in range(0, len(self.ext_blocks)):
+            if remaining_keys == set():
+                break
+            for (j, record) in self._block_records(block=self.ext_blocks[i]):
+                record_key = self._record_key(record=record, field_id=0)
+                if record_key in remaining_keys:
+                    for key in requested_keys[record_key]:
+                        positions[key] = [len(self.blocks) + i, j]
+                    remaining_keys.remove(record_key)
+        return positions
+
+    def _search(self, field_id, value):
+        # Fields with a secondary index are looked up in it instead of scanning the blocks
+        if self.secondary_indexes.has_index(field_id=field_id):
+            for (i, j) in self._search_index(field_id=field_id, value=value):
+                yield [i, j]
+            return
+        success = False
+        # Primary keys are binary searched in the ordered blocks from txt file, then scanned in blocks from ext file
+        if field_id == 0:
+            try:
+                key = text_key(field_type=self.field_types[0], value=value)
+            except ValueError:
+                # Keys that can not be parsed as the primary key type never match any record
+                yield [-1, -1]
+                return
+            for (i, j) in self._search_ordered_blocks(key=key):
+                yield [i, j]
+                success = True
+            if not success:
+                for (i, j) in self._search_blocks(blocks=self.ext_blocks, first_block_id=len(self.blocks), field_id=0, value=value):
+                    yield [i, j]
+                    success = True
+        else:
+            # Search for record in blocks from txt file, then in blocks from ext file
+            for blocks, first_block_id in [(self.blocks, 0), (self.ext_blocks, len(self.blocks))]:
+                for (i, j) in self._search_blocks(blocks=blocks, first_block_id=first_block_id, field_id=field_id, value=value):
+                    yield [i, j]
                     success = True
         # If failed to find record
         if not success:
             yield [-1, -1]
     
     def _check_record_type_constraint(self, record):
-        record_fields = record.strip().split(',')
-        record_field_types = infer_types_from_record(record, len(record_fields))
-        for i in range(len(self.field_names)):
-            if record_field_types[i] != self.field_types[i]:
-                return -1
+        # Each field is checked by the check of its type, compiled with the schema
+        if not self.schema.check_record_types(record=record):
+            return -1
         return 0
     
     def _check_record_size_constraint(self, record):
@@ -345,6 +558,11 @@ class Ordered_File:
             return -1
         return 0
 
+    def _invalid_records(self, records):
+        # Every invalid record is reported with its reasons, primary keys are checked in a single search
+        records_primary_keys = [record.strip().split(',')[0] for record in records]
+        return self.record_validator.validate(records=records, primary_keys=records_primary_keys, search_primary_keys=lambda keys : self._search_primary_keys(keys=keys))
+
     def _check_record_integrity(self, record):
         record_type_constraint = self._check_record_type_constraint(record=record)
         if record_type_constraint == -1:
@@ -358,29 +576,30 @@ class Ordered_File:
         return 0
 
     def _write_ext_file(self, ext_filepath):
-        with open(ext_filepath, 'w') as ext_file:
-            for block in self.ext_blocks:
-                ext_file.write(block + '\n')
-
-    def _get_txt_header(self, txt_filepath):
-        header = ""
-        txt_file = open(txt_filepath, 'r')
-        txt_file.seek(0, 0)
-        for i in range(0, 10):
-            header_line = self._read_line(file=txt_file)
-            header += header_line + '\n'
-        txt_file.close()
-        return header
+        # Only the modified and new ext blocks are written
+        self.ext_blocks.flush(layout=self.ext_layout)
+        self.secondary_indexes.flush()
 
     def _write_txt_file(self, txt_filepath):
-        once = False
-        with open(txt_filepath, 'w') as txt_file:
-            if not once:
-                txt_header = self._get_txt_header(txt_filepath=txt_filepath)
-                txt_file.write(txt_header)
-                once = True
-            for block in self.blocks:
-                txt_file.write(block + '\n')
+        # Only the header and the modified blocks are written, in their positions
+        with open(txt_filepath, 'r+') as txt_file:
+            self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
+        self.blocks.flush(layout=self.layout)
+        self.secondary_indexes.flush()
+
+    def _save_txt_file(self, txt_filepath):
+        # While the table is open, rewriting the txt file is deferred to flush_table
+        if self._is_open(txt_filepath=txt_filepath):
+            self.txt_modified = True
+        else:
+            self._write_txt_file(txt_filepath=txt_filepath)
+
+    def _save_ext_file(self, txt_filepath, ext_filepath):
+        # While the table is open, rewriting the ext file is deferred to flush_table
+        if self._is_open(txt_filepath=txt_filepath):
+            self.ext_modified = True
+        else:
+            self._write_ext_file(ext_filepath=ext_filepath)
 
     def _insert(self, record):
         if len(record) != self.record_size:
@@ -391,10 +610,10 @@ class Ordered_File:
         exists_block = len(self.ext_blocks) >= 1
         if exists_block:
             block = self.ext_blocks[-1]
-        self.accessed_blocks += 1
 
         # Check if there is space available in the last ext block
-        number_of_records_in_block = len(block.strip('#')) // self.record_size
+        # Deleted records at the start of the block are not trailing padding, only the end of the block is stripped
+        number_of_records_in_block = len(block.rstrip('#')) // self.record_size
         if exists_block and number_of_records_in_block < self.blocking_factor:
             # If there is, then write record to last ext block
             body = block[:self.record_size * number_of_records_in_block]
@@ -402,25 +621,27 @@ class Ordered_File:
             block = body + record + padding
             self.ext_blocks[-1] = block
             self.number_of_records += 1
+            position = [len(self.blocks) + len(self.ext_blocks) - 1, number_of_records_in_block]
         else:
             # If there is not, then create a new ext block
-            self.accessed_blocks += 1
             padding = "#" * (self.block_size - self.record_size)
             block = record + padding
             # Writes new ext block to the end of the ext file
             self.ext_blocks.append(block)
             self.number_of_blocks += 1
             self.number_of_records += 1
+            position = [len(self.blocks) + len(self.ext_blocks) - 1, 0]
+        # Adds the record to the secondary indexes
+        self.secondary_indexes.insert_record(record=record, block_id=position[0], record_id=position[1])
 
+    @measured_operation
     def insert_single_record(self, txt_filepath, record):
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         ext_filepath = self._read_extension_file(txt_filepath=txt_filepath)
         # Check if the record respects the database integrity restriction
         record_integrity = self._check_record_integrity(record=record)
         if record_integrity == -1:
-            txt_file.close()
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
+            self._close_txt_file(file=txt_file)
             raise Exception('InsertError: Invalid Record.')
         # Formats and inserts record
         formatted_record = self._format_record(record[:-1])
@@ -428,22 +649,18 @@ class Ordered_File:
         # Updates txt file header
         self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
         # Writes ext file
-        self._write_ext_file(ext_filepath=ext_filepath)
-        txt_file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+        self._save_ext_file(txt_filepath=txt_filepath, ext_filepath=ext_filepath)
+        self._close_txt_file(file=txt_file)
 
+    @measured_operation
     def insert_multiple_records(self, txt_filepath, records):
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         ext_filepath = self._read_extension_file(txt_filepath=txt_filepath)
-        # Check if the record respects the database integrity restriction
-        for record in records:
-            record_integrity = self._check_record_integrity(record=record)
-            if record_integrity == -1:
-                txt_file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
-                raise Exception('InsertError: Invalid Record.')
+        # Check if the records respect the database integrity restriction
+        invalid_records = self._invalid_records(records=records)
+        if invalid_records != []:
+            self._close_txt_file(file=txt_file)
+            raise Exception(invalid_records_message(invalid_records=invalid_records))
         # Formats and inserts records
         for record in records:
             formatted_record = self._format_record(record[:-1])
@@ -451,10 +668,8 @@ class Ordered_File:
         # Updates txt file header
         self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
         # Writes ext file
-        self._write_ext_file(ext_filepath=ext_filepath)
-        txt_file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+        self._save_ext_file(txt_filepath=txt_filepath, ext_filepath=ext_filepath)
+        self._close_txt_file(file=txt_file)
     
     def _select(self, select_container, block_id, record_id):
         if block_id < len(self.blocks):
@@ -462,46 +677,44 @@ class Ordered_File:
             record = block[self.record_size * record_id: self.record_size * (record_id + 1)]
             select_container.append(record)
         else:
-            ext_block_id = len(self.blocks) - block_id
+            ext_block_id = block_id - len(self.blocks)
             block = self.ext_blocks[ext_block_id]
             record = block[self.record_size * record_id: self.record_size * (record_id + 1)]
             select_container.append(record)
 
+    @measured_operation
     def select_by_single_primary_key(self, txt_filepath, key):
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         ext_filepath = self._read_extension_file(txt_filepath=txt_filepath)
         select_container = []
         for (i, j) in self._search(field_id=0, value=key):
             if i == -1 and j == -1:
-                txt_file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._close_txt_file(file=txt_file)
                 raise Exception('SelectionError: Primary Key nonexistent.')
             else:
                 self._select(select_container=select_container, block_id=i, record_id=j)
-        txt_file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+        self._close_txt_file(file=txt_file)
         return select_container
 
+    @measured_operation
     def select_by_multiple_primary_key(self, txt_filepath, keys):
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         ext_filepath = self._read_extension_file(txt_filepath=txt_filepath)
         select_container = []
         exception_counter = 0
+        positions = self._search_primary_keys(keys=keys)
         for key in keys:
-            for (i, j) in self._search(field_id=0, value=key):
-                if i == -1 and j == -1:
-                    exception_counter += 1
-                else:
-                    self._select(select_container=select_container, block_id=i, record_id=j)
-        txt_file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+            if key not in positions:
+                exception_counter += 1
+            else:
+                i, j = positions[key]
+                self._select(select_container=select_container, block_id=i, record_id=j)
+        self._close_txt_file(file=txt_file)
         if exception_counter == len(keys):
             raise Exception('SelectionError: Primary Keys nonexistent.')
         return select_container
     
+    @measured_operation
     def select_by_field_interval(self, txt_filepath, field, start, end):
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         ext_filepath = self._read_extension_file(txt_filepath=txt_filepath)
@@ -509,31 +722,17 @@ class Ordered_File:
         field_type = self.field_types[field_id]
         possible_field_interval = check_interval(interval_type=field_type, start=start, end=end)
         if possible_field_interval == -1:
-            txt_file.close()
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
-            raise Exception('SelectionError: Field Interval incomputable.')
-        value_range = generate_range(range_type=field_type, start=start, end=end)
-        if value_range == -1:
-            txt_file.close()
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
+            self._close_txt_file(file=txt_file)
             raise Exception('SelectionError: Field Interval incomputable.')
         select_container = []
-        exception_counter = 0
-        for value in value_range:
-            for (i, j) in self._search(field_id=field_id, value=str(value)):
-                if i == -1 and j == -1:
-                    exception_counter += 1
-                else:
-                    self._select(select_container=select_container, block_id=i, record_id=j)
-        txt_file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
-        if exception_counter == len(value_range):
+        for (i, j) in self._search_interval(field_id=field_id, start=start, end=end):
+            self._select(select_container=select_container, block_id=i, record_id=j)
+        self._close_txt_file(file=txt_file)
+        if select_container == []:
             raise Exception('SelectionError: Requested Records nonexistent.')
         return select_container
     
+    @measured_operation
     def select_by_single_field_value(self, txt_filepath, field, value):
         # Checks if field exists
         if field not in self.field_names:
@@ -545,42 +744,13 @@ class Ordered_File:
         select_container = []
         for (i, j) in self._search(field_id=field_id, value=value):
             if i == -1 and j == -1:
-                txt_file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._close_txt_file(file=txt_file)
                 raise Exception('SelectionError: Field Value nonexistent.')
             else:
                 self._select(select_container=select_container, block_id=i, record_id=j)
-        txt_file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+        self._close_txt_file(file=txt_file)
         return select_container
 
-    def _recreating_txt_file(self, ordered_records, txt_filepath):
-        self.number_of_deleted_records = 0
-        txt_header = self._get_txt_header(txt_filepath=txt_filepath)
-        txt_filepath = txt_filepath[:-4] + "_2.txt"
-        with open(txt_filepath, 'w') as txt_file:
-            block_remaining = self.block_size - self.blocking_factor * self.record_size
-            block_padding = "#" * block_remaining
-            block = ''
-            remaining_records = self.number_of_records - (self.number_of_records // self.blocking_factor)
-            txt_file.write(txt_header)
-            for i in range(0, len(ordered_records)):
-                record = ordered_records[i]
-                try:
-                    block += record
-                    if (i + 1) % self.blocking_factor == 0:
-                        block += block_padding + '\n'
-                        txt_file.write(block)
-                        block = ''
-                    elif i == self.number_of_records:
-                        additional_padding = "#" * (self.block_size - self.record_size * remaining_records)
-                        block += additional_padding + '\n'
-                        txt_file.write(block)
-                except:
-                    raise Exception(f"WriteError: Could Not Write Record: {record}")
-
     def _delete_file(self, filepath):
         if os.path.exists(filepath):
             try:
@@ -590,33 +760,46 @@ class Ordered_File:
         else:
             raise Exception(f"DeleteFileError: The File {filepath} Does Not Exists.")
 
-    def _rename_txt_file(self, txt_filepath):
-        txt2_filepath = txt_filepath[:-4] + "_2.txt"
-        os.rename(txt2_filepath, txt_filepath)
+    def _unordered_records(self):
+        # Yields every record of the txt and ext blocks
+        for (i, j, record) in self._scan_records():
+            yield record
+
+    def _pack_ordered_records(self, ordered_records):
+        # Packs the ordered records in full blocks, yielding each block as soon as it is full, with its fence
+        number_of_blocks = 0
+        block = ''
+        self._clear_fences()
+        for record in ordered_records:
+            if block == '':
+                self._add_fence(block_id=number_of_blocks, record=record)
+            block += record
+            if len(block) == self.blocking_factor * self.record_size:
+                yield block + "#" * (self.block_size - len(block))
+                number_of_blocks += 1
+                block = ''
+        if block != '':
+            yield block + "#" * (self.block_size - len(block))
 
     def _reordering(self, txt_filepath, ext_filepath):
-        records = []
-        for i in range(0, len(self.blocks)):
-            self.accessed_blocks += 1
-            block = self.blocks[i]
-            for j in range(0, self.blocking_factor):
-                record = block[self.record_size * j:self.record_size * (j + 1)]
-                if record.strip("#") != "":
-                    records.append(record)
-        for i in range(0, len(self.ext_blocks)):
-            self.accessed_blocks += 1
-            block = self.ext_blocks[i]
-            for j in range(0, self.blocking_factor):
-                record = block[self.record_size * j:self.record_size * (j + 1)]
-                if record.strip("#") != "":
-                    records.append(record)
-        ordered_records = self._merge_sort(records=records)
-        self._recreating_txt_file(ordered_records=ordered_records, txt_filepath=txt_filepath)
-        self._delete_file(filepath=txt_filepath)
-        self._delete_file(filepath=ext_filepath)
-        # self._rename_txt_file(txt_filepath=txt_filepath)
+        # The external sort reads every record before it yields the first one, so the ordered blocks are written over
+        # the txt blocks as they are packed, and are written back and truncated by the caller
+        ordered_records = self._sort_records(records=self._unordered_records())
+        self.blocks.reset(blocks=self._pack_ordered_records(ordered_records=ordered_records))
+        self.ext_blocks.reset(blocks=[])
+        self.number_of_blocks = len(self.blocks)
+        self.number_of_deleted_records = 0
+        self._write_fence_file(txt_filepath=txt_filepath)
+        # Every record may have moved, so the secondary indexes are built again from a scan of the ordered blocks
+        for field_id in list(self.secondary_indexes.indexes):
+            self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records(), memory_budget=self.memory_budget)
 
     def _delete_record(self, block_id, record_id):
+        # Removes the record from the secondary indexes
+        if self.secondary_indexes.has_indexes():
+            select_container = []
+            self._select(select_container=select_container, block_id=block_id, record_id=record_id)
+            self.secondary_indexes.delete_record(record=select_container[0], block_id=block_id, record_id=record_id)
         # If block is in txt file
         if block_id < len(self.blocks):
             block = self.blocks[block_id]
@@ -629,7 +812,7 @@ class Ordered_File:
             self.number_of_deleted_records += 1
         else:
             # If block is in ext file
-            ext_block_id = len(self.blocks) - block_id
+            ext_block_id = block_id - len(self.blocks)
             block = self.ext_blocks[ext_block_id]
             # Deletes record from block
             head = block[:self.record_size * record_id]
@@ -638,34 +821,31 @@ class Ordered_File:
             block = head + body + tail
             self.ext_blocks[ext_block_id] = block
             self.number_of_deleted_records += 1
-        self.accessed_blocks += 1
 
+    @measured_operation
     def delete_record_by_primary_key(self, txt_filepath, key):
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         ext_filepath = self._read_extension_file(txt_filepath=txt_filepath)
         # Searchs for position of record to be deleted
         for (i, j) in self._search(field_id=0, value=key):
             if i == -1 and j == -1:
-                txt_file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._close_txt_file(file=txt_file)
                 raise Exception('DeleteError: Primary Key nonexistent.')
             else:
                 # Deletes the record
                 self._delete_record(block_id=i, record_id=j)
                 # Updates txt file header
                 self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
-                txt_file.close()
+                self._close_txt_file(file=txt_file)
                 # Checks if reordering is to be done
                 if self.number_of_deleted_records >= 50:
                     self._reordering(txt_filepath=txt_filepath, ext_filepath=ext_filepath)
                 # Writes txt file
-                self._write_txt_file(txt_filepath=txt_filepath)
+                self._save_txt_file(txt_filepath=txt_filepath)
                 # Writes ext file
-                self._write_ext_file(ext_filepath=ext_filepath)
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._save_ext_file(txt_filepath=txt_filepath, ext_filepath=ext_filepath)
     
+    @measured_operation
     def delete_record_by_criterion(self, txt_filepath, field, value):
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         ext_filepath = self._read_extension_file(txt_filepath=txt_filepath)
@@ -673,22 +853,48 @@ class Ordered_File:
         # Searchs for positions of records to be deleted
         for (i, j) in self._search(field_id=field_id, value=value):
             if i == -1 and j == -1:
-                txt_file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                self._close_txt_file(file=txt_file)
                 raise Exception('DeleteError: Field Value nonexistent.')
             else:
                 # Deletes the record
                 self._delete_record(block_id=i, record_id=j)
         # Updates txt file header
         self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
-        txt_file.close()
+        self._close_txt_file(file=txt_file)
         # Checks if reordering is to be done
         if self.number_of_deleted_records >= 50:
             self._reordering(txt_filepath=txt_filepath, ext_filepath=ext_filepath)
         # Writes txt file
-        self._write_txt_file(txt_filepath=txt_filepath)
+        self._save_txt_file(txt_filepath=txt_filepath)
         # Writes ext file
-        self._write_ext_file(ext_filepath=ext_filepath)
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
\ No newline at end of file
+        self._save_ext_file(txt_filepath=txt_filepath, ext_filepath=ext_filepath)
+
+    def _rebuild_secondary_indexes(self, txt_filepath):
+        # Tables without indexes are not read again
+        if not has_index_files(txt_filepath=txt_filepath, field_names=self.field_names):
+            return
+        txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self._read_extension_file(txt_filepath=txt_filepath)
+        self._close_txt_file(file=txt_file)
+        for field_id in list(self.secondary_indexes.indexes):
+            self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+
+    @measured_operation
+    def create_index(self, txt_filepath, field):
+        txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self._read_extension_file(txt_filepath=txt_filepath)
+        self._close_txt_file(file=txt_file)
+        # Checks if field exists
+        if field not in self.field_names:
+            raise Exception('IndexError: Field nonexistent.')
+        field_id = self.field_names.index(field)
+        # Builds the index from a single scan of the txt and ext blocks
+        self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+
+    @measured_operation
+    def drop_index(self, txt_filepath, field):
+        txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self._close_txt_file(file=txt_file)
+        if field not in self.field_names or not self.secondary_indexes.has_index(field_id=self.field_names.index(field)):
+            raise Exception('IndexError: Index nonexistent.')
+        self.secondary_indexes.drop_index(field_id=self.field_names.index(field))
@@ -0,0 +1,225 @@
+"""
+Formatos de página dos registros de tamanho fixo: texto, com campos preenchidos por espaços e separados por vírgulas,
+ou binário, com os campos empacotados de acordo com os seus tipos.
+"""
+
+import struct
+from functools import lru_cache
+from datetime import date, timedelta
+
+from Block_Manager import field_bounds, encode_field_value
+
+TEXT_FORMAT = 'text'
+BINARY_FORMAT = 'binary'
+PAGE_FORMATS = [TEXT_FORMAT, BINARY_FORMAT]
+
+EPOCH = date(1970, 1, 1)
+
+# Status byte of binary records, deleted records are filled with '#' like in the text format
+LIVE_RECORD = b' '
+
+# Dates and times are few and repeat across the records of a load, so their encoded values are cached too
+@lru_cache(maxsize=None)
+def date_to_days(value):
+    year, month, day = value.split('-')
+    return (date(int(year), int(month), int(day)) - EPOCH).days
+
+# Dates and times repeat across records, so their decoded text is cached
+@lru_cache(maxsize=None)
+def days_to_date(days):
+    return (EPOCH + timedelta(days=days)).isoformat()
+
+@lru_cache(maxsize=None)
+def time_to_seconds(value):
+    hours, minutes, seconds = value.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+@lru_cache(maxsize=None)
+def seconds_to_time(seconds):
+    return f'{seconds // 3600:02d}:{(seconds // 60) % 60:02d}:{seconds % 60:02d}'
+
+def parse_field(field_type, value):
+    # Typed value of a text field, so that fields are compared as numbers, dates and times
+    if field_type == 'int':
+        return int(value)
+    elif field_type == 'float':
+        return float(value)
+    elif field_type == 'date':
+        return date_to_days(value)
+    elif field_type == 'time':
+        return time_to_seconds(value)
+    else:
+        return value
+
+def text_key(field_type, value):
+    # Dates and times are zero padded, so they are compared as text, numbers are compared as numbers
+    if field_type == 'int':
+        return int(value)
+    elif field_type == 'float':
+        return float(value)
+    else:
+        return value.strip()
+
+class Text_Record_Format:
+    def __init__(self, field_sizes, field_types):
+        self.page_format = TEXT_FORMAT
+        self.field_sizes = field_sizes
+        self.field_types = field_types
+        # Each field is followed by a comma
+        self.record_size = sum(self.field_sizes) + len(self.field_sizes)
+        # Each field is padded with spaces up to its size, so that a record is formatted with a single call
+        self.record_template = ''.join(f'{{:<{field_size}}},' for field_size in self.field_sizes)
+
+    def encode_record(self, record):
+        return self.record_template.format(*record.strip().split(',')).encode()
+
+    def encode_field(self, field_id, value):
+        return encode_field_value(value=value, field_size=self.field_sizes[field_id])
+
+    def field_slice(self, field_id):
+        start, end = field_bounds(field_sizes=self.field_sizes, field_id=field_id)
+        return slice(start, end)
+
+    def decode_record(self, record):
+        return str(record, 'utf-8')
+
+    def decode_field(self, field_id, record):
+        value = str(record[self.field_slice(field_id=field_id)], 'utf-8').strip()
+        return parse_field(field_type=self.field_types[field_id], value=value)
+
+    def field_key(self, field_id, record):
+        return text_key(field_type=self.field_types[field_id], value=str(record[self.field_slice(field_id=field_id)], 'utf-8'))
+
+    def value_key(self, field_id, value):
+        return text_key(field_type=self.field_types[field_id], value=value)
+
+class Binary_Record_Format:
+    def __init__(self, field_sizes, field_types):
+        self.page_format = BINARY_FORMAT
+        self.field_sizes = field_sizes
+        self.field_types = field_types
+        self.field_structs = [self._field_struct(field_id=i) for i in range(len(self.field_sizes))]
+        # Fields are packed after the status byte
+        self.field_offsets = []
+        offset = len(LIVE_RECORD)
+        for field_struct in self.field_structs:
+            self.field_offsets.append(offset)
+            offset += field_struct.size
+        self.record_size = offset
+        # Whole record struct, so that a record is decoded with a single unpack
+        self.record_struct = struct.Struct('<x' + ''.join(field_struct.format[1:] for field_struct in self.field_structs))
+        # Fields packed after the status byte, so that a record is encoded with a single pack
+        self.fields_struct = struct.Struct('<' + ''.join(field_struct.format[1:] for field_struct in self.field_structs))
+        self.field_parsers = [self._field_parser(field_id=i) for i in range(len(self.field_sizes))]
+
+    def _field_parser(self, field_id):
+        # Strings are packed as their length and their bytes, so they have no parser
+        return {'int': int, 'float': float, 'date': date_to_days, 'time': time_to_seconds}.get(self.field_types[field_id])
+
+    def _field_struct(self, field_id):
+        field_type = self.field_types[field_id]
+        field_size = self.field_sizes[field_id]
+        if field_type == 'int':
+            # Smallest integer that holds every value with field_size characters
+            if field_size <= 2:
+                return struct.Struct('<b')
+            elif field_size <= 4:
+                return struct.Struct('<h')
+            elif field_size <= 9:
+                return struct.Struct('<i')
+            return struct.Struct('<q')
+        elif field_type == 'float':
+            return struct.Struct('<d')
+        elif field_type in ['date', 'time']:
+            # Days since epoch and seconds of the day
+            return struct.Struct('<i')
+        else:
+            # Length prefixed string, padded up to the field size
+            return struct.Struct(('<B' if field_size < 256 else '<H') + f'{field_size}s')
+
+    def encode_field(self, field_id, value):
+        field_type = self.field_types[field_id]
+        try:
+            if field_type in ['int', 'float', 'date', 'time']:
+                return self.field_structs[field_id].pack(parse_field(field_type=field_type, value=value.strip()))
+            encoded_value = value.encode()
+            if len(encoded_value) > self.field_sizes[field_id]:
+                return None
+            return self.field_structs[field_id].pack(len(encoded_value), encoded_value)
+        except (ValueError, struct.error):
+            # Values that can not be stored in the field never match any record
+            return None
+
+    def _encode_record_by_field(self, record_fields):
+        encoded_fields = [LIVE_RECORD]
+        for i in range(len(self.field_sizes)):
+            encoded_field = self.encode_field(field_id=i, value=record_fields[i])
+            if encoded_field == None:
+                raise Exception(f'EncodeError: Could Not Encode Field: {record_fields[i]}')
+            encoded_fields.append(encoded_field)
+        return b''.join(encoded_fields)
+
+    def encode_record(self, record):
+        record_fields = record.strip().split(',')
+        values = []
+        try:
+            for i in range(len(self.field_sizes)):
+                field_parser = self.field_parsers[i]
+                if field_parser != None:
+                    values.append(field_parser(record_fields[i].strip()))
+                    continue
+                encoded_value = record_fields[i].encode()
+                # Longer strings would be truncated by the struct
+                if len(encoded_value) > self.field_sizes[i]:
+                    raise ValueError
+                values.append(len(encoded_value))
+                values.append(encoded_value)
+            return LIVE_RECORD + self.fields_struct.pack(*values)
+        except (ValueError, IndexError, struct.error):
+            # Encodes field by field, which tells the field that can not be encoded
+            return self._encode_record_by_field(record_fields=record_fields)
+
+    def field_slice(self, field_id):
+        start = self.field_offsets[field_id]
+        return slice(start, start + self.field_structs[field_id].size)
+
+    def decode_field(self, field_id, record):
+        field_type = self.field_types[field_id]
+        if field_type in ['int', 'float', 'date', 'time']:
+            return self.field_structs[field_id].unpack_from(record, self.field_offsets[field_id])[0]
+        length, value = self.field_structs[field_id].unpack_from(record, self.field_offsets[field_id])
+        return value[:length].decode()
+
+    def field_key(self, field_id, record):
+        return self.decode_field(field_id=field_id, record=record)
+
+    def value_key(self, field_id, value):
+        return parse_field(field_type=self.field_types[field_id], value=value.strip())
+
+    def decode_record(self, record):
+        # Records are returned in the text format, so that both formats give the same results
+        values = self.record_struct.unpack(record)
+        record_fields = []
+        k = 0
+        for i in range(len(self.field_sizes)):
+            field_type = self.field_types[i]
+            if field_type == 'date':
+                value = days_to_date(days=values[k])
+            elif field_type == 'time':
+                value = seconds_to_time(seconds=values[k])
+            elif field_type in ['int', 'float']:
+                value = str(values[k])
+            else:
+                # Strings are unpacked as their length followed by their padded bytes
+                value = values[k + 1][:values[k]].decode()
+                k += 1
+            k += 1
+            record_fields.append(value.ljust(self.field_sizes[i]))
+        return ','.join(record_fields) + ','
+
+def record_format(page_format, field_sizes, field_types):
+    if page_format == TEXT_FORMAT:
+        return Text_Record_Format(field_sizes=field_sizes, field_types=field_types)
+    elif page_format == BINARY_FORMAT:
+        return Binary_Record_Format(field_sizes=field_sizes, field_types=field_types)
+    raise Exception(f'FormatError: Page Format {page_format} nonexistent.')
@@ -0,0 +1,113 @@
+"""
+Validação em lote dos registros inseridos: os verificadores de cada campo são compilados uma única vez a partir do
+esquema da tabela, e os registros são separados pelo leitor de csv do pandas e verificados coluna por coluna. Cada valor
+distinto de uma coluna é verificado uma única vez, as colunas de inteiros e floats de uma só vez por uma expressão
+regular, e as colunas com valores inválidos marcam os seus registros em máscaras do NumPy. Todos os registros inválidos
+são retornados com os seus motivos, no lugar de interromper a validação no primeiro.
+"""
+
+import csv
+import io
+import re
+
+import numpy as np
+import pandas as pd
+
+from Schema import FIELD_CHECKS, INT_PATTERN, FLOAT_PATTERN
+
+INCORRECT_NUMBER_OF_FIELDS = 'Incorrect Number of Fields'
+LINE_BREAK_INSIDE_THE_RECORD = 'Line Break inside the Record'
+# Records with fields out of place are only reported once
+MISPLACED_FIELDS_REASONS = [[INCORRECT_NUMBER_OF_FIELDS], [LINE_BREAK_INSIDE_THE_RECORD]]
+
+# Types checked by their pattern alone have the values of a column matched at once, one value per line
+COLUMN_PATTERNS = {field_type: re.compile(r'(?:[^\S\n]*(?:' + pattern.pattern + r')[^\S\n]*\n)*') for (field_type, pattern) in [('int', INT_PATTERN), ('float', FLOAT_PATTERN)]}
+
+class Record_Validator:
+    def __init__(self, schema, field_sizes=True):
+        self.schema = schema
+        self.number_of_fields = len(schema.field_names)
+        # Any text is a string, so only the other fields have type checks
+        self.field_checks = [FIELD_CHECKS[field_type] if field_type != 'string' else None for field_type in schema.field_types]
+        self.column_patterns = [COLUMN_PATTERNS.get(field_type) for field_type in schema.field_types]
+        # Organizations without fixed fields do not limit their sizes
+        self.field_sizes = schema.field_sizes if field_sizes else [None] * self.number_of_fields
+
+    def _invalid_values(self, field_id, column):
+        # Values repeat across the records, so each distinct value of the field is checked once
+        distinct_values = set(column)
+        invalid_values = dict()
+        # Each value is only checked when the column has some value that does not match its pattern
+        column_pattern = self.column_patterns[field_id]
+        if self.field_checks[field_id] != None and (column_pattern == None or column_pattern.fullmatch('\n'.join(distinct_values) + '\n') == None):
+            for value in distinct_values:
+                if not self.field_checks[field_id](value.strip()):
+                    invalid_values[value] = [f'{self.schema.field_names[field_id]} is not {self.schema.field_types[field_id]}']
+        field_size = self.field_sizes[field_id]
+        if field_size != None and max(map(len, distinct_values)) > field_size:
+            for value in distinct_values:
+                if len(value) > field_size:
+                    invalid_values.setdefault(value, []).append(f'{self.schema.field_names[field_id]} longer than {field_size}')
+        return invalid_values
+
+    def _rows_with_values(self, column, values):
+        return np.flatnonzero(np.fromiter((value in values for value in column), dtype=bool, count=len(column)))
+
+    def _read_columns(self, records, reasons):
+        # The fields of the records are split by the csv parser of pandas, one record per line and without quoting,
+        # and the records that miss fields have them empty
+        records = [record.strip() for record in records]
+        records_text = '\n'.join(records)
+        if records_text.count('\n') != len(records) - 1:
+            for i in range(0, len(records)):
+                if '\n' in records[i]:
+                    reasons[i] = [LINE_BREAK_INSIDE_THE_RECORD]
+            records_text = '\n'.join(record.replace('\n', ' ') for record in records)
+        number_of_records_fields = np.fromiter((record.count(',') + 1 for record in records), dtype=np.int64, count=len(records))
+        records_fields = pd.read_csv(io.StringIO(records_text), header=None, names=range(0, int(number_of_records_fields.max())), index_col=False, dtype=object, na_filter=False, quoting=csv.QUOTE_NONE, skip_blank_lines=False, lineterminator='\n', engine='c')
+        columns = [records_fields[field_id].to_numpy() if field_id in records_fields else np.full(len(records), '', dtype=object) for field_id in range(0, self.number_of_fields)]
+        return columns, number_of_records_fields
+
+    def _validate_fields(self, records, reasons):
+        columns, number_of_records_fields = self._read_columns(records=records, reasons=reasons)
+        for i in np.flatnonzero(number_of_records_fields < self.number_of_fields):
+            if int(i) not in reasons:
+                reasons[int(i)] = [INCORRECT_NUMBER_OF_FIELDS]
+        for field_id in range(0, self.number_of_fields):
+            invalid_values = self._invalid_values(field_id=field_id, column=columns[field_id])
+            if invalid_values != dict():
+                for i in self._rows_with_values(column=columns[field_id], values=invalid_values):
+                    for reason in invalid_values[columns[field_id][i]]:
+                        self._add_reason(reasons=reasons, i=int(i), reason=reason)
+
+    def _validate_primary_keys(self, primary_keys, search_primary_keys, reasons):
+        # Records can not repeat a primary key among themselves, the first one is kept
+        repeated_primary_keys = pd.Series(primary_keys, dtype=object).duplicated(keep='first').to_numpy()
+        for i in np.flatnonzero(repeated_primary_keys):
+            self._add_reason(reasons=reasons, i=int(i), reason='Primary Key repeated in the records')
+        # Primary keys of the records with valid fields are checked in a single search of the table
+        valid_primary_keys = [primary_keys[i] for i in range(0, len(primary_keys)) if i not in reasons]
+        if valid_primary_keys == []:
+            return
+        existing_primary_keys = search_primary_keys(keys=valid_primary_keys)
+        for i in range(0, len(primary_keys)):
+            if i not in reasons and primary_keys[i] in existing_primary_keys:
+                reasons[i] = ['Primary Key already in the table']
+
+    def _add_reason(self, reasons, i, reason):
+        if i not in reasons:
+            reasons[i] = [reason]
+        elif reasons[i] not in MISPLACED_FIELDS_REASONS:
+            reasons[i].append(reason)
+
+    def validate(self, records, primary_keys, search_primary_keys):
+        # Invalid records as [position, reasons], empty if every record is valid
+        reasons = dict()
+        if records == []:
+            return []
+        self._validate_fields(records=records, reasons=reasons)
+        self._validate_primary_keys(primary_keys=primary_keys, search_primary_keys=search_primary_keys, reasons=reasons)
+        return [[i, '; '.join(reasons[i])] for i in sorted(reasons)]
+
+def invalid_records_message(invalid_records):
+    return 'InsertError: Invalid Records: ' + ', '.join(f'record {i} ({reason})' for (i, reason) in invalid_records) + '.'
@@ -0,0 +1,127 @@
+"""
+Esquema das tabelas: nomes, tipos e tamanhos máximos dos campos e a chave primária. O esquema pode ser declarado ao
+construir a tabela a partir do csv, dispensando a inferência dos tipos pelo primeiro registro e, quando os tamanhos são
+dados, a passada pelo csv que os calcula, e é guardado no cabeçalho da tabela. Os tipos dos registros inseridos são
+verificados por funções compiladas uma única vez para cada tipo, no lugar da inferência por expressões regulares.
+"""
+
+import re
+from datetime import date
+from functools import lru_cache
+
+from Util import infer_types_from_record
+
+FIELD_TYPES = ['int', 'float', 'date', 'time', 'string']
+
+INT_PATTERN = re.compile(r'[+-]?\d+')
+FLOAT_PATTERN = re.compile(r'[+-]?\d*\.\d+')
+DATE_PATTERN = re.compile(r'(\d{4})-(\d{2})-(\d{2})')
+TIME_PATTERN = re.compile(r'(\d{2}):(\d{2}):(\d{2})')
+
+# Bytes read at a time when the csv lines are counted
+COUNT_BUFFER_SIZE = 1024 * 1024
+
+def is_int(value):
+    return INT_PATTERN.fullmatch(value) != None
+
+def is_float(value):
+    return FLOAT_PATTERN.fullmatch(value) != None
+
+# Dates and times repeat across records, so their checks are cached
+@lru_cache(maxsize=None)
+def is_date(value):
+    match = DATE_PATTERN.fullmatch(value)
+    if match == None:
+        return False
+    try:
+        date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        return True
+    except ValueError:
+        return False
+
+@lru_cache(maxsize=None)
+def is_time(value):
+    # Seconds go up to 61, as in strptime
+    match = TIME_PATTERN.fullmatch(value)
+    return match != None and int(match.group(1)) < 24 and int(match.group(2)) < 60 and int(match.group(3)) < 62
+
+def is_string(value):
+    return True
+
+FIELD_CHECKS = {'int': is_int, 'float': is_float, 'date': is_date, 'time': is_time, 'string': is_string}
+
+class Schema:
+    def __init__(self, field_names, field_types, field_sizes=None, primary_key=None):
+        if len(field_types) != len(field_names) or (field_sizes != None and len(field_sizes) != len(field_names)):
+            raise Exception('SchemaError: Incorrect Number of Field Types or Sizes.')
+        for field_type in field_types:
+            if field_type not in FIELD_TYPES:
+                raise Exception(f'SchemaError: Field Type {field_type} nonexistent.')
+        # The records of every organization are kept and searched by their first field
+        if primary_key == None:
+            primary_key = field_names[0]
+        if primary_key != field_names[0]:
+            raise Exception('SchemaError: Primary Key must be the First Field.')
+        self.field_names = list(field_names)
+        self.field_types = list(field_types)
+        self.field_sizes = list(field_sizes) if field_sizes != None else None
+        self.primary_key = primary_key
+        self.field_checks = [FIELD_CHECKS[field_type] for field_type in self.field_types]
+
+    def check_record_types(self, record):
+        record_fields = record.strip().split(',')
+        if len(record_fields) < len(self.field_names):
+            return False
+        for (field_check, record_field) in zip(self.field_checks, record_fields):
+            if not field_check(record_field.strip()):
+                return False
+        return True
+
+    def __repr__(self):
+        return f'Schema(field_names={self.field_names}, field_types={self.field_types}, field_sizes={self.field_sizes}, primary_key={self.primary_key!r})'
+
+def count_csv_records(csv_filepath):
+    # Lines of the csv after its header, counted without decoding them
+    number_of_lines = 0
+    last_byte = b'\n'
+    with open(csv_filepath, 'rb') as csv_file:
+        chunk = csv_file.read(COUNT_BUFFER_SIZE)
+        while chunk != b'':
+            number_of_lines += chunk.count(b'\n')
+            last_byte = chunk[-1:]
+            chunk = csv_file.read(COUNT_BUFFER_SIZE)
+    # The last line may not end with a new line
+    if last_byte != b'\n':
+        number_of_lines += 1
+    return max(0, number_of_lines - 1)
+
+def read_csv_schema(csv_file, field_names, schema=None, field_sizes=True):
+    # Schema of the records of the csv, whose header was already read, and their number if the csv was read for it.
+    # A given schema is only completed with the field sizes, when the organization needs them and they were not given
+    if schema != None:
+        if schema.field_names != field_names:
+            raise Exception('SchemaError: Field Names differ from the csv header.')
+        if schema.field_sizes != None or not field_sizes:
+            return schema, None
+    # The records have few distinct combinations of field lengths, so the combinations are gathered in a single
+    # pass over the csv and the largest length of each field is taken from them
+    field_types = schema.field_types if schema != None else None
+    field_lengths = set()
+    number_of_records = 0
+    for record in csv_file.read_records():
+        # Field types are inferred from the first record
+        if field_types == None:
+            field_types = infer_types_from_record(record, len(field_names))
+        number_of_records += 1
+        if not field_sizes:
+            break
+        field_lengths.add(tuple(map(len, record.strip().split(','))))
+    if field_types == None:
+        raise Exception('SchemaError: Field Types of a csv without records must be declared.')
+    if not field_sizes:
+        return Schema(field_names=field_names, field_types=field_types), None
+    sizes = [0] * len(field_names)
+    for record_field_lengths in field_lengths:
+        for i in range(min(len(field_names), len(record_field_lengths))):
+            sizes[i] = max(sizes[i], record_field_lengths[i])
+    return Schema(field_names=field_names, field_types=field_types, field_sizes=sizes), number_of_records
@@ -0,0 +1,106 @@
+"""
+Índices secundários de uma tabela, um arquivo com uma Árvore B+ por campo indexado, mapeando valor -> (bloco, registro).
+Os índices são encontrados pelo nome do arquivo, e são mantidos pelas inserções, deleções e movimentações de registros.
+"""
+
+import os
+
+from B_Plus_Tree import B_Plus_Tree
+from External_Sort import MEMORY_BUDGET
+from Record_Format import text_key
+
+def index_filepath(txt_filepath, field_name):
+    return txt_filepath[:-4] + '_' + field_name + '_Index.txt'
+
+def has_index_files(txt_filepath, field_names):
+    for field_name in field_names:
+        if os.path.exists(index_filepath(txt_filepath=txt_filepath, field_name=field_name)):
+            return True
+    return False
+
+class Secondary_Indexes:
+    def __init__(self, txt_filepath, field_names, field_types):
+        self.txt_filepath = txt_filepath
+        self.field_names = field_names
+        self.field_types = field_types
+        # Trees of the indexed fields, by field id
+        self.indexes = dict()
+        for field_id in range(len(self.field_names)):
+            filepath = index_filepath(txt_filepath=txt_filepath, field_name=self.field_names[field_id])
+            if os.path.exists(filepath):
+                index = B_Plus_Tree(index_filepath=filepath)
+                index.open()
+                self.indexes[field_id] = index
+
+    def has_indexes(self):
+        return self.indexes != dict()
+
+    def has_index(self, field_id):
+        return field_id in self.indexes
+
+    def _key(self, field_id, record):
+        return text_key(field_type=self.field_types[field_id], value=record.split(',')[field_id])
+
+    def create_index(self, field_id, records, memory_budget=MEMORY_BUDGET):
+        # Records are given as (block_id, record_id, record) for every record of the table, their entries are sorted
+        # with at most memory_budget bytes in memory
+        if field_id in self.indexes:
+            self.indexes[field_id].close()
+        index = B_Plus_Tree(index_filepath=index_filepath(txt_filepath=self.txt_filepath, field_name=self.field_names[field_id]))
+        keys = ((self._key(field_id=field_id, record=record), block_id, record_id) for (block_id, record_id, record) in records)
+        index.create(field_name=self.field_names[field_id], key_type=self.field_types[field_id], keys=keys, memory_budget=memory_budget)
+        self.indexes[field_id] = index
+
+    def drop_index(self, field_id):
+        self.indexes[field_id].close()
+        os.remove(self.indexes[field_id].index_filepath)
+        del self.indexes[field_id]
+
+    def insert_record(self, record, block_id, record_id):
+        for field_id in self.indexes:
+            self.indexes[field_id].insert(key=(self._key(field_id=field_id, record=record), block_id, record_id))
+
+    def delete_record(self, record, block_id, record_id):
+        for field_id in self.indexes:
+            self.indexes[field_id].delete(key=(self._key(field_id=field_id, record=record), block_id, record_id))
+
+    def move_record(self, record, block_id, record_id, new_block_id, new_record_id):
+        self.delete_record(record=record, block_id=block_id, record_id=record_id)
+        self.insert_record(record=record, block_id=new_block_id, record_id=new_record_id)
+
+    def move_records(self, moves):
+        # Moves of a whole reorganisation, given as (block_id, record_id) -> (new_block_id, new_record_id)
+        for field_id in self.indexes:
+            self.indexes[field_id].remap(moves=moves)
+
+    def search(self, field_id, value):
+        # Positions are read before they are returned, since deleting them changes the leaves being read
+        try:
+            key = text_key(field_type=self.field_types[field_id], value=value)
+        except ValueError:
+            # Values that can not be parsed as the field type never match any record
+            return []
+        return list(self.indexes[field_id].search(key=key))
+
+    def search_interval(self, field_id, start, end):
+        field_type = self.field_types[field_id]
+        start_key = text_key(field_type=field_type, value=start)
+        end_key = text_key(field_type=field_type, value=end)
+        return list(self.indexes[field_id].search_interval(start_key=start_key, end_key=end_key, interval_type=field_type))
+
+    def pop_accessed_pages(self):
+        # Index pages read since the last call, counted by the engines as accessed blocks
+        accessed_pages = 0
+        for field_id in self.indexes:
+            accessed_pages += self.indexes[field_id].accessed_pages
+            self.indexes[field_id].accessed_pages = 0
+        return accessed_pages
+
+    def flush(self):
+        for field_id in self.indexes:
+            self.indexes[field_id].flush()
+
+    def close(self):
+        for field_id in self.indexes:
+            self.indexes[field_id].close()
+        self.indexes = dict()
@@ -3,17 +3,50 @@ Implementação de Hash Externo Estático.
 """
 
 import math
+import itertools
 from datetime import datetime
 
 import tarfile
 import os
 
-from Util import infer_types_from_record, check_interval, generate_range
+from Util import check_interval, interval_contains
+from Buffered_Reader import Buffered_Reader, read_line, read_lines
+from Header_Layout import Header_Layout, write_header
+from Block_Manager import Block_Manager, field_bounds, encode_field_value
+from Buffer_Pool import BUFFER_POOL
+from Io_Metrics import Io_Counters, measured_operation
+from Record_Format import Text_Record_Format
+from Secondary_Index import Secondary_Indexes, has_index_files
+from Hash_Functions import HASH_FUNCTIONS, INTEGER_HASH_FUNCTIONS, default_hash_function, make_hash_function, previous_prime
+from External_Sort import MEMORY_BUDGET, external_sort
+from Schema import Schema, read_csv_schema, count_csv_records
+from Record_Validator import Record_Validator, invalid_records_message
+
+# Pointer of the last bucket of a chain and of the last free overflow bucket
+NO_BUCKET = -1
+# Buckets written by the bulk load are gathered until they fill this many bytes, and then written at once
+WRITE_BUFFER_SIZE = 1024 * 1024
 
 class Static_External_Hash:
-    def __init__(self, block_size):
+    def __init__(self, block_size, compressed=False, memory_budget=MEMORY_BUDGET, buffer_pool=BUFFER_POOL, metrics_sink=None):
         self.block_size = block_size
-        self.accessed_blocks = 0
+        # Memory used by the bulk load to partition the records by bucket before writing them
+        self.memory_budget = memory_budget
+        # Buckets are read and written through the buffer pool
+        self.buffer_pool = buffer_pool
+        self.blocks_manager = None
+        self.layout = None
+        # If compressed, the table is kept as a gzip file and decompressed on every operation,
+        # otherwise the txt file stays uncompressed and is only compressed by archive_txt_file
+        self.compressed = compressed
+        self.opened_txt_filepath = None
+        self.opened_txt_file = None
+        self.secondary_indexes = None
+        # I/O of the operations, the statistics of the last operation are also given to the metrics sink
+        self.io_counters = Io_Counters()
+        self.metrics_sink = metrics_sink
+        self.last_operation_stats = None
+        self.operation_in_progress = False
 
     def _set_field_names(self, fields_names):
         self.field_names = fields_names.strip().split(',')
@@ -21,100 +54,99 @@ class Static_External_Hash:
     def _set_field_sizes(self, field_sizes):
         self.field_sizes = field_sizes
     
-    def _set_field_types(self, record):
-        self.field_types = infer_types_from_record(record, len(self.field_names))
+    def _set_schema(self, schema):
+        self.schema = schema
+        self.field_names = schema.field_names
+        self.field_types = schema.field_types
+        self._set_field_sizes(field_sizes=schema.field_sizes)
+        self.record_validator = Record_Validator(schema=schema)
 
     def _set_record_size(self):
         self.record_size = sum(self.field_sizes) + len(self.field_sizes)
     
     def _set_blocking_factor(self):
-        self.blocking_factor = math.floor(self.block_size / self.record_size)
+        # The end of each bucket is taken by the pointer to the next bucket of its chain
+        self.blocking_factor = math.floor((self.block_size - self.pointer_size) / self.record_size)
 
-    def _read_line(self, file):
-        char = file.read(1)
-        line = ''
-
-        while char and char != '\n':
-            line += char
-            char = file.read(1)
-        return line
+    def _set_pointer_size(self):
+        # Wide enough for the id of any bucket and for NO_BUCKET
+        self.pointer_size = max(len(str(NO_BUCKET)), len(str(self.number_of_buckets + self.number_of_overflow_buckets)))
 
     def _read_csv_header(self, file):
-        csv_header = self._read_line(file=file)
+        csv_header = read_line(file=file)
         self._set_field_names(fields_names=csv_header)
 
-    def _calculate_csv_field_sizes(self, file):
-        field_sizes = dict()
-        for field in self.field_names:
-            field_sizes[field] = 0
-        record = self._read_line(file=file)
-        self.number_of_records = 0
-        self._set_field_types(record=record)
-        while record != '':
-            self.number_of_records += 1
-            record_fields = record.strip().split(',')
-            for i in range(len(self.field_names)):
-                if len(record_fields[i]) > field_sizes[self.field_names[i]]:
-                    field_sizes[self.field_names[i]] = int(len(record_fields[i]))
-            record = self._read_line(file=file)
-        self._set_field_sizes(field_sizes=list(field_sizes.values()))
-    
-    def _is_prime(self, n):
-        for i in range(2, int(math.sqrt(n)+1)):
-            if n % i == 0:
-                return False
-        return True
-
-    def _closest_prime(self, n):
-        closest_prime = 2
-        for i in range(2, n+1):
-            if self._is_prime(n=i):
-                closest_prime = i
-        return closest_prime
-
-    def _set_hash_function(self):
+    def _read_csv_schema(self, file, schema):
+        # The csv is only read for the field types and sizes that were not given
+        schema, number_of_records = read_csv_schema(csv_file=file, field_names=self.field_names, schema=schema)
+        self._set_schema(schema=schema)
+        # The number of buckets depends on the number of records, which are counted without being parsed if the csv was not read
+        self.number_of_records = number_of_records if number_of_records != None else count_csv_records(csv_filepath=file.filepath)
+
+    def _set_hash_function(self, hash_function):
+        # Integer keys are hashed by the remainder of the division by a prime by default, other keys by their text
+        if hash_function == None:
+            hash_function = default_hash_function(key_type=self.field_types[0])
+        if hash_function not in HASH_FUNCTIONS:
+            raise Exception('HashError: Hash function nonexistent.')
+        if hash_function in INTEGER_HASH_FUNCTIONS and self.field_types[0] != 'int':
+            raise Exception('HashError: Hash function requires integer keys.')
+        self.hash_function_name = hash_function
         # Computes the number of buckets and overflow buckets that will be created
         M_approx = int(self.number_of_records / 0.7)
-        M = self._closest_prime(n=M_approx)
+        M = previous_prime(n=M_approx)
         M_over = int(0.3 * M)
         self.number_of_buckets = M
         self.number_of_overflow_buckets = M_over
+        self._set_pointer_size()
+        # Every overflow bucket starts in the free list
+        self.first_free_overflow_bucket = M if M_over > 0 else NO_BUCKET
         # Creates the hash function
-        self.hash_function = lambda key : key % self.number_of_buckets
+        self.hash_function = make_hash_function(name=self.hash_function_name, number_of_buckets=self.number_of_buckets)
 
     def _write_txt_header(self, txt_file, txt_filepath):
-        # Sets txt_file cursor at the beginning of the file
-        txt_file.seek(0, 0)
+        header = ''
         # Write table name
         table_name = txt_filepath.split('/')[2].split('.')[0]
-        txt_file.write(table_name + '\n')
+        header += table_name + '\n'
         # Write field names, sizes, types
         field_names = ','.join(str(field_name) for field_name in self.field_names) + '\n'
         field_sizes = ','.join(str(field_size) for field_size in self.field_sizes) + '\n'
         field_types = ','.join(str(field_type) for field_type in self.field_types) + '\n'
-        txt_file.write(field_names)
-        txt_file.write(field_sizes)
-        txt_file.write(field_types)
+        header += field_names
+        header += field_sizes
+        header += field_types
+        # Write primary key
+        header += self.schema.primary_key + '\n'
         # Write number of records
-        txt_file.write(str(self.number_of_records) + '\n')
+        header += str(self.number_of_records) + '\n'
         # Write blocking factor
-        txt_file.write(str(self.blocking_factor) + '\n')
+        header += str(self.blocking_factor) + '\n'
         # Write number of buckets
-        txt_file.write(str(self.number_of_buckets) + '\n')
+        header += str(self.number_of_buckets) + '\n'
         # Write number of overflow buckets
-        txt_file.write(str(self.number_of_overflow_buckets) + '\n')
+        header += str(self.number_of_overflow_buckets) + '\n'
+        # Write first free overflow bucket
+        header += str(self.first_free_overflow_bucket) + '\n'
+        # Write hash function
+        header += self.hash_function_name + '\n'
         # Write creation timestamp
         if self.creation_date == None:
             creation_timestamp = datetime.now()
             creation_timestamp = creation_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            txt_file.write(creation_timestamp + '\n')
+            header += creation_timestamp + '\n'
         else:
-            txt_file.write(self.creation_date + '\n')
+            header += self.creation_date + '\n'
         # Write alteration timestamp
         alteration_timestamp = datetime.now()
         alteration_timestamp = alteration_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        txt_file.write(alteration_timestamp + '\n')
-    
+        header += alteration_timestamp + '\n'
+        # Rewrites the header in place, moving the blocks if it outgrew its space
+        self.layout = write_header(txt_file=txt_file, header=header, layout=self.layout, block_size=self.block_size, io_counters=self.io_counters)
+        # Buckets of the table being written are found after the rewritten header
+        if self.blocks_manager != None and self.blocks_manager.file is txt_file:
+            self.blocks_manager.refresh(layout=self.layout)
+
     def _padding(self, record_field, field_id):
         diff = self.field_sizes[field_id] - len(record_field)
         padded_record_field = record_field + (' ' * diff)
@@ -131,120 +163,147 @@ class Static_External_Hash:
                 formatted_record += record_fields[i] + ','
         return formatted_record
     
-    def _header_length(self, file):
-        header_length = 0
-        for i in range(0, 10):
-            file.seek(header_length, 0)
-            line = self._read_line(file)
-            header_length += len(line)+1
-        return header_length
+    def _format_bucket(self, records, next_bucket_id):
+        # Records are kept at the beginning of the bucket, followed by padding and the pointer to the next bucket
+        padding = "#" * (self.block_size - self.pointer_size - self.record_size * len(records))
+        return ''.join(records) + padding + str(next_bucket_id).rjust(self.pointer_size)
 
     def _create_filled_buckets(self, file):
         # Sets cursor to after header
-        header_length = self._header_length(file=file)
-        file.seek(header_length, 0)
-        # Fills the space after header
-        filled_bucket = ("#" * self.block_size) + '\n'
-        for i in range(0, self.number_of_buckets + self.number_of_overflow_buckets):
-            file.write(filled_bucket)
-            offset = header_length + ((i + 1) * len(filled_bucket))
-
-    def _insert_record_in_bucket(self, record, file):
-        # Gets record primary key
-        record_fields = record.strip().split(',')
-        record_primary_key = record_fields[0]
-        # Evaluates record primary key in hash function to get expected bucket id
-        bucket_id = self.hash_function(int(record_primary_key))
-        # Read bucket
-        header_length = self._header_length(file=file)
-        offset = header_length + bucket_id * self.block_size + bucket_id
-        file.seek(offset, 0)
-        bucket = file.read(self.block_size)
-        # Checks if there is available space for insertion
-        available_space = self.block_size - len(bucket.strip('#'))
-        # If there is available space inserts record in bucket
-        if available_space >= self.record_size:
-            # Gets used part of the bucket
-            body = bucket[:-available_space]
-            # Formats record
-            formatted_record = self._format_record(record=record)
-            # Filling new empty space in bucket
-            empty_space_size = available_space - self.record_size
-            empty_space = "#" * empty_space_size
-            # Writes new bucket to file
-            bucket = body + formatted_record + empty_space
-            file.seek(offset, 0)
-            file.write(bucket)
-            # Checks if bucket was written correctly
-            file.seek(offset, 0)
-            bucket_read = file.read(self.block_size)
-            if bucket != bucket_read:
-                raise Exception("WriteError: Bucket Not Written Correctly.")
-        else:
-            # If there is not available space, tries to insert in overflow bucket
-            success = False
-            for i in range(0, self.number_of_overflow_buckets):
-                # If insertion was sucessful, goes out of for loop
-                if success:
-                    break
-                # Checks each overflow bucket for available space
-                offset = header_length + self.block_size * (self.number_of_buckets + i)
-                file.seek(offset, 0)
-                bucket = file.read(self.block_size)
-                # Checks if there is available space for insertion
-                available_space = self.block_size - len(bucket.strip('#'))
-                if available_space >= self.record_size:
-                    # Gets used part of the bucket
-                    body = bucket[:-available_space]
-                    # Formats record
-                    formatted_record = self._format_record(record=record)
-                    # Filling new empty space in bucket
-                    empty_space_size = available_space - self.record_size
-                    empty_space = "#" * empty_space_size
-                    # Writes new bucket to file
-                    bucket = body + formatted_record + empty_space
-                    file.seek(offset, 0)
-                    file.write(bucket)
-                    # Checks if bucket was written correctly
-                    file.seek(offset, 0)
-                    bucket_read = file.read(self.block_size)
-                    if bucket != bucket_read:
-                        raise Exception("WriteError: Bucket Not Written Correctly.")
-                    success = True
-                    break
-
-    def _write_txt_records(self, txt_file, csv_file):
+        file.seek(self.layout.data_start, 0)
+        # Buckets start empty and without chains, and the overflow buckets are linked in the free list
+        number_of_buckets = self.number_of_buckets + self.number_of_overflow_buckets
+        for i in range(0, number_of_buckets):
+            next_bucket_id = i + 1 if i >= self.number_of_buckets and i + 1 < number_of_buckets else NO_BUCKET
+            file.write(self._format_bucket(records=[], next_bucket_id=next_bucket_id).encode() + b'\n')
+        self.io_counters.count_write(number_of_blocks=number_of_buckets, number_of_bytes=number_of_buckets * (self.block_size + 1), seek=False)
+
+    def _write_txt_records(self, txt_file, txt_filepath, csv_file):
         # Creates filled buckets
         self._create_filled_buckets(file=txt_file)
-        # Sets csv_file cursor to beginning of the file
+        # Records are inserted through the buffer pool, as by insert_multiple_records
+        self.blocks_manager = Block_Manager(file=txt_file, layout=self.layout, block_size=self.block_size, buffer_pool=self.buffer_pool, io_counters=self.io_counters)
+        self.blocks_manager.refresh(layout=self.layout)
+        # Indexes of a previous table with the same name are built again afterwards
+        self.secondary_indexes = None
+        try:
+            # Sets csv_file cursor to beginning of the file
+            csv_file.seek(0, 0)
+            # Skips csv_file header
+            read_line(file=csv_file)
+            # Writes each record in the chain of its bucket
+            self.number_of_records = 0
+            for record in csv_file.read_records():
+                self._insert(record=self._format_record(record=record), file=txt_file)
+            # Updates the header with the overflow buckets taken from the free list
+            self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
+            self.blocks_manager.flush(layout=self.layout)
+        finally:
+            self.blocks_manager.release()
+
+    def _format_csv_record(self, record):
+        # Fields longer than their sizes in the schema would overwrite the next record
+        formatted_record = self._format_record(record=record)
+        if len(formatted_record) != self.record_size:
+            raise Exception("InsertionError: Incorrect Record Format.")
+        return formatted_record
+
+    def _record_bucket(self, record):
+        return self.hash_function(record.split(',', 1)[0].strip())
+
+    def _write_buckets(self, file, buckets, seek):
+        file.write(b''.join(buckets))
+        self.io_counters.count_write(number_of_blocks=len(buckets), number_of_bytes=len(buckets) * (self.block_size + 1), seek=seek)
+
+    def _bulk_load_txt_records(self, txt_file, txt_filepath, csv_file):
+        # Indexes of a previous table with the same name are built again afterwards
+        self.secondary_indexes = None
+        # Sets csv_file cursor to beginning of the file and skips its header
         csv_file.seek(0, 0)
-        # Skips csv_file header
-        self._read_line(file=csv_file)
-        # Writes each record in a bucket
-        for i in range(0, self.number_of_records):
-            record = self._read_line(file=csv_file)
-            self._insert_record_in_bucket(record=record, file=txt_file)
-
-    def _write_from_csv_to_txt(self, csv_file, csv_filepath):
-        # Creates txt file if does not already exists
+        read_line(file=csv_file)
+        # Records are partitioned by bucket within the memory budget, the sort is stable so each bucket keeps the csv order
+        records = (self._format_csv_record(record=record) for record in csv_file.read_records())
+        sorted_records = external_sort(records=records, key=self._record_bucket, memory_budget=self.memory_budget)
+        # Buckets and overflow buckets are written in order, each through its own file, so both are written sequentially
+        txt_file.seek(self.layout.data_start, 0)
+        overflow_file = open(txt_file.name, 'rb+')
+        try:
+            overflow_file.seek(self.layout.block_offset(block_id=self.number_of_buckets), 0)
+            buckets = []
+            overflow_buckets = []
+            overflow_seek = True
+            next_bucket_id = 0
+            next_overflow_bucket_id = self.number_of_buckets
+            number_of_buckets = self.number_of_buckets + self.number_of_overflow_buckets
+            self.number_of_records = 0
+            for bucket_id, bucket_records in itertools.groupby(sorted_records, key=self._record_bucket):
+                # Buckets without records are written empty
+                while next_bucket_id < bucket_id:
+                    buckets.append(self._format_bucket(records=[], next_bucket_id=NO_BUCKET).encode() + b'\n')
+                    next_bucket_id += 1
+                bucket_records = list(bucket_records)
+                self.number_of_records += len(bucket_records)
+                chunks = [bucket_records[i:i + self.blocking_factor] for i in range(0, len(bucket_records), self.blocking_factor)]
+                if next_overflow_bucket_id + len(chunks) - 1 > number_of_buckets:
+                    raise Exception("InsertError: Buckets and overflow buckets full.")
+                # The records that do not fit in the bucket are chained in consecutive overflow buckets
+                for k in range(0, len(chunks)):
+                    chunk_next_bucket_id = next_overflow_bucket_id + k if k < len(chunks) - 1 else NO_BUCKET
+                    bucket = self._format_bucket(records=chunks[k], next_bucket_id=chunk_next_bucket_id).encode() + b'\n'
+                    if k == 0:
+                        buckets.append(bucket)
+                    else:
+                        overflow_buckets.append(bucket)
+                next_bucket_id += 1
+                next_overflow_bucket_id += len(chunks) - 1
+                if len(buckets) * (self.block_size + 1) >= WRITE_BUFFER_SIZE:
+                    self._write_buckets(file=txt_file, buckets=buckets, seek=False)
+                    buckets = []
+                if len(overflow_buckets) * (self.block_size + 1) >= WRITE_BUFFER_SIZE:
+                    self._write_buckets(file=overflow_file, buckets=overflow_buckets, seek=overflow_seek)
+                    overflow_buckets = []
+                    overflow_seek = False
+            # The remaining buckets are empty and the remaining overflow buckets are linked in the free list
+            for i in range(next_bucket_id, self.number_of_buckets):
+                buckets.append(self._format_bucket(records=[], next_bucket_id=NO_BUCKET).encode() + b'\n')
+            for i in range(next_overflow_bucket_id, number_of_buckets):
+                overflow_buckets.append(self._format_bucket(records=[], next_bucket_id=i + 1 if i + 1 < number_of_buckets else NO_BUCKET).encode() + b'\n')
+            self._write_buckets(file=txt_file, buckets=buckets, seek=False)
+            self._write_buckets(file=overflow_file, buckets=overflow_buckets, seek=overflow_seek)
+        finally:
+            overflow_file.close()
+        self.first_free_overflow_bucket = next_overflow_bucket_id if next_overflow_bucket_id < number_of_buckets else NO_BUCKET
+        # Updates the header with the first free overflow bucket
+        self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
+
+    def _load_filepath(self, txt_filepath):
+        return txt_filepath[:-4] + "_Load.txt"
+
+    def _write_from_csv_to_txt(self, csv_file, csv_filepath, bulk_load):
+        # The table is written to a file of its own, which only replaces a previous table with the same name once it is
+        # complete, so that a load that fails leaves the previous table as it was
         txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+        load_filepath = self._load_filepath(txt_filepath=txt_filepath)
+        txt_file = open(load_filepath, 'wb+')
         try:
-            file = open(txt_filepath, 'r')
-            file.close()
+            # Write txt file header
+            self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
+            # Write txt file records, partitioned by bucket or inserted one at a time
+            if bulk_load:
+                self._bulk_load_txt_records(txt_file=txt_file, txt_filepath=txt_filepath, csv_file=csv_file)
+            else:
+                self._write_txt_records(txt_file=txt_file, txt_filepath=txt_filepath, csv_file=csv_file)
         except:
-            file = open(txt_filepath, 'w')
-            file.close()
-        # Opens txt file
-        txt_file = open(txt_filepath, 'r+')
-        # Write txt file header
-        self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
-        # Return to begin of csv_file
-        csv_file.seek(0, 0)
-        # Skip csv_file header
-        self._read_line(csv_file)
-        # Write txt file records
-        self._write_txt_records(txt_file=txt_file, csv_file=csv_file)
+            txt_file.close()
+            # Buckets of the failed load that are still in the buffer pool are dropped with its file
+            self.buffer_pool.discard(filepath=load_filepath)
+            os.remove(load_filepath)
+            raise
         txt_file.close()
+        self.buffer_pool.discard(filepath=load_filepath)
+        os.replace(load_filepath, txt_filepath)
+        # Buckets of the previous table that are still in the buffer pool are dropped
+        self.buffer_pool.discard(filepath=txt_filepath)
 
     def _compress_txt_file(self, txt_filepath):
         tar_filepath = txt_filepath[:-3] + 'tar.gz'
@@ -270,113 +329,220 @@ class Static_External_Hash:
         # Deletes txt file
         self._delete_txt_file(txt_filepath=txt_filepath)
 
-    def from_csv_to_txt(self, csv_filepath):
-        # Open csv file
-        file = open(csv_filepath, 'r+')
-        # Read csv file header
-        self._read_csv_header(file=file)
-        # Calculates field sizes and some other fields
-        self._calculate_csv_field_sizes(file=file)
-        # Calculates record size and blocking factor
-        self._set_record_size()
-        self._set_blocking_factor()
-        # Sets creation date and hash function
-        self.creation_date = None
-        self._set_hash_function()
-        # Writes csv file to a txt file
-        self._write_from_csv_to_txt(csv_file=file, csv_filepath=csv_filepath)
+    @measured_operation
+    def from_csv_to_txt(self, csv_filepath, hash_function=None, bulk_load=True, schema=None):
+        # Open csv file, which is closed also if the load fails
+        file = Buffered_Reader(filepath=csv_filepath)
+        try:
+            # Read csv file header
+            self._read_csv_header(file=file)
+            # Calculates field sizes and some other fields, unless they are given by the schema
+            self._read_csv_schema(file=file, schema=schema)
+            # Calculates record size, hash function and blocking factor, which leaves space for the chain pointers
+            self._set_record_size()
+            self._set_hash_function(hash_function=hash_function)
+            self._set_blocking_factor()
+            # Sets creation date
+            self.creation_date = None
+            # Writes csv file to a txt file
+            self._write_from_csv_to_txt(csv_file=file, csv_filepath=csv_filepath, bulk_load=bulk_load)
+        finally:
+            file.close()
         # Compresses txt file to gzip file and deletes txt file
         txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
-        self._compress_delete_txt_file(txt_filepath=txt_filepath)
-        file.close()
+        if self.compressed:
+            self._compress_delete_txt_file(txt_filepath=txt_filepath)
+        # Indexes of a previous table with the same name are built again
+        self._rebuild_secondary_indexes(txt_filepath=txt_filepath)
 
     def _read_txt_header(self, file):
-        self.table_name = self._read_line(file)
-        self.field_names = self._read_line(file).strip().split(',')
-        self.field_sizes = self._read_line(file).strip().split(',')
-        self.field_sizes = [int(field_size) for field_size in self.field_sizes]
-        self.field_types = self._read_line(file).strip().split(',')
+        header_lines = read_lines(file=file, number_of_lines=13)
+        self.table_name = header_lines[0]
+        field_names = header_lines[1].strip().split(',')
+        field_sizes = [int(field_size) for field_size in header_lines[2].strip().split(',')]
+        field_types = header_lines[3].strip().split(',')
+        self._set_schema(schema=Schema(field_names=field_names, field_types=field_types, field_sizes=field_sizes, primary_key=header_lines[4].strip()))
+        self.record_format = Text_Record_Format(field_sizes=self.field_sizes, field_types=self.field_types)
         self._set_record_size()
-        self._set_blocking_factor()
-        self.number_of_records = int(self._read_line(file).strip())
-        self.blocking_factor = int(self._read_line(file).strip())
-        self.number_of_buckets = int(self._read_line(file).strip())
-        self.hash_function = lambda key : key % self.number_of_buckets
-        self.number_of_overflow_buckets = int(self._read_line(file).strip())
-        self.creation_date = self._read_line(file).strip()
-        self.alteration_date = self._read_line(file).strip()
+        self.number_of_records = int(header_lines[5].strip())
+        self.blocking_factor = int(header_lines[6].strip())
+        self.number_of_buckets = int(header_lines[7].strip())
+        self.number_of_overflow_buckets = int(header_lines[8].strip())
+        self._set_pointer_size()
+        self.first_free_overflow_bucket = int(header_lines[9].strip())
+        self.hash_function_name = header_lines[10].strip()
+        self.hash_function = make_hash_function(name=self.hash_function_name, number_of_buckets=self.number_of_buckets)
+        self.creation_date = header_lines[11].strip()
+        self.alteration_date = header_lines[12].strip()
+        # Computes the header layout once, it only changes when the header is rewritten
+        self.layout = Header_Layout(header_lines=header_lines, block_size=self.block_size)
 
     def _read_txt_file(self, txt_filepath):
-        tar_filepath = txt_filepath[:-3] + 'tar.gz'
-        self._decompress_txt_file(tar_filepath=tar_filepath)
-        file = open(txt_filepath, 'r+')
+        # If the table is open, reuses its already decompressed file and parsed header
+        if self._is_open(txt_filepath=txt_filepath):
+            return self.opened_txt_file
+        # Uncompressed tables are only decompressed if there is no txt file yet
+        if self.compressed or not os.path.exists(txt_filepath):
+            tar_filepath = txt_filepath[:-3] + 'tar.gz'
+            self._decompress_txt_file(tar_filepath=tar_filepath)
+            # The decompressed file replaces the one whose buckets may be in the buffer pool
+            self.buffer_pool.discard(filepath=txt_filepath)
+        # Opened as bytes, the buckets are written back by the buffer pool
+        file = open(txt_filepath, 'rb+')
         self._read_txt_header(file=file)
+        self.blocks_manager = Block_Manager(file=file, layout=self.layout, block_size=self.block_size, buffer_pool=self.buffer_pool, io_counters=self.io_counters)
+        self.secondary_indexes = Secondary_Indexes(txt_filepath=txt_filepath, field_names=self.field_names, field_types=self.field_types)
         return file
 
+    def _is_open(self, txt_filepath):
+        return self.opened_txt_file != None and self.opened_txt_filepath == txt_filepath
+
+    def _close_txt_file(self, file, txt_filepath, modified):
+        # The file of an open table stays decompressed until close_table
+        if file is self.opened_txt_file:
+            return
+        self.blocks_manager.flush(layout=self.layout)
+        self.blocks_manager.release()
+        self.secondary_indexes.close()
+        file.close()
+        if not self.compressed:
+            return
+        if modified:
+            self._compress_delete_txt_file(txt_filepath=txt_filepath)
+        else:
+            self._delete_txt_file(txt_filepath=txt_filepath)
+
+    @measured_operation
+    def open_table(self, txt_filepath):
+        if self.opened_txt_file != None:
+            self.close_table()
+        self.opened_txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self.opened_txt_filepath = txt_filepath
+
+    @measured_operation
+    def flush_table(self):
+        self.blocks_manager.flush(layout=self.layout)
+        self.opened_txt_file.flush()
+        self.secondary_indexes.flush()
+
+    @measured_operation
+    def close_table(self):
+        file = self.opened_txt_file
+        txt_filepath = self.opened_txt_filepath
+        self.opened_txt_file = None
+        self.opened_txt_filepath = None
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
+
+    @measured_operation
+    def archive_txt_file(self, txt_filepath, keep_txt_file=True):
+        # Checkpoints the uncompressed table to its gzip file, deleting the txt file if not kept
+        if self._is_open(txt_filepath=txt_filepath):
+            if not keep_txt_file:
+                raise Exception('ArchiveError: Table is open.')
+            self.flush_table()
+        self._compress_txt_file(txt_filepath=txt_filepath)
+        if not keep_txt_file:
+            self._delete_txt_file(txt_filepath=txt_filepath)
+
     def _search_by_primary_key(self, key, file):
-        field_size = self.field_sizes[0]
-        success = False
-        header_length = self._header_length(file)
-        # Checks if record is in bucket[hash(key)]
-        hash_key = self.hash_function(int(key))
-        offset = header_length + self.block_size * hash_key + hash_key
-        file.seek(offset, 0)
-        bucket = file.read(self.block_size)
-        number_of_records_in_bucket = len(bucket.strip('#')) // self.record_size
-        for i in range(0, number_of_records_in_bucket):
-            if success == True:
-                break
-            record = bucket[i * self.record_size: (i + 1) * self.record_size]
-            self.accessed_blocks += 1
-            record_fields = record.strip().split(',')
-            record_primary_key = record_fields[0].strip()
-            if key == record_primary_key:
-                yield [hash_key, i]
-                success = True
-                break
-        # If record is not in bucket[hash(key)], checks if record is in some overflow bucket
-        if not success:
-            for i in range(0, self.number_of_overflow_buckets):
-                self.accessed_blocks += 1
-                offset = header_length + self.block_size * (self.number_of_buckets + i) + self.number_of_buckets + i
-                file.seek(offset, 0)
-                overflow_bucket = file.read(self.block_size)
-                number_of_records_in_bucket = len(bucket.strip('#')) // self.record_size
-                for j in range(0, number_of_records_in_bucket):
-                    if success == True:
-                        break
-                    record = bucket[j * self.record_size: (j + 1) * self.record_size]
-                    record_fields = record.strip().split(',')
-                    record_primary_key = record_fields[0].strip()
-                    if key == record_primary_key:
-                        yield [self.number_of_buckets + i, j]
-                        success = True
-                        break
+        # Compares the padded key against the key bytes of each record, without decoding the records
+        start, end = field_bounds(field_sizes=self.field_sizes, field_id=0)
+        encoded_key = encode_field_value(value=key, field_size=self.field_sizes[0])
+        self.blocks_manager.refresh(layout=self.layout)
+        # Checks bucket[hash(key)] and then the overflow buckets of its chain, in order
+        bucket_id = self.hash_function(key)
+        while bucket_id != NO_BUCKET:
+            for (i, record) in self.blocks_manager.records(block_id=bucket_id, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                if record[start:end] == encoded_key:
+                    yield [bucket_id, i]
+                    return
+            bucket_id = self.blocks_manager.pointer(block_id=bucket_id, pointer_size=self.pointer_size)
         # If failed to find record
+        yield [-1, -1]
+
+    def _search_by_primary_keys(self, keys, file):
+        # Keys are grouped by bucket, so that each chain is read once for every key hashed to it
+        start, end = field_bounds(field_sizes=self.field_sizes, field_id=0)
+        keys_by_bucket = dict()
+        for key in keys:
+            try:
+                hash_key = self.hash_function(key)
+            except ValueError:
+                # Keys that are not integers never match any record
+                continue
+            encoded_key = encode_field_value(value=key, field_size=self.field_sizes[0])
+            keys_by_bucket.setdefault(hash_key, dict())[encoded_key] = key
+        self.blocks_manager.refresh(layout=self.layout)
+        positions = dict()
+        for hash_key in keys_by_bucket:
+            bucket_keys = keys_by_bucket[hash_key]
+            bucket_id = hash_key
+            # The chain is followed until every key hashed to the bucket is found
+            while bucket_id != NO_BUCKET and bucket_keys != dict():
+                for (i, record) in self.blocks_manager.records(block_id=bucket_id, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                    key = bucket_keys.pop(bytes(record[start:end]), None)
+                    if key != None:
+                        positions[key] = [bucket_id, i]
+                bucket_id = self.blocks_manager.pointer(block_id=bucket_id, pointer_size=self.pointer_size)
+        return positions
+
+    def _scan_records(self):
+        # Yields the position and the text of every record of the buckets and overflow buckets
+        self.blocks_manager.refresh(layout=self.layout)
+        for i in range(0, self.number_of_buckets + self.number_of_overflow_buckets):
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                yield i, j, str(record, 'utf-8')
+
+    def _search_index(self, field_id, value):
+        # Positions of the records with the value, read from the secondary index of the field
+        self.blocks_manager.refresh(layout=self.layout)
+        success = False
+        for (i, j) in self.secondary_indexes.search(field_id=field_id, value=value):
+            yield [i, j]
+            success = True
+        self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
         if not success:
             yield [-1, -1]
 
     def _search_by_field_value(self, field_id, value, file):
-        field_size = self.field_sizes[field_id]
+        # Fields with a secondary index are looked up in it instead of scanning the buckets
+        if self.secondary_indexes.has_index(field_id=field_id):
+            for (i, j) in self._search_index(field_id=field_id, value=value):
+                yield [i, j]
+            return
+        # Compares the padded value against the field bytes of each record, without decoding the records
+        start, end = field_bounds(field_sizes=self.field_sizes, field_id=field_id)
+        encoded_value = encode_field_value(value=value, field_size=self.field_sizes[field_id])
+        self.blocks_manager.refresh(layout=self.layout)
         success = False
         number_of_blocks = self.number_of_buckets + self.number_of_overflow_buckets
-        header_length = self._header_length(file)
         for i in range(0, number_of_blocks):
-            self.accessed_blocks += 1
-            offset = header_length + self.block_size * i + i
-            file.seek(offset, 0)
-            bucket = file.read(self.block_size)
-            number_of_records_in_bucket = len(bucket.strip('#')) // self.record_size
-            for j in range(0, number_of_records_in_bucket):
-                record = bucket[j * self.record_size: (j + 1) * self.record_size]
-                record_fields = record.strip().split(',')
-                record_field_value = record_fields[field_id].strip()
-                if value == record_field_value:
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                if record[start:end] == encoded_value:
                     yield [i, j]
                     success = True
         if not success:
             yield [-1, -1]
     
+    def _search_interval(self, field_id, start, end):
+        # Fields with a secondary index are looked up in it instead of scanning the buckets
+        if self.secondary_indexes.has_index(field_id=field_id):
+            self.blocks_manager.refresh(layout=self.layout)
+            for (i, j) in self.secondary_indexes.search_interval(field_id=field_id, start=start, end=end):
+                yield [i, j]
+            self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+            return
+        # Buckets are not ordered, so the interval is evaluated in a single pass over every bucket
+        field_type = self.field_types[field_id]
+        start_key = self.record_format.value_key(field_id=field_id, value=start)
+        end_key = self.record_format.value_key(field_id=field_id, value=end)
+        self.blocks_manager.refresh(layout=self.layout)
+        for i in range(0, self.number_of_buckets + self.number_of_overflow_buckets):
+            for (j, record) in self.blocks_manager.records(block_id=i, record_size=self.record_size, blocking_factor=self.blocking_factor):
+                record_key = self.record_format.field_key(field_id=field_id, record=record)
+                if interval_contains(interval_type=field_type, value=record_key, start=start_key, end=end_key):
+                    yield [i, j]
+
     def _search(self, field_id, value, file):
         if field_id == 0:
             for (i, j) in self._search_by_primary_key(key=value, file=file):
@@ -386,11 +552,9 @@ class Static_External_Hash:
                 yield [i, j]
     
     def _check_record_type_constraint(self, record):
-        record_fields = record.strip().split(',')
-        record_field_types = infer_types_from_record(record, len(record_fields))
-        for i in range(len(self.field_names)):
-            if record_field_types[i] != self.field_types[i]:
-                return -1
+        # Each field is checked by the check of its type, compiled with the schema
+        if not self.schema.check_record_types(record=record):
+            return -1
         return 0
     
     def _check_record_size_constraint(self, record):
@@ -408,6 +572,11 @@ class Static_External_Hash:
             return -1
         return 0
 
+    def _invalid_records(self, records, file):
+        # Every invalid record is reported with its reasons, primary keys are checked in a single search
+        records_primary_keys = [record.strip().split(',')[0].strip() for record in records]
+        return self.record_validator.validate(records=records, primary_keys=records_primary_keys, search_primary_keys=lambda keys : self._search_by_primary_keys(keys=keys, file=file))
+
     def _check_record_integrity(self, record, file):
         record_type_constraint = self._check_record_type_constraint(record=record)
         if record_type_constraint == -1:
@@ -420,6 +589,73 @@ class Static_External_Hash:
             return -1
         return 0
 
+    def _has_secondary_indexes(self):
+        # The table being built from the csv has its indexes built after its records
+        return self.secondary_indexes != None and self.secondary_indexes.has_indexes()
+
+    def _read_bucket(self, bucket_id):
+        # Records of the bucket and the id of the next bucket of its chain
+        bucket = str(self.blocks_manager.block(block_id=bucket_id), 'utf-8')
+        number_of_records_in_bucket = len(bucket[:self.record_size * self.blocking_factor].rstrip('#')) // self.record_size
+        records = [bucket[self.record_size * j:self.record_size * (j + 1)] for j in range(0, number_of_records_in_bucket)]
+        return records, int(bucket[-self.pointer_size:])
+
+    def _write_bucket(self, bucket_id, records, next_bucket_id):
+        self.blocks_manager.write_block(block_id=bucket_id, block=self._format_bucket(records=records, next_bucket_id=next_bucket_id).encode())
+
+    def _allocate_overflow_bucket(self):
+        # Takes the first bucket of the free list
+        if self.first_free_overflow_bucket == NO_BUCKET:
+            raise Exception("InsertError: Buckets and overflow buckets full.")
+        overflow_bucket_id = self.first_free_overflow_bucket
+        records, self.first_free_overflow_bucket = self._read_bucket(bucket_id=overflow_bucket_id)
+        return overflow_bucket_id
+
+    def _count_free_overflow_buckets(self, limit):
+        # Free overflow buckets, counted by following the free list up to limit buckets
+        number_of_free_overflow_buckets = 0
+        bucket_id = self.first_free_overflow_bucket
+        while bucket_id != NO_BUCKET and number_of_free_overflow_buckets < limit:
+            number_of_free_overflow_buckets += 1
+            bucket_id = self.blocks_manager.pointer(block_id=bucket_id, pointer_size=self.pointer_size)
+        return number_of_free_overflow_buckets
+
+    def _needed_overflow_buckets(self, records):
+        # Overflow buckets the records take from the free list: each record goes to the first bucket of the chain of
+        # bucket[hash(key)] with a free slot, so a chain only grows once all of its slots are taken
+        number_of_records_by_bucket = dict()
+        for record in records:
+            hash_key = self.hash_function(record.strip().split(',')[0].strip())
+            number_of_records_by_bucket[hash_key] = number_of_records_by_bucket.get(hash_key, 0) + 1
+        needed_overflow_buckets = 0
+        for hash_key in number_of_records_by_bucket:
+            free_slots = 0
+            bucket_id = hash_key
+            while bucket_id != NO_BUCKET:
+                bucket_records, bucket_id = self._read_bucket(bucket_id=bucket_id)
+                free_slots += self.blocking_factor - len(bucket_records)
+            needed_overflow_buckets += math.ceil(max(0, number_of_records_by_bucket[hash_key] - free_slots) / self.blocking_factor)
+        return needed_overflow_buckets
+
+    def _check_records_overflow_constraint(self, records):
+        # The records are only inserted if all of them fit, so that a failed insertion writes no bucket
+        needed_overflow_buckets = self._needed_overflow_buckets(records=records)
+        if needed_overflow_buckets > 0 and self._count_free_overflow_buckets(limit=needed_overflow_buckets) < needed_overflow_buckets:
+            return -1
+        return 0
+
+    def _free_overflow_bucket(self, bucket_id, next_bucket_id, hash_key):
+        # The bucket that points to the emptied overflow bucket in the chain of bucket[hash(key)] skips it
+        previous_bucket_id = hash_key
+        previous_records, previous_next_bucket_id = self._read_bucket(bucket_id=previous_bucket_id)
+        while previous_next_bucket_id != bucket_id:
+            previous_bucket_id = previous_next_bucket_id
+            previous_records, previous_next_bucket_id = self._read_bucket(bucket_id=previous_bucket_id)
+        self._write_bucket(bucket_id=previous_bucket_id, records=previous_records, next_bucket_id=next_bucket_id)
+        # Returns the overflow bucket to the beginning of the free list
+        self._write_bucket(bucket_id=bucket_id, records=[], next_bucket_id=self.first_free_overflow_bucket)
+        self.first_free_overflow_bucket = bucket_id
+
     def _insert(self, record, file):
         # Checks if record to insert is of correct size
         if len(record) != self.record_size:
@@ -428,181 +664,135 @@ class Static_External_Hash:
         # Gets record hash(key)
         record_fields = record.strip().split(',')
         record_primary_key = record_fields[0].strip()
-        hash_key = self.hash_function(int(record_primary_key))
-        
-        # Gets bucket[hash(key)]
-        header_length = self._header_length(file)
-        offset = header_length + self.block_size * hash_key + hash_key
-        file.seek(offset, 0)
-        bucket = file.read(self.block_size)
-
-        # Checks if there is available space in bucket bucket[hash(key)]
-        success = False
-        number_of_records_in_bucket = len(bucket.strip('#')) // self.record_size
-        if number_of_records_in_bucket < self.blocking_factor:
-            self.accessed_blocks += 1
-            # If there is, then write record to bucket
-            body = bucket[:self.record_size * number_of_records_in_bucket]
-            padding = "#" * (self.block_size - self.record_size * (number_of_records_in_bucket + 1))
-            bucket = body + record + padding
-            file.seek(offset, 0)
-            file.write(bucket)
-            self.number_of_records += 1
-            success = True
-        else:
-            # If there is not, then search for space available in some overflow bucket
-            for i in range(0, self.number_of_overflow_buckets):
-                self.accessed_blocks += 1
-                if success:
-                    break
-                offset = header_length + self.block_size * (self.number_of_buckets + i) + self.number_of_buckets + i
-                file.seek(offset, 0)
-                bucket = file.read(self.block_size)
-                number_of_records_in_bucket = len(bucket.strip('#')) // self.record_size
-                if number_of_records_in_bucket < self.blocking_factor:
-                    # If there is, then write record to overflow bucket
-                    body = bucket[:self.record_size * number_of_records_in_bucket]
-                    padding = "#" * (self.block_size - self.record_size * (number_of_records_in_bucket + 1))
-                    bucket = body + record + padding
-                    file.seek(offset, 0)
-                    file.write(bucket)
-                    self.number_of_records += 1
-                    success = True
-                    break
-        
-        # If there was not available space, then tell user
-        if not success:
-            raise Exception("InsertError: Buckets and overflow buckets full.")
-
+        bucket_id = self.hash_function(record_primary_key)
+
+        # Looks for available space in bucket[hash(key)] and then in the overflow buckets of its chain
+        records, next_bucket_id = self._read_bucket(bucket_id=bucket_id)
+        while len(records) >= self.blocking_factor and next_bucket_id != NO_BUCKET:
+            bucket_id = next_bucket_id
+            records, next_bucket_id = self._read_bucket(bucket_id=bucket_id)
+
+        # If there is not, then a free overflow bucket is linked at the end of the chain
+        if len(records) >= self.blocking_factor:
+            overflow_bucket_id = self._allocate_overflow_bucket()
+            self._write_bucket(bucket_id=bucket_id, records=records, next_bucket_id=overflow_bucket_id)
+            bucket_id = overflow_bucket_id
+            records = []
+            next_bucket_id = NO_BUCKET
+
+        # Writes record to bucket
+        self._write_bucket(bucket_id=bucket_id, records=records + [record], next_bucket_id=next_bucket_id)
+        self.number_of_records += 1
+        # Adds the record to the secondary indexes
+        if self._has_secondary_indexes():
+            self.secondary_indexes.insert_record(record=record, block_id=bucket_id, record_id=len(records))
+
+    @measured_operation
     def insert_single_record(self, txt_filepath, record):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         # Check if the record respects the database integrity restriction
         record_integrity = self._check_record_integrity(record=record, file=file)
         if record_integrity == -1:
-            file.close()
-            # Deletes txt file
-            self._delete_txt_file(txt_filepath=txt_filepath)
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
+            # Closes and deletes txt file
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
             raise Exception('InsertError: Invalid Record.')
-        # Formats and inserts record
-        formatted_record = self._format_record(record[:-1])
-        self._insert(formatted_record, file)
-        # Updates txt file header
-        self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
-        # Compresses txt file to gzip file and deletes txt file
-        self._compress_delete_txt_file(txt_filepath=txt_filepath)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
-
-    def insert_multiple_records(self, txt_filepath, records):
-        file = self._read_txt_file(txt_filepath=txt_filepath)
-        # Check if the record respects the database integrity restriction
-        for record in records:
-            record_integrity = self._check_record_integrity(record=record, file=file)
-            if record_integrity == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
-                # Deletes txt file
-                self._delete_txt_file(txt_filepath=txt_filepath)
-                raise Exception('InsertError: Invalid Record.')
-        # Formats and inserts records
-        for record in records:
+        # Check if there is room for the record before writing any bucket
+        if self._check_records_overflow_constraint(records=[record]) == -1:
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception('InsertError: Buckets and overflow buckets full.')
+        try:
+            # Formats and inserts record
             formatted_record = self._format_record(record[:-1])
             self._insert(formatted_record, file)
-        # Updates txt file header
-        self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
-        # Compresses txt file to gzip file and deletes txt file
-        self._compress_delete_txt_file(txt_filepath=txt_filepath)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
+        finally:
+            # Updates txt file header, also if the insertion failed, so that the head of the free list and the number
+            # of records match the buckets already written
+            self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
+            # Closes txt file, compressing it to a gzip file and deleting it
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
+
+    @measured_operation
+    def insert_multiple_records(self, txt_filepath, records):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        # Check if the records respect the database integrity restriction
+        invalid_records = self._invalid_records(records=records, file=file)
+        if invalid_records != []:
+            # Closes and deletes txt file
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception(invalid_records_message(invalid_records=invalid_records))
+        # Check if there is room for every record before writing any bucket, so that the batch is all or nothing
+        if self._check_records_overflow_constraint(records=records) == -1:
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception('InsertError: Buckets and overflow buckets full.')
+        try:
+            # Formats and inserts records
+            for record in records:
+                formatted_record = self._format_record(record[:-1])
+                self._insert(formatted_record, file)
+        finally:
+            # Updates txt file header, also if the insertion failed, so that the head of the free list and the number
+            # of records match the buckets already written
+            self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
+            # Closes txt file, compressing it to a gzip file and deleting it
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
 
     def _select(self, select_container, block_id, record_id, file):
-        offset = self._header_length(file)
-        offset += self.block_size * block_id + block_id + self.record_size * record_id
-        file.seek(offset, 0)
-        record = file.read(self.record_size)
-        select_container.append(record)
+        record = self.blocks_manager.record(block_id=block_id, record_id=record_id, record_size=self.record_size)
+        select_container.append(str(record, 'utf-8'))
 
+    @measured_operation
     def select_by_single_primary_key(self, txt_filepath, key):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         select_container = []
         for (i, j) in self._search(field_id=0, value=key, file=file):
             if i == -1 and j == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
-                # Deletes txt file
-                self._delete_txt_file(txt_filepath=txt_filepath)
+                # Closes and deletes txt file
+                self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
                 raise Exception('SelectionError: Primary Key nonexistent.')
             else:
                 self._select(select_container=select_container, block_id=i, record_id=j, file=file)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
-        # Deletes txt file
-        self._delete_txt_file(txt_filepath=txt_filepath)
+        # Closes and deletes txt file
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
         return select_container
 
+    @measured_operation
     def select_by_multiple_primary_key(self, txt_filepath, keys):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         select_container = []
         exception_counter = 0
+        positions = self._search_by_primary_keys(keys=keys, file=file)
         for key in keys:
-            for (i, j) in self._search(field_id=0, value=key, file=file):
-                if i == -1 and j == -1:
-                    exception_counter += 1
-                else:
-                    self._select(select_container=select_container, block_id=i, record_id=j, file=file)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
-        # Deletes txt file
-        self._delete_txt_file(txt_filepath=txt_filepath)
+            if key not in positions:
+                exception_counter += 1
+            else:
+                i, j = positions[key]
+                self._select(select_container=select_container, block_id=i, record_id=j, file=file)
+        # Closes and deletes txt file
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
         if exception_counter == len(keys):
             raise Exception('SelectionError: Primary Keys nonexistent.')
         return select_container
 
+    @measured_operation
     def select_by_field_interval(self, txt_filepath, field, start, end):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         field_id = self.field_names.index(field)
         field_type = self.field_types[field_id]
         possible_field_interval = check_interval(interval_type=field_type, start=start, end=end)
         if possible_field_interval == -1:
-            file.close()
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
-            # Deletes txt file
-            self._delete_txt_file(txt_filepath=txt_filepath)
-            raise Exception('SelectionError: Field Interval incomputable.')
-        value_range = generate_range(range_type=field_type, start=start, end=end)
-        if value_range == -1:
-            file.close()
-            print('Accessed Blocks:', self.accessed_blocks);
-            self.accessed_blocks = 0
-            # Deletes txt file
-            self._delete_txt_file(txt_filepath=txt_filepath)
+            # Closes and deletes txt file
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
             raise Exception('SelectionError: Field Interval incomputable.')
         select_container = []
-        exception_counter = 0
-        for value in value_range:
-            for (i, j) in self._search(field_id=field_id, value=str(value), file=file):
-                if i == -1 and j == -1:
-                    exception_counter += 1
-                else:
-                    self._select(select_container=select_container, block_id=i, record_id=j, file=file)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
-        # Deletes txt file
-        self._delete_txt_file(txt_filepath=txt_filepath)
-        if exception_counter == len(value_range):
+        for (i, j) in self._search_interval(field_id=field_id, start=start, end=end):
+            self._select(select_container=select_container, block_id=i, record_id=j, file=file)
+        # Closes and deletes txt file
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+        if select_container == []:
             raise Exception('SelectionError: Requested Records nonexistent.')
         return select_container
     
+    @measured_operation
     def select_by_single_field_value(self, txt_filepath, field, value):
         # Checks if field exists
         if field not in self.field_names:
@@ -613,84 +803,155 @@ class Static_External_Hash:
         select_container = []
         for (i, j) in self._search(field_id=field_id, value=value, file=file):
             if i == -1 and j == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
-                # Deletes txt file
-                self._delete_txt_file(txt_filepath=txt_filepath)
+                # Closes and deletes txt file
+                self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
                 raise Exception('SelectionError: Field Value nonexistent.')
             else:
                 self._select(select_container=select_container, block_id=i, record_id=j, file=file)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
-        # Deletes txt file
-        self._delete_txt_file(txt_filepath=txt_filepath)
+        # Closes and deletes txt file
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
         return select_container
 
     def _delete_record(self, bucket_id, record_id, file):
         # Read bucket
-        offset = self._header_length(file)
-        offset += self.block_size * bucket_id + bucket_id
-        file.seek(offset, 0)
-        bucket = file.read(self.block_size)
-        self.accessed_blocks += 1
-        # Brings records closer to begin of bucket
-        number_of_records_in_bucket = len(bucket.strip('#')) // self.record_size
-        body = ""
-        # Starts by bringing records that are before the record to be deleted
-        body += bucket[:self.record_size * record_id]
-        # If there are records after the record to be deleted
-        if number_of_records_in_bucket > record_id:
-            body += bucket[self.record_size * (record_id + 1):self.record_size * number_of_records_in_bucket]
-        # Creates padding for new empty space in bucket
-        padding = "#" * (self.block_size - self.record_size * (number_of_records_in_bucket - 1))
-        # Writes new bucket to file
-        bucket = body + padding
-        file.seek(offset, 0)
-        file.write(bucket)
-
+        records, next_bucket_id = self._read_bucket(bucket_id=bucket_id)
+        # The record leaves the secondary indexes, and the following records of the bucket move back one slot
+        if self.secondary_indexes.has_indexes():
+            self.secondary_indexes.delete_record(record=records[record_id], block_id=bucket_id, record_id=record_id)
+            for j in range(record_id + 1, len(records)):
+                self.secondary_indexes.move_record(record=records[j], block_id=bucket_id, record_id=j, new_block_id=bucket_id, new_record_id=j - 1)
+        # Brings records after the deleted one closer to begin of bucket
+        record = records.pop(record_id)
+        self._write_bucket(bucket_id=bucket_id, records=records, next_bucket_id=next_bucket_id)
+        self.number_of_records -= 1
+        # An emptied overflow bucket leaves its chain and returns to the free list
+        if records == [] and bucket_id >= self.number_of_buckets:
+            hash_key = self.hash_function(record.split(',')[0])
+            self._free_overflow_bucket(bucket_id=bucket_id, next_bucket_id=next_bucket_id, hash_key=hash_key)
+
+    @measured_operation
     def delete_record_by_primary_key(self, txt_filepath, key):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         # Searchs for position of record to be deleted
         for (i, j) in self._search(field_id=0, value=key, file=file):
             if i == -1 and j == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
-                # Deletes txt file
-                self._delete_txt_file(txt_filepath=txt_filepath)
+                # Closes and deletes txt file
+                self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
                 raise Exception('DeleteError: Primary Key nonexistent.')
             else:
-                # Deletes the record
-                self._delete_record(bucket_id=i, record_id=j, file=file)
-                # Updates txt file header
-                self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
-                # Compresses txt file to gzip file and deletes txt file
-                self._compress_delete_txt_file(txt_filepath=txt_filepath)
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
+                try:
+                    # Deletes the record
+                    self._delete_record(bucket_id=i, record_id=j, file=file)
+                finally:
+                    # Updates txt file header, also if the deletion failed, so that the head of the free list and the
+                    # number of records match the buckets already written
+                    self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
+                    # Closes txt file, compressing it to a gzip file and deleting it
+                    self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
     
+    @measured_operation
     def delete_record_by_criterion(self, txt_filepath, field, value):
         file = self._read_txt_file(txt_filepath=txt_filepath)
         field_id = self.field_names.index(field)
         # Searchs for positions of records to be deleted
-        for (i, j) in self._search(field_id=field_id, value=value, file=file):
-            if i == -1 and j == -1:
-                file.close()
-                print('Accessed Blocks:', self.accessed_blocks);
-                self.accessed_blocks = 0
-                # Deletes txt file
-                self._delete_txt_file(txt_filepath=txt_filepath)
-                raise Exception('DeleteError: Field Value nonexistent.')
-            else:
-                # Deletes the record
+        positions = list(self._search(field_id=field_id, value=value, file=file))
+        if positions == [[-1, -1]]:
+            # Closes and deletes txt file
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception('DeleteError: Field Value nonexistent.')
+        try:
+            # Deletes from the last position, since deleting a record shifts the following ones in its bucket
+            for (i, j) in reversed(positions):
                 self._delete_record(bucket_id=i, record_id=j, file=file)
-        # Updates txt file header
-        self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
-        # Compresses txt file to gzip file and deletes txt file
-        self._compress_delete_txt_file(txt_filepath=txt_filepath)
-        file.close()
-        print('Accessed Blocks:', self.accessed_blocks);
-        self.accessed_blocks = 0
\ No newline at end of file
+        finally:
+            # Updates txt file header, also if a deletion failed, so that the head of the free list and the number of
+            # records match the buckets already written
+            self._write_txt_header(txt_file=file, txt_filepath=txt_filepath)
+            # Closes txt file, compressing it to a gzip file and deleting it
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=True)
+
+    def _chains(self):
+        # Number of records of each bucket of the chain of every bucket, in chain order
+        self.blocks_manager.refresh(layout=self.layout)
+        for i in range(0, self.number_of_buckets):
+            records, bucket_id = self._read_bucket(bucket_id=i)
+            chain = [len(records)]
+            while bucket_id != NO_BUCKET:
+                records, bucket_id = self._read_bucket(bucket_id=bucket_id)
+                chain.append(len(records))
+            yield chain
+
+    @measured_operation
+    def hash_diagnostics(self, txt_filepath):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        bucket_fill_histogram = dict()
+        chain_length_histogram = dict()
+        number_of_records = 0
+        overflow_records = 0
+        successful_probes = 0
+        unsuccessful_probes = 0
+        for chain in self._chains():
+            bucket_fill_histogram[chain[0]] = bucket_fill_histogram.get(chain[0], 0) + 1
+            chain_length_histogram[len(chain) - 1] = chain_length_histogram.get(len(chain) - 1, 0) + 1
+            number_of_records += sum(chain)
+            overflow_records += sum(chain[1:])
+            # A key in the k-th bucket of its chain is found after reading k buckets, a missing key reads the whole chain
+            for k in range(0, len(chain)):
+                successful_probes += (k + 1) * chain[k]
+            unsuccessful_probes += len(chain)
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+        used_overflow_buckets = sum(chain_length * chain_length_histogram[chain_length] for chain_length in chain_length_histogram)
+        return {
+            'hash_function': self.hash_function_name,
+            'records': number_of_records,
+            'buckets': self.number_of_buckets,
+            'overflow_buckets': self.number_of_overflow_buckets,
+            'blocking_factor': self.blocking_factor,
+            'load_factor': number_of_records / (self.number_of_buckets * self.blocking_factor),
+            'bucket_fill_histogram': dict(sorted(bucket_fill_histogram.items())),
+            'overflow_records': overflow_records,
+            'used_overflow_buckets': used_overflow_buckets,
+            'free_overflow_buckets': self.number_of_overflow_buckets - used_overflow_buckets,
+            'max_chain_length': max(chain_length_histogram),
+            'mean_chain_length': used_overflow_buckets / self.number_of_buckets,
+            'chain_length_histogram': dict(sorted(chain_length_histogram.items())),
+            'expected_successful_probes': successful_probes / max(1, number_of_records),
+            'expected_unsuccessful_probes': unsuccessful_probes / self.number_of_buckets,
+        }
+
+    @measured_operation
+    def chain_statistics(self, txt_filepath):
+        # Overflow part of the diagnostics of the table
+        diagnostics = self.hash_diagnostics(txt_filepath=txt_filepath)
+        statistics = ['buckets', 'overflow_buckets', 'used_overflow_buckets', 'free_overflow_buckets', 'max_chain_length', 'mean_chain_length', 'chain_length_histogram']
+        return dict((statistic, diagnostics[statistic]) for statistic in statistics)
+
+    def _rebuild_secondary_indexes(self, txt_filepath):
+        # Tables without indexes are not read again
+        if not has_index_files(txt_filepath=txt_filepath, field_names=self.field_names):
+            return
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        for field_id in list(self.secondary_indexes.indexes):
+            self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+
+    @measured_operation
+    def create_index(self, txt_filepath, field):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        # Checks if field exists
+        if field not in self.field_names:
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception('IndexError: Field nonexistent.')
+        field_id = self.field_names.index(field)
+        # Builds the index from a single scan of the buckets
+        self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+
+    @measured_operation
+    def drop_index(self, txt_filepath, field):
+        file = self._read_txt_file(txt_filepath=txt_filepath)
+        if field not in self.field_names or not self.secondary_indexes.has_index(field_id=self.field_names.index(field)):
+            self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
+            raise Exception('IndexError: Index nonexistent.')
+        self.secondary_indexes.drop_index(field_id=self.field_names.index(field))
+        self._close_txt_file(file=file, txt_filepath=txt_filepath, modified=False)
@@ -0,0 +1,56 @@
+"""
+Tabela aberta, que mantém o arquivo, o cabeçalho e os blocos de uma organização primária carregados entre operações.
+"""
+
+class Table:
+    def __init__(self, engine, txt_filepath):
+        self.engine = engine
+        self.txt_filepath = txt_filepath
+
+    @staticmethod
+    def open(txt_filepath, engine):
+        # Opens the table once, every operation made through it reuses the opened state
+        engine.open_table(txt_filepath=txt_filepath)
+        return Table(engine=engine, txt_filepath=txt_filepath)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def flush(self):
+        self.engine.flush_table()
+
+    def close(self):
+        self.engine.close_table()
+
+    def insert_single_record(self, record):
+        return self.engine.insert_single_record(txt_filepath=self.txt_filepath, record=record)
+
+    def insert_multiple_records(self, records):
+        return self.engine.insert_multiple_records(txt_filepath=self.txt_filepath, records=records)
+
+    def select_by_single_primary_key(self, key):
+        return self.engine.select_by_single_primary_key(txt_filepath=self.txt_filepath, key=key)
+
+    def select_by_multiple_primary_key(self, keys):
+        return self.engine.select_by_multiple_primary_key(txt_filepath=self.txt_filepath, keys=keys)
+
+    def select_by_field_interval(self, field, start, end):
+        return self.engine.select_by_field_interval(txt_filepath=self.txt_filepath, field=field, start=start, end=end)
+
+    def select_by_single_field_value(self, field, value):
+        return self.engine.select_by_single_field_value(txt_filepath=self.txt_filepath, field=field, value=value)
+
+    def delete_record_by_primary_key(self, key):
+        return self.engine.delete_record_by_primary_key(txt_filepath=self.txt_filepath, key=key)
+
+    def delete_record_by_criterion(self, field, value):
+        return self.engine.delete_record_by_criterion(txt_filepath=self.txt_filepath, field=field, value=value)
+
+    def create_index(self, field):
+        return self.engine.create_index(txt_filepath=self.txt_filepath, field=field)
+
+    def drop_index(self, field):
+        return self.engine.drop_index(txt_filepath=self.txt_filepath, field=field)
@@ -66,7 +66,7 @@ def generate_range(range_type, start, end):
 
 def check_interval(interval_type, start, end):
     if interval_type == 'int':
-        if start == end or start > end:
+        if int(start) >= int(end):
             return -1
         return 0
     elif interval_type == 'date':
@@ -90,4 +90,10 @@ def check_interval(interval_type, start, end):
         else:
             return 0
     else:
-        return -1
\ No newline at end of file
+        return -1
+
+def interval_contains(interval_type, value, start, end):
+    # Integer intervals do not include their end, date and time intervals do, as in generate_range
+    if interval_type == 'int':
+        return start <= value < end
+    return start <= value <= end
@@ -6,98 +6,121 @@ import math
 from datetime import datetime
 import os
 
-from Util import infer_types_from_record, check_interval, generate_range
+from Util import check_interval, interval_contains
+from Record_Format import text_key
+from Buffered_Reader import Buffered_Reader, read_line, read_lines
+from Header_Layout import Header_Layout, write_header
+from Block_Store import Block_Store
+from Buffer_Pool import BUFFER_POOL
+from Io_Metrics import Io_Counters, measured_operation
+from Secondary_Index import Secondary_Indexes, has_index_files
+from Schema import Schema, read_csv_schema
+from Record_Validator import Record_Validator, invalid_records_message
 
 class Variable_Size_Heap:
-    def __init__(self, block_size):
+    def __init__(self, block_size, buffer_pool=BUFFER_POOL, metrics_sink=None):
         self.block_size = block_size
+        # Blocks are read and written through the buffer pool
+        self.buffer_pool = buffer_pool
+        self.opened_txt_filepath = None
+        self.opened_txt_file = None
+        self.table_modified = False
+        self.secondary_indexes = None
+        self.layout = None
+        self.blocks = None
+        # I/O of the operations, the statistics of the last operation are also given to the metrics sink
+        self.io_counters = Io_Counters()
+        self.metrics_sink = metrics_sink
+        self.last_operation_stats = None
+        self.operation_in_progress = False
     
     def _set_field_names(self, fields_names):
         self.field_names = fields_names.strip().split(',')
 
-    def _set_field_types(self, record):
-        self.field_types = infer_types_from_record(record, len(self.field_names))
-
-    def _read_line(self, file):
-        char = file.read(1)
-        line = ''
-
-        while char and char != '\n':
-            line += char
-            char = file.read(1)
-        return line
+    def _set_schema(self, schema):
+        self.schema = schema
+        self.field_names = schema.field_names
+        self.field_types = schema.field_types
+        self.record_validator = Record_Validator(schema=schema, field_sizes=False)
 
     def _read_csv_header(self, file):
-        csv_header = self._read_line(file=file)
+        csv_header = read_line(file=file)
         self._set_field_names(fields_names=csv_header)
 
+    def _read_csv_schema(self, file, schema):
+        # Records have no fixed field sizes, so the csv is only read for the field types, if they were not given
+        schema, number_of_records = read_csv_schema(csv_file=file, field_names=self.field_names, schema=schema, field_sizes=False)
+        self._set_schema(schema=schema)
+
     def _get_csv_records(self, csv_file):
         # Sets cursor to beginning of file
         csv_file.seek(0, 0)
         # Skips csv header
-        self._read_line(file=csv_file)
+        read_line(file=csv_file)
         # Read and store records
-        records = []
-        record = self._read_line(file=csv_file)
-        # Sets record field types
-        self._set_field_types(record=record)
+        records = list(csv_file.read_records())
         # Sets number of deleted records
         self.number_of_deleted_records = 0
-        while record != "":
-            records.append(record)
-            record = self._read_line(file=csv_file)
         self.number_of_records = len(records)
         return records
     
-    def _create_blocks_from_records(self, records):
-        self.blocks = []
+    def _pack_records_into_blocks(self, records):
+        blocks = []
         block = ""
         for i in range(0, len(records)):
             formatted_record = records[i] + "$"
-            if len(block) + len(formatted_record) <= self.block_size:
-                block += formatted_record
-            elif len(block) + len(formatted_record) > self.block_size and i != (len(records) - 1):
+            if len(block) + len(formatted_record) > self.block_size:
                 padding = "#" * (self.block_size - len(block))
                 block += padding
-                self.blocks.append(block)
-                block = formatted_record
-            else:
-                padding = "#" * (self.block_size - len(block))
-                block += padding
-                self.blocks.append(block)
+                blocks.append(block)
+                block = ""
+            block += formatted_record
+        # Adds the last block, which may not be full
+        if block != "":
+            padding = "#" * (self.block_size - len(block))
+            block += padding
+            blocks.append(block)
+        return blocks
 
     def _write_txt_header(self, txt_file, txt_filepath):
-        # Sets txt_file cursor at the beginning of the file
-        txt_file.seek(0, 0)
+        header = ''
         # Write table name
         table_name = txt_filepath.split('/')[2].split('.')[0]
-        txt_file.write(table_name + '\n')
+        header += table_name + '\n'
         # Write field names, sizes, types
         field_names = ','.join(str(field_name) for field_name in self.field_names) + '\n'
         field_types = ','.join(str(field_type) for field_type in self.field_types) + '\n'
-        txt_file.write(field_names)
-        txt_file.write(field_types)
+        header += field_names
+        header += field_types
+        # Write primary key
+        header += self.schema.primary_key + '\n'
         # Write number of records
-        txt_file.write(str(self.number_of_records) + '\n')
+        header += str(self.number_of_records) + '\n'
         # Write number of deleted records
-        txt_file.write(str(self.number_of_deleted_records) + '\n')
+        header += str(self.number_of_deleted_records) + '\n'
         # Write creation timestamp
         if self.creation_date == None:
             creation_timestamp = datetime.now()
             creation_timestamp = creation_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-            txt_file.write(creation_timestamp + '\n')
+            header += creation_timestamp + '\n'
         else:
-            txt_file.write(self.creation_date + '\n')
+            header += self.creation_date + '\n'
         # Write alteration timestamp
         alteration_timestamp = datetime.now()
         alteration_timestamp = alteration_timestamp.strftime("%Y-%m-%d %H:%M:%S")
-        txt_file.write(alteration_timestamp + '\n')
-
-    def _write_txt_records(self, txt_file):
-        for block in self.blocks:
+        header += alteration_timestamp + '\n'
+        # Rewrites the header in place, moving the blocks if it outgrew its space
+        self.layout = write_header(txt_file=txt_file, header=header, layout=self.layout, block_size=self.block_size, io_counters=self.io_counters)
+        # Blocks read from now on are found after the rewritten header
+        txt_file.flush()
+        if self.blocks != None:
+            self.blocks.refresh(layout=self.layout)
+
+    def _write_txt_records(self, txt_file, blocks):
+        for block in blocks:
             txt_file.write(block + '\n')
 
-    def _write_from_csv_to_txt(self, csv_file, csv_filepath):
+    def _write_from_csv_to_txt(self, csv_file, csv_filepath, blocks):
         # # Creates txt file if does not already exists
         # txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
         # try:
@@ -115,67 +138,144 @@ class Variable_Size_Heap:
         # Write txt file header
         self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
         # Write txt file records
-        self._write_txt_records(txt_file=txt_file)
+        self._write_txt_records(txt_file=txt_file, blocks=blocks)
+        # The blocks are written sequentially after the header
+        self.io_counters.count_write(number_of_blocks=len(blocks), number_of_bytes=txt_file.tell() - self.layout.data_start, seek=False)
         txt_file.close()
+        # Blocks of the previous table that are still in the buffer pool are dropped
+        self.buffer_pool.discard(filepath=txt_filepath)
 
-    def from_csv_to_txt(self, csv_filepath):
+    @measured_operation
+    def from_csv_to_txt(self, csv_filepath, primary_key_index=False, schema=None):
+        # Blocks of a previously read table are not kept
+        self._close_block_store()
         # Open csv file
-        file = open(csv_filepath, 'r+')
+        file = Buffered_Reader(filepath=csv_filepath)
         # Read csv file header
         self._read_csv_header(file=file)
+        # Field types are inferred from the first record, unless they are given by the schema
+        self._read_csv_schema(file=file, schema=schema)
         # Get csv records
         records = self._get_csv_records(csv_file=file)
         # Create blocks from records
-        self._create_blocks_from_records(records=records)
+        blocks = self._pack_records_into_blocks(records=records)
         # Sets creation date
         self.creation_date = None
         # Writes csv file to a txt file
-        self._write_from_csv_to_txt(csv_file=file, csv_filepath=csv_filepath)
+        self._write_from_csv_to_txt(csv_file=file, csv_filepath=csv_filepath, blocks=blocks)
         file.close()
+        # Indexes of a previous table with the same name are built again
+        txt_filepath = '.' + csv_filepath.split('.')[1] + '.txt'
+        self._rebuild_secondary_indexes(txt_filepath=txt_filepath)
+        # The primary key index, if requested, is created with the table
+        if primary_key_index:
+            self._create_primary_key_index(txt_filepath=txt_filepath)
     
     def _read_txt_header(self, file):
-        self.table_name = self._read_line(file)
-        self.field_names = self._read_line(file).strip().split(',')
-        self.field_types = self._read_line(file).strip().split(',')
-        self.number_of_records = int(self._read_line(file).strip())
-        self.number_of_deleted_records = int(self._read_line(file).strip())
-        self.creation_date = self._read_line(file).strip()
-        self.alteration_date = self._read_line(file).strip()
+        header_lines = read_lines(file=file, number_of_lines=8)
+        self.table_name = header_lines[0]
+        field_names = header_lines[1].strip().split(',')
+        field_types = header_lines[2].strip().split(',')
+        self._set_schema(schema=Schema(field_names=field_names, field_types=field_types, primary_key=header_lines[3].strip()))
+        self.number_of_records = int(header_lines[4].strip())
+        self.number_of_deleted_records = int(header_lines[5].strip())
+        self.creation_date = header_lines[6].strip()
+        self.alteration_date = header_lines[7].strip()
+        # Computes the header layout once, it only changes when the header is rewritten
+        self.layout = Header_Layout(header_lines=header_lines, block_size=self.block_size)
     
-    def _read_txt_blocks(self, file):
-        header_length = self._header_length(file=file)
-        offset = header_length
-        file.seek(offset, 0)
-        block = file.read(self.block_size)
-        self.blocks = []
-        while block != "":
-            self.blocks.append(block)
-            offset = header_length + self.block_size * len(self.blocks) + len(self.blocks)
-            file.seek(offset, 0)
-            block = file.read(self.block_size)
+    def _read_txt_blocks(self, txt_filepath):
+        # Blocks are read on demand instead of loading the whole table
+        self._close_block_store()
+        self.blocks = Block_Store(filepath=txt_filepath, layout=self.layout, block_size=self.block_size, buffer_pool=self.buffer_pool, io_counters=self.io_counters)
         self.number_of_blocks = len(self.blocks)
 
+    def _close_block_store(self):
+        if self.blocks != None:
+            self.blocks.close()
+        self.blocks = None
+
     def _read_txt_file(self, txt_filepath):
+        # If the table is open, reuses its file, its already parsed header and its loaded blocks
+        if self._is_open(txt_filepath=txt_filepath):
+            return self.opened_txt_file
         file = open(txt_filepath, 'r+')
         self._read_txt_header(file=file)
-        self._read_txt_blocks(file=file)
+        self._read_txt_blocks(txt_filepath=txt_filepath)
+        self._open_secondary_indexes(txt_filepath=txt_filepath)
         return file
 
-    def _header_length(self, file):
-        header_length = 0
-        for i in range(0, 7):
-            file.seek(header_length, 0)
-            line = self._read_line(file)
-            header_length += len(line)+1
-        return header_length
+    def _open_secondary_indexes(self, txt_filepath):
+        # Indexes stay open after the txt file is closed, since the blocks are only written back afterwards,
+        # and are flushed with the txt file
+        if self.secondary_indexes != None:
+            self.secondary_indexes.close()
+        self.secondary_indexes = Secondary_Indexes(txt_filepath=txt_filepath, field_names=self.field_names, field_types=self.field_types)
+
+    def _is_open(self, txt_filepath):
+        return self.opened_txt_file != None and self.opened_txt_filepath == txt_filepath
+
+    def _close_txt_file(self, file):
+        # The file of an open table is only closed by close_table
+        if file is not self.opened_txt_file:
+            file.close()
+
+    @measured_operation
+    def open_table(self, txt_filepath):
+        if self.opened_txt_file != None:
+            self.close_table()
+        self.opened_txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self.opened_txt_filepath = txt_filepath
+        self.table_modified = False
+
+    @measured_operation
+    def flush_table(self):
+        self.opened_txt_file.flush()
+        if self.table_modified:
+            self._write_txt_file(txt_filepath=self.opened_txt_filepath)
+            self.table_modified = False
+
+    @measured_operation
+    def close_table(self):
+        self.flush_table()
+        self.secondary_indexes.close()
+        self._close_block_store()
+        self.opened_txt_file.close()
+        self.opened_txt_file = None
+        self.opened_txt_filepath = None
 
     def _get_records_from_block(self, block):
         # records = block.strip("#").split("$")
         # records = [record for record in records if record != ""]
         records = block.split("$")
+        # Records that are not deleted nor padding are counted as examined
+        self.io_counters.records_examined += sum(1 for record in records if record.strip("#") != "")
         return records
 
+    def _scan_records(self):
+        # Yields the position and the text of every record of the table
+        for i in range(0, len(self.blocks)):
+            records = self._get_records_from_block(block=self.blocks[i])
+            for j in range(len(records)):
+                if records[j].strip("#") != "":
+                    yield i, j, records[j]
+
+    def _search_index(self, field_id, value):
+        # Positions of the records with the value, read from the secondary index of the field
+        success = False
+        for (i, j) in self.secondary_indexes.search(field_id=field_id, value=value):
+            yield [i, j]
+            success = True
+        self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+        if not success:
+            yield [-1, -1]
+
     def _search(self, field_id, value):
+        # Fields with a secondary index are looked up in it instead of scanning the blocks
+        if self.secondary_indexes.has_index(field_id=field_id):
+            for (i, j) in self._search_index(field_id=field_id, value=value):
+                yield [i, j]
+            return
         success = False
         # Search for record in blocks from txt file
         for i in range(0, len(self.blocks)):
@@ -184,7 +284,6 @@ class Variable_Size_Heap:
                 break
             # Gets block[i]
             block = self.blocks[i]
-            self.accessed_blocks += 1
             # Gets records from block[i]
             records = self._get_records_from_block(block=block)
             # Checks specified field from each record
@@ -203,12 +302,53 @@ class Variable_Size_Heap:
         if not success:
             yield [-1, -1]
     
+    def _search_primary_keys(self, keys):
+        # With a primary key index, each key is looked up in it instead of scanning the blocks
+        if self.secondary_indexes.has_index(field_id=0):
+            positions = dict()
+            for key in keys:
+                for (i, j) in self.secondary_indexes.search(field_id=0, value=key):
+                    positions[key] = [i, j]
+            self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+            return positions
+        # Single pass over the blocks, looking up the primary key of each record in the requested keys
+        requested_keys = set(keys)
+        positions = dict()
+        for i in range(0, len(self.blocks)):
+            # Primary keys are unique, so the search ends when every key was found
+            if len(positions) == len(requested_keys):
+                break
+            records = self._get_records_from_block(block=self.blocks[i])
+            for j in range(len(records)):
+                if records[j].strip("#") != "":
+                    record_primary_key = records[j].split(',')[0].strip()
+                    if record_primary_key in requested_keys:
+                        positions[record_primary_key] = [i, j]
+        return positions
+
+    def _search_interval(self, field_id, start, end):
+        # Fields with a secondary index are looked up in it instead of scanning the blocks
+        if self.secondary_indexes.has_index(field_id=field_id):
+            for (i, j) in self.secondary_indexes.search_interval(field_id=field_id, start=start, end=end):
+                yield [i, j]
+            self.io_counters.logical_reads += self.secondary_indexes.pop_accessed_pages()
+            return
+        # Single pass over the blocks, comparing each field as a typed value
+        field_type = self.field_types[field_id]
+        start_key = text_key(field_type=field_type, value=start)
+        end_key = text_key(field_type=field_type, value=end)
+        for i in range(0, len(self.blocks)):
+            records = self._get_records_from_block(block=self.blocks[i])
+            for j in range(len(records)):
+                if records[j].strip("#") != "":
+                    record_key = text_key(field_type=field_type, value=records[j].split(',')[field_id])
+                    if interval_contains(interval_type=field_type, value=record_key, start=start_key, end=end_key):
+                        yield [i, j]
+
     def _check_record_type_constraint(self, record):
-        record_fields = record.strip().split(',')
-        record_field_types = infer_types_from_record(record, len(record_fields))
-        for i in range(len(self.field_names)):
-            if record_field_types[i] != self.field_types[i]:
-                return -1
+        # Each field is checked by the check of its type, compiled with the schema
+        if not self.schema.check_record_types(record=record):
+            return -1
         return 0
 
     def _check_record_primary_key_constraint(self, record):
@@ -218,6 +358,11 @@ class Variable_Size_Heap:
             return -1
         return 0
 
+    def _invalid_records(self, records):
+        # Every invalid record is reported with its reasons, primary keys are checked in a single search
+        records_primary_keys = [record.strip().split(',')[0] for record in records]
+        return self.record_validator.validate(records=records, primary_keys=records_primary_keys, search_primary_keys=lambda keys : self._search_primary_keys(keys=keys))
+
     def _check_record_integrity(self, record):
         record_type_constraint = self._check_record_type_constraint(record=record)
         if record_type_constraint == -1:
@@ -234,6 +379,7 @@ class Variable_Size_Heap:
         field_types = ','.join(str(field_type) for field_type in self.field_types)
         header += field_names + '\n'
         header += field_types + '\n'
+        header += self.schema.primary_key + '\n'
         header += str(self.number_of_records) + '\n'
         header += str(self.number_of_deleted_records) + '\n'
         header += self.creation_date + '\n'
@@ -243,15 +389,19 @@ class Variable_Size_Heap:
         return header
 
     def _write_txt_file(self, txt_filepath):
-        once = False
+        # Only the header and the modified blocks are written, in their positions
         with open(txt_filepath, 'r+') as txt_file:
-            if not once:
-                txt_header = self._get_txt_header()
-                txt_file.seek(0, 0)
-                txt_file.write(txt_header)
-                once = True
-            for block in self.blocks:
-                txt_file.write(block + '\n')
+            txt_header = self._get_txt_header()
+            self.layout = write_header(txt_file=txt_file, header=txt_header, layout=self.layout, block_size=self.block_size, io_counters=self.io_counters)
+        self.blocks.flush(layout=self.layout)
+        self.secondary_indexes.flush()
+
+    def _save_txt_file(self, txt_filepath):
+        # While the table is open, rewriting the txt file is deferred to flush_table
+        if self._is_open(txt_filepath=txt_filepath):
+            self.table_modified = True
+        else:
+            self._write_txt_file(txt_filepath=txt_filepath)
 
     def _insert(self, record):
         # Get the last block
@@ -259,20 +409,25 @@ class Variable_Size_Heap:
         exists_block = len(self.blocks) >= 1
         if exists_block:
             block = self.blocks[-1]
-            self.accessed_blocks += 1
 
         # Check if there is space available in the last block
         if block.count("#") >= len(record):
             # If there is, then write record to the end of last block
             block_records = self._get_records_from_block(block=block)
             body = ""
-            for block_record in block_records:
-                if block_record.strip("#") != "":
-                    body += block_record + "$"
+            record_id = 0
+            for j in range(len(block_records)):
+                if block_records[j].strip("#") != "":
+                    body += block_records[j] + "$"
+                    # Deleted records of the block are dropped, so the following records move back
+                    if j != record_id and self.secondary_indexes.has_indexes():
+                        self.secondary_indexes.move_record(record=block_records[j], block_id=len(self.blocks) - 1, record_id=j, new_block_id=len(self.blocks) - 1, new_record_id=record_id)
+                    record_id += 1
             padding = "#" * (self.block_size - len(body) - len(record) - 1)
             block = body + record + "$" + padding
             self.blocks[-1] = block
             self.number_of_records += 1
+            position = [len(self.blocks) - 1, record_id]
         else:
             # If there is not, then create a new block
             padding = "#" * (self.block_size - len(record) - 1)
@@ -280,12 +435,15 @@ class Variable_Size_Heap:
             # Writes new block to end the the file
             self.blocks.append(block)
             self.number_of_records += 1
+            position = [len(self.blocks) - 1, 0]
         self.number_of_blocks = len(self.blocks)
+        # Adds the record to the secondary indexes
+        self.secondary_indexes.insert_record(record=record, block_id=position[0], record_id=position[1])
 
+    @measured_operation
     def insert_single_record(self, txt_filepath, record):
-        self.accessed_blocks = 0
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
-        txt_file.close()
+        self._close_txt_file(file=txt_file)
         # Check if the record respects the database integrity restriction
         record_integrity = self._check_record_integrity(record=record)
         if record_integrity == -1:
@@ -293,27 +451,25 @@ class Variable_Size_Heap:
         # Inserts record
         self._insert(record)
         # Writes txt file
-        self._write_txt_file(txt_filepath=txt_filepath)
+        self._save_txt_file(txt_filepath=txt_filepath)
 
+    @measured_operation
     def insert_multiple_records(self, txt_filepath, records):
-        self.accessed_blocks = 0
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
-        txt_file.close()
-        # Check if the record respects the database integrity restriction
-        for record in records:
-            record_integrity = self._check_record_integrity(record=record)
-            if record_integrity == -1:
-                raise Exception('InsertError: Invalid Record.')
+        self._close_txt_file(file=txt_file)
+        # Check if the records respect the database integrity restriction
+        invalid_records = self._invalid_records(records=records)
+        if invalid_records != []:
+            raise Exception(invalid_records_message(invalid_records=invalid_records))
         # Inserts records
         for record in records:
             self._insert(record)
         # Writes txt file
-        self._write_txt_file(txt_filepath=txt_filepath)
+        self._save_txt_file(txt_filepath=txt_filepath)
 
     def _select(self, select_container, block_id, record_id):
         # Reads specified block
         block = self.blocks[block_id]
-        self.accessed_blocks += 1
         # Gets records from block
         records = self._get_records_from_block(block=block)
         # Gets specified record
@@ -321,63 +477,55 @@ class Variable_Size_Heap:
         # Adds specified record to select container
         select_container.append(record)
 
+    @measured_operation
     def select_by_single_primary_key(self, txt_filepath, key):
-        self.accessed_blocks = 0
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         select_container = []
         for (i, j) in self._search(field_id=0, value=key):
             if i == -1 and j == -1:
-                txt_file.close()
+                self._close_txt_file(file=txt_file)
                 raise Exception('SelectionError: Primary Key nonexistent.')
             else:
                 self._select(select_container=select_container, block_id=i, record_id=j)
-        txt_file.close()
+        self._close_txt_file(file=txt_file)
         return select_container
 
+    @measured_operation
     def select_by_multiple_primary_key(self, txt_filepath, keys):
-        self.accessed_blocks = 0
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         select_container = []
         exception_counter = 0
+        positions = self._search_primary_keys(keys=keys)
         for key in keys:
-            for (i, j) in self._search(field_id=0, value=key):
-                if i == -1 and j == -1:
-                    exception_counter += 1
-                else:
-                    self._select(select_container=select_container, block_id=i, record_id=j)
-        txt_file.close()
+            if key not in positions:
+                exception_counter += 1
+            else:
+                i, j = positions[key]
+                self._select(select_container=select_container, block_id=i, record_id=j)
+        self._close_txt_file(file=txt_file)
         if exception_counter == len(keys):
             raise Exception('SelectionError: Primary Keys nonexistent.')
         return select_container
     
+    @measured_operation
     def select_by_field_interval(self, txt_filepath, field, start, end):
-        self.accessed_blocks = 0
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         field_id = self.field_names.index(field)
         field_type = self.field_types[field_id]
         possible_field_interval = check_interval(interval_type=field_type, start=start, end=end)
         if possible_field_interval == -1:
-            txt_file.close()
-            raise Exception('SelectionError: Field Interval incomputable.')
-        value_range = generate_range(range_type=field_type, start=start, end=end)
-        if value_range == -1:
-            txt_file.close()
+            self._close_txt_file(file=txt_file)
             raise Exception('SelectionError: Field Interval incomputable.')
         select_container = []
-        exception_counter = 0
-        for value in value_range:
-            for (i, j) in self._search(field_id=field_id, value=str(value)):
-                if i == -1 and j == -1:
-                    exception_counter += 1
-                else:
-                    self._select(select_container=select_container, block_id=i, record_id=j)
-        txt_file.close()
-        if exception_counter == len(value_range):
+        for (i, j) in self._search_interval(field_id=field_id, start=start, end=end):
+            self._select(select_container=select_container, block_id=i, record_id=j)
+        self._close_txt_file(file=txt_file)
+        if select_container == []:
             raise Exception('SelectionError: Requested Records nonexistent.')
         return select_container
     
+    @measured_operation
     def select_by_single_field_value(self, txt_filepath, field, value):
-        self.accessed_blocks = 0
         # Checks if field exists
         if field not in self.field_names:
             raise Exception('SelectionError: Field nonexistent.')
@@ -387,29 +535,13 @@ class Variable_Size_Heap:
         select_container = []
         for (i, j) in self._search(field_id=field_id, value=value):
             if i == -1 and j == -1:
-                txt_file.close()
+                self._close_txt_file(file=txt_file)
                 raise Exception('SelectionError: Field Value nonexistent.')
             else:
                 self._select(select_container=select_container, block_id=i, record_id=j)
-        txt_file.close()
+        self._close_txt_file(file=txt_file)
         return select_container
 
-    def _recreating_txt_file(self, txt_filepath):
-        once = False
-        # Creates new clean txt file
-        txt_filepath = txt_filepath[:-4] + "_2.txt"
-        txt_file = open(txt_filepath, 'w')
-        txt_file.close()
-        # Writes header and compressed records to new txt file
-        with open(txt_filepath, 'r+') as txt_file:
-            if not once:
-                txt_header = self._get_txt_header()
-                txt_file.seek(0, 0)
-                txt_file.write(txt_header)
-                once = True
-            for compressed_block in self.compressed_blocks:
-                txt_file.write(compressed_block + '\n')
-
     def _delete_file(self, filepath):
         if os.path.exists(filepath):
             try:
@@ -419,46 +551,41 @@ class Variable_Size_Heap:
         else:
             raise Exception(f"DeleteFileError: The File {filepath} Does Not Exists.")
 
-    def _rename_txt_file(self, txt_filepath):
-        txt2_filepath = txt_filepath[:-4] + "_2.txt"
-        os.rename(txt2_filepath, txt_filepath)
-
     def _compress_records(self, txt_filepath):
         records = []
+        positions = []
         for i in range(0, len(self.blocks)):
             block = self.blocks[i]
-            self.accessed_blocks += 1
             blocks_records = self._get_records_from_block(block=block)
-            for blocks_record in blocks_records:
-                if blocks_record.strip("#") != "":
-                    records.append(blocks_record)
-        self.compressed_blocks = []
-        compressed_block = ""
-        for i in range(0, len(records)):
-            formatted_record = records[i] + "$"
-            if len(compressed_block) + len(formatted_record) <= self.block_size:
-                compressed_block += formatted_record
-            elif len(block) + len(formatted_record) > self.block_size and i != (len(records) - 1):
-                padding = "#" * (self.block_size - len(compressed_block))
-                compressed_block += padding
-                self.compressed_blocks.append(compressed_block)
-                compressed_block = formatted_record
-            else:
-                padding = "#" * (self.block_size - len(compressed_block))
-                compressed_block += padding
-                self.compressed_blocks.append(compressed_block)
+            for j in range(len(blocks_records)):
+                if blocks_records[j].strip("#") != "":
+                    records.append(blocks_records[j])
+                    positions.append((i, j))
+        compressed_blocks = self._pack_records_into_blocks(records=records)
+        # Records keep their order, so the k-th record of the compressed blocks is the k-th record read
+        if self.secondary_indexes.has_indexes():
+            moves = dict()
+            k = 0
+            for i in range(0, len(compressed_blocks)):
+                compressed_records = self._get_records_from_block(block=compressed_blocks[i])
+                for j in range(len(compressed_records)):
+                    if compressed_records[j].strip("#") != "":
+                        moves[positions[k]] = (i, j)
+                        k += 1
+            self.secondary_indexes.move_records(moves=moves)
 
         self.number_of_deleted_records = 0
-        self._recreating_txt_file(txt_filepath=txt_filepath)
-        self._delete_file(filepath=txt_filepath)
-        # self._rename_txt_file(txt_filepath=txt_filepath)
+        # Compressed blocks replace the blocks of the table, which is written back and truncated
+        self.blocks.reset(blocks=compressed_blocks)
+        self.number_of_blocks = len(self.blocks)
+        self._save_txt_file(txt_filepath=txt_filepath)
 
     def _delete_record(self, block_id, record_id):
         # Gets block
         block = self.blocks[block_id]
-        self.accessed_blocks += 1
         # Deletes record from block
         block_records = self._get_records_from_block(block=block)
+        self.secondary_indexes.delete_record(record=block_records[record_id], block_id=block_id, record_id=record_id)
         head = ""
         tail = ""
         for j in range(0, len(block_records)):
@@ -487,45 +614,80 @@ class Variable_Size_Heap:
         # self.number_of_records -= 1
         # self.number_of_deleted_records += 1
 
+    @measured_operation
     def delete_record_by_primary_key(self, txt_filepath, key):
-        self.accessed_blocks = 0
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         # Searchs for position of record to be deleted
         for (i, j) in self._search(field_id=0, value=key):
             if i == -1 and j == -1:
-                txt_file.close()
+                self._close_txt_file(file=txt_file)
                 raise Exception('DeleteError: Primary Key nonexistent.')
             else:
                 # Deletes the record
                 self._delete_record(block_id=i, record_id=j)
                 # Updates txt file header
                 self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
-                txt_file.close()
+                self._close_txt_file(file=txt_file)
                 # Checks if reordering is to be done
                 if self.number_of_deleted_records >= 50:
                     self._compress_records(txt_filepath=txt_filepath)
                 else:
                     # Writes txt file
-                    self._write_txt_file(txt_filepath=txt_filepath)
+                    self._save_txt_file(txt_filepath=txt_filepath)
     
+    @measured_operation
     def delete_record_by_criterion(self, txt_filepath, field, value):
-        self.accessed_blocks = 0
         txt_file = self._read_txt_file(txt_filepath=txt_filepath)
         field_id = self.field_names.index(field)
         # Searchs for positions of records to be deleted
         for (i, j) in self._search(field_id=field_id, value=value):
             if i == -1 and j == -1:
-                txt_file.close()
+                self._close_txt_file(file=txt_file)
                 raise Exception('DeleteError: Field Value nonexistent.')
             else:
                 # Deletes the record
                 self._delete_record(block_id=i, record_id=j)
         # Updates txt file header
         self._write_txt_header(txt_file=txt_file, txt_filepath=txt_filepath)
-        txt_file.close()
+        self._close_txt_file(file=txt_file)
         # Checks if reordering is to be done
         if self.number_of_deleted_records >= 50:
             self._compress_records(txt_filepath=txt_filepath)
         else:
             # Writes txt file
-            self._write_txt_file(txt_filepath=txt_filepath)
\ No newline at end of file
+            self._save_txt_file(txt_filepath=txt_filepath)
+
+    def _rebuild_secondary_indexes(self, txt_filepath):
+        # Tables without indexes are not read again
+        if not has_index_files(txt_filepath=txt_filepath, field_names=self.field_names):
+            return
+        txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self._close_txt_file(file=txt_file)
+        for field_id in list(self.secondary_indexes.indexes):
+            self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+
+    def _create_primary_key_index(self, txt_filepath):
+        # Maps each primary key to its block and slot, used by the selections, deletions and the uniqueness check
+        txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self._close_txt_file(file=txt_file)
+        if not self.secondary_indexes.has_index(field_id=0):
+            self.secondary_indexes.create_index(field_id=0, records=self._scan_records())
+
+    @measured_operation
+    def create_index(self, txt_filepath, field):
+        txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self._close_txt_file(file=txt_file)
+        # Checks if field exists
+        if field not in self.field_names:
+            raise Exception('IndexError: Field nonexistent.')
+        field_id = self.field_names.index(field)
+        # Builds the index from a single scan of the table
+        self.secondary_indexes.create_index(field_id=field_id, records=self._scan_records())
+
+    @measured_operation
+    def drop_index(self, txt_filepath, field):
+        txt_file = self._read_txt_file(txt_filepath=txt_filepath)
+        self._close_txt_file(file=txt_file)
+        if field not in self.field_names or not self.secondary_indexes.has_index(field_id=self.field_names.index(field)):
+            raise Exception('IndexError: Index nonexistent.')
+        self.secondary_indexes.drop_index(field_id=self.field_names.index(field))
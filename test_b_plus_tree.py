@@ -0,0 +1,208 @@
+"""
+Testes da Árvore B+ e dos índices secundários: divisões de folhas e de nós internos, valores repetidos como entradas
+distintas, buscas por intervalos que atravessam folhas, deleções sem fusão de folhas, carga em bloco comparada com
+inserções uma a uma, e índices mantidos pelas reorganizações do Hash Externo Estático, do Heap de Tamanho Variável e do
+Arquivo Ordenado.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from B_Plus_Tree import B_Plus_Tree
+from Buffer_Pool import Buffer_Pool
+from Ordered_File import Ordered_File
+from Schema import Schema
+from Static_External_Hash import Static_External_Hash
+from Variable_Size_Heap import Variable_Size_Heap
+
+# Small pages, so that a few hundred keys fill several levels of the tree
+PAGE_SIZE = 256
+NUMBER_OF_KEYS = 2000
+INDEX_FILEPATH = './dataset/Tree_Index.txt'
+
+BLOCK_SIZE = 128
+NUMBER_OF_RECORDS = 300
+CSV_FILEPATH = './dataset/Indexed.csv'
+TXT_FILEPATH = './dataset/Indexed.txt'
+SCHEMA = Schema(field_names=['transaction_id', 'product'], field_types=['int', 'string'], field_sizes=[5, 9])
+
+def tree_keys():
+    # Each value is repeated in ten records, seven records per block
+    return [(value, (10 * value + i) // 7, (10 * value + i) % 7) for value in range(0, NUMBER_OF_KEYS // 10) for i in range(0, 10)]
+
+def record(key):
+    return f'{key},product{key % 10}\n'
+
+class Test_B_Plus_Tree(unittest.TestCase):
+    def setUp(self):
+        # Each test builds its files in a directory of its own
+        self.previous_dir = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        os.mkdir('./dataset')
+
+    def tearDown(self):
+        os.chdir(self.previous_dir)
+        self.temp_dir.cleanup()
+
+    def _tree(self, keys, bulk_load, index_filepath=INDEX_FILEPATH):
+        tree = B_Plus_Tree(index_filepath=index_filepath, page_size=PAGE_SIZE, cache_size=8)
+        if bulk_load:
+            tree.create(field_name='value', key_type='int', keys=keys)
+        else:
+            tree.create(field_name='value', key_type='int', keys=[])
+            for key in keys:
+                tree.insert(key=key)
+        return tree
+
+    def _height(self, tree):
+        height = 1
+        node = tree._read_node(page_id=tree.root_page)
+        while not node.leaf:
+            node = tree._read_node(page_id=node.children[0])
+            height += 1
+        return height
+
+    def test_insertions_split_leaves_and_internal_nodes(self):
+        keys = tree_keys()
+        random.Random(0).shuffle(keys)
+        tree = self._tree(keys=keys, bulk_load=False)
+        # The root was split at least once after the leaves under it were
+        self.assertGreaterEqual(self._height(tree=tree), 3)
+        self.assertEqual(list(tree._entries()), sorted(keys))
+        self.assertEqual(tree.number_of_entries, len(keys))
+        # The tree read again from its file is the same
+        tree.close()
+        tree.open()
+        self.assertEqual(list(tree._entries()), sorted(keys))
+        tree.close()
+
+    def test_repeated_values_are_distinct_entries(self):
+        tree = self._tree(keys=tree_keys(), bulk_load=True)
+        for value in [0, 57, NUMBER_OF_KEYS // 10 - 1]:
+            positions = sorted((block_id, record_id) for (key_value, block_id, record_id) in tree_keys() if key_value == value)
+            self.assertEqual(sorted(tuple(position) for position in tree.search(key=value)), positions)
+        self.assertEqual(list(tree.search(key=NUMBER_OF_KEYS)), [])
+        tree.close()
+
+    def test_intervals_cross_leaves(self):
+        keys = tree_keys()
+        tree = self._tree(keys=keys, bulk_load=True)
+        for (start, end) in [(0, NUMBER_OF_KEYS), (13, 117), (50, 51), (50, 50), (-5, 3), (190, 400)]:
+            # Integer intervals do not include their end
+            positions = sorted((block_id, record_id) for (value, block_id, record_id) in keys if start <= value < end)
+            self.assertEqual(sorted(tuple(position) for position in tree.search_interval(start_key=start, end_key=end, interval_type='int')), positions)
+        tree.close()
+
+    def test_deletions_leave_empty_leaves(self):
+        keys = tree_keys()
+        tree = self._tree(keys=keys, bulk_load=True)
+        number_of_pages = tree.number_of_pages
+        # Every entry of the values below 100 is removed, which empties whole leaves without merging them
+        deleted_keys = [key for key in keys if key[0] < 100]
+        for key in deleted_keys:
+            self.assertTrue(tree.delete(key=key))
+        self.assertFalse(tree.delete(key=deleted_keys[0]))
+        self.assertEqual(tree.number_of_pages, number_of_pages)
+        remaining_keys = sorted(key for key in keys if key[0] >= 100)
+        self.assertEqual(list(tree._entries()), remaining_keys)
+        self.assertEqual(tree.number_of_entries, len(remaining_keys))
+        self.assertEqual(list(tree.search(key=50)), [])
+        # Intervals starting in the emptied leaves go on to the next leaves with entries
+        positions = sorted((block_id, record_id) for (value, block_id, record_id) in remaining_keys if value < 105)
+        self.assertEqual(sorted(tuple(position) for position in tree.search_interval(start_key=0, end_key=105, interval_type='int')), positions)
+        # Emptied leaves take new entries
+        tree.insert(key=(50, 0, 0))
+        self.assertEqual(list(tree.search(key=50)), [[0, 0]])
+        tree.close()
+
+    def test_bulk_load_and_insertions_build_the_same_index(self):
+        keys = tree_keys()
+        random.Random(1).shuffle(keys)
+        bulk_loaded_tree = self._tree(keys=keys, bulk_load=True, index_filepath='./dataset/Bulk_Index.txt')
+        inserted_tree = self._tree(keys=keys, bulk_load=False, index_filepath='./dataset/Inserted_Index.txt')
+        self.assertEqual(list(bulk_loaded_tree._entries()), list(inserted_tree._entries()))
+        self.assertEqual(bulk_loaded_tree.number_of_entries, inserted_tree.number_of_entries)
+        for value in [0, 99, 150]:
+            self.assertEqual(list(bulk_loaded_tree.search(key=value)), list(inserted_tree.search(key=value)))
+        # Both keep taking insertions and deletions the same way
+        for tree in [bulk_loaded_tree, inserted_tree]:
+            for key in keys[:300]:
+                tree.delete(key=key)
+            for value in range(0, 100):
+                tree.insert(key=(value, -1, value))
+        self.assertEqual(list(bulk_loaded_tree._entries()), list(inserted_tree._entries()))
+        bulk_loaded_tree.close()
+        inserted_tree.close()
+
+    def test_external_sort_of_the_bulk_load(self):
+        # Keys that do not fit in the memory budget are sorted in runs on disk before the bulk load
+        keys = tree_keys()
+        random.Random(2).shuffle(keys)
+        tree = B_Plus_Tree(index_filepath=INDEX_FILEPATH, page_size=PAGE_SIZE)
+        tree.create(field_name='value', key_type='int', keys=iter(keys), memory_budget=1024)
+        self.assertEqual(list(tree._entries()), sorted(keys))
+        tree.close()
+
+class Test_Secondary_Index_Maintenance(unittest.TestCase):
+    def setUp(self):
+        # Each test builds its table in a directory of its own, with a buffer pool of its own
+        self.previous_dir = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        os.mkdir('./dataset')
+        with open(CSV_FILEPATH, 'w') as csv_file:
+            csv_file.write('transaction_id,product\n')
+            for key in range(1, NUMBER_OF_RECORDS + 1):
+                csv_file.write(record(key=key))
+        self.buffer_pool = Buffer_Pool()
+
+    def tearDown(self):
+        os.chdir(self.previous_dir)
+        self.temp_dir.cleanup()
+
+    def _assert_index_matches_scan(self, engine, field):
+        # The entries of the index are the values and the positions of the records read by a scan of the table
+        engine.open_table(TXT_FILEPATH)
+        field_id = engine.field_names.index(field)
+        secondary_indexes = engine.secondary_indexes
+        scanned_keys = sorted(
+            (secondary_indexes._key(field_id=field_id, record=table_record), block_id, record_id)
+            for (block_id, record_id, table_record) in engine._scan_records()
+        )
+        entries = list(secondary_indexes.indexes[field_id]._entries())
+        engine.close_table()
+        self.assertEqual(entries, scanned_keys)
+        return len(entries)
+
+    def _delete_and_check(self, engine):
+        engine.from_csv_to_txt(CSV_FILEPATH, schema=SCHEMA)
+        engine.create_index(TXT_FILEPATH, 'product')
+        engine.insert_multiple_records(TXT_FILEPATH, [record(key=key) for key in range(1000, 1030)])
+        self.assertEqual(self._assert_index_matches_scan(engine=engine, field='product'), NUMBER_OF_RECORDS + 30)
+        # Deleting 60 records moves the others, by the reorganisation of the engine
+        for value in range(0, 2):
+            engine.delete_record_by_criterion(TXT_FILEPATH, 'product', f'product{value}')
+        for key in range(10, 40):
+            if key % 10 > 1:
+                engine.delete_record_by_primary_key(TXT_FILEPATH, str(key))
+        number_of_records = NUMBER_OF_RECORDS + 30 - 66 - 24
+        self.assertEqual(self._assert_index_matches_scan(engine=engine, field='product'), number_of_records)
+        selected_records = engine.select_by_single_field_value(TXT_FILEPATH, 'product', 'product5')
+        self.assertEqual(sorted(int(selected_record.split(',')[0]) for selected_record in selected_records), [
+            key for key in list(range(1, NUMBER_OF_RECORDS + 1)) + list(range(1000, 1030)) if key % 10 == 5 and not 10 <= key < 40
+        ])
+
+    def test_static_external_hash_compaction(self):
+        self._delete_and_check(engine=Static_External_Hash(block_size=BLOCK_SIZE, buffer_pool=self.buffer_pool))
+
+    def test_variable_size_heap_compression(self):
+        self._delete_and_check(engine=Variable_Size_Heap(block_size=BLOCK_SIZE, buffer_pool=self.buffer_pool))
+
+    def test_ordered_file_reordering(self):
+        self._delete_and_check(engine=Ordered_File(block_size=BLOCK_SIZE, memory_budget=1024, buffer_pool=self.buffer_pool))
+
+if __name__ == '__main__':
+    unittest.main()
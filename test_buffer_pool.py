@@ -0,0 +1,154 @@
+"""
+Testes do buffer pool: blocos substituídos pelas políticas LRU e CLOCK, blocos fixados que não são substituídos, escrita
+de volta dos blocos sujos em sequências de blocos consecutivos, descarte dos blocos de um arquivo reescrito e os
+contadores de acertos, faltas, substituições e escritas de volta.
+"""
+
+import unittest
+
+from Buffer_Pool import Buffer_Pool, CLOCK, LRU, pool_key
+
+class Block_File:
+    # Client of the pool whose blocks are kept in memory, counting the reads and writes the pool makes
+    def __init__(self, filepath, number_of_blocks=16):
+        self.filepath = filepath
+        self.pool_key = pool_key(filepath=filepath)
+        self.blocks = [f'{filepath}:{block_id}' for block_id in range(0, number_of_blocks)]
+        self.reads = []
+        self.writes = []
+
+    def read_block(self, block_id):
+        self.reads.append(block_id)
+        return self.blocks[block_id]
+
+    def write_blocks(self, first_block_id, blocks):
+        self.writes.append((first_block_id, blocks))
+        for i in range(0, len(blocks)):
+            self.blocks[first_block_id + i] = blocks[i]
+
+class Test_Buffer_Pool(unittest.TestCase):
+    def setUp(self):
+        self.file = Block_File(filepath='./dataset/Pool.txt')
+
+    def _block_ids(self, buffer_pool, file):
+        return sorted(block_id for (key, block_id) in buffer_pool.frames if key == file.pool_key)
+
+    def _fetch(self, buffer_pool, block_ids):
+        for block_id in block_ids:
+            self.assertEqual(buffer_pool.fetch(client=self.file, block_id=block_id), self.file.blocks[block_id])
+
+    def test_lru_evicts_the_least_recently_used_block(self):
+        buffer_pool = Buffer_Pool(number_of_frames=3, replacement_policy=LRU)
+        self._fetch(buffer_pool=buffer_pool, block_ids=[0, 1, 2, 0, 3])
+        self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=self.file), [0, 2, 3])
+        self._fetch(buffer_pool=buffer_pool, block_ids=[4])
+        self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=self.file), [0, 3, 4])
+        self.assertEqual(self.file.reads, [0, 1, 2, 3, 4])
+
+    def test_clock_gives_referenced_blocks_a_second_chance(self):
+        buffer_pool = Buffer_Pool(number_of_frames=3, replacement_policy=CLOCK)
+        # Every block was referenced, so the hand clears them all and evicts the first one, even if it was just read
+        self._fetch(buffer_pool=buffer_pool, block_ids=[0, 1, 2, 0, 3])
+        self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=self.file), [1, 2, 3])
+        # A block read again after the sweep gets a second chance, and the hand moves on to the next one
+        self._fetch(buffer_pool=buffer_pool, block_ids=[1, 4])
+        self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=self.file), [1, 3, 4])
+        self.assertEqual(self.file.reads, [0, 1, 2, 3, 4])
+
+    def test_pinned_blocks_are_not_evicted(self):
+        for replacement_policy in [LRU, CLOCK]:
+            buffer_pool = Buffer_Pool(number_of_frames=2, replacement_policy=replacement_policy)
+            self.assertEqual(buffer_pool.pin(client=self.file, block_id=0), self.file.blocks[0])
+            self._fetch(buffer_pool=buffer_pool, block_ids=[1, 2, 3])
+            self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=self.file), [0, 3])
+            # With every frame pinned no block can be read
+            buffer_pool.pin(client=self.file, block_id=3)
+            with self.assertRaisesRegex(Exception, 'All frames are pinned'):
+                buffer_pool.fetch(client=self.file, block_id=4)
+            # A block pinned twice stays until it is unpinned twice
+            buffer_pool.pin(client=self.file, block_id=0)
+            buffer_pool.unpin(client=self.file, block_id=0)
+            with self.assertRaisesRegex(Exception, 'All frames are pinned'):
+                buffer_pool.fetch(client=self.file, block_id=4)
+            buffer_pool.unpin(client=self.file, block_id=0)
+            self._fetch(buffer_pool=buffer_pool, block_ids=[4])
+            self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=self.file), [3, 4])
+            with self.assertRaisesRegex(Exception, 'Block not pinned'):
+                buffer_pool.unpin(client=self.file, block_id=4)
+            with self.assertRaisesRegex(Exception, 'Block not pinned'):
+                buffer_pool.unpin(client=self.file, block_id=0)
+
+    def test_dirty_blocks_are_written_back_in_runs(self):
+        buffer_pool = Buffer_Pool(number_of_frames=8)
+        for block_id in [6, 5, 2, 7, 9]:
+            buffer_pool.write(client=self.file, block_id=block_id, block=f'new:{block_id}')
+        self.assertEqual(self.file.writes, [])
+        self.assertEqual(buffer_pool.fetch(client=self.file, block_id=5), 'new:5')
+        buffer_pool.flush(client=self.file)
+        self.assertEqual(self.file.writes, [(2, ['new:2']), (5, ['new:5', 'new:6', 'new:7']), (9, ['new:9'])])
+        self.assertEqual(buffer_pool.write_backs, 5)
+        # Flushed blocks are clean, and are not written again
+        buffer_pool.flush(client=self.file)
+        self.assertEqual(len(self.file.writes), 3)
+        self.assertEqual(self.file.reads, [])
+
+    def test_evicted_dirty_blocks_are_written_back(self):
+        buffer_pool = Buffer_Pool(number_of_frames=2)
+        buffer_pool.write(client=self.file, block_id=0, block='new:0')
+        self._fetch(buffer_pool=buffer_pool, block_ids=[1, 2])
+        self.assertEqual(self.file.writes, [(0, ['new:0'])])
+        # The block is read again with its new content, and nothing is left to flush
+        self.assertEqual(buffer_pool.fetch(client=self.file, block_id=0), 'new:0')
+        buffer_pool.flush(client=self.file)
+        self.assertEqual(len(self.file.writes), 1)
+        self.assertEqual(buffer_pool.write_backs, 1)
+
+    def test_discard_drops_the_blocks_of_a_rebuilt_file(self):
+        buffer_pool = Buffer_Pool(number_of_frames=16)
+        other_file = Block_File(filepath='./dataset/Other.txt')
+        for block_id in range(0, 5):
+            buffer_pool.write(client=self.file, block_id=block_id, block=f'new:{block_id}')
+        buffer_pool.fetch(client=other_file, block_id=0)
+        # Blocks from the first block id on are dropped without being written, other files keep theirs
+        buffer_pool.discard(filepath='./dataset/Pool.txt', first_block_id=2)
+        self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=self.file), [0, 1])
+        self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=other_file), [0])
+        buffer_pool.flush(client=self.file)
+        self.assertEqual(self.file.writes, [(0, ['new:0', 'new:1'])])
+        self.assertEqual(buffer_pool.fetch(client=self.file, block_id=3), './dataset/Pool.txt:3')
+        # The same file is found by any of its paths
+        buffer_pool.discard(filepath='./dataset/../dataset/Pool.txt')
+        self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=self.file), [])
+
+    def test_discard_dirty_drops_the_changes_that_were_not_flushed(self):
+        buffer_pool = Buffer_Pool(number_of_frames=16)
+        buffer_pool.write(client=self.file, block_id=0, block='new:0')
+        buffer_pool.fetch(client=self.file, block_id=1)
+        buffer_pool.discard_dirty(client=self.file)
+        self.assertEqual(self._block_ids(buffer_pool=buffer_pool, file=self.file), [1])
+        buffer_pool.flush(client=self.file)
+        self.assertEqual(self.file.writes, [])
+        self.assertEqual(buffer_pool.fetch(client=self.file, block_id=0), './dataset/Pool.txt:0')
+
+    def test_counters(self):
+        buffer_pool = Buffer_Pool(number_of_frames=2)
+        self._fetch(buffer_pool=buffer_pool, block_ids=[0, 1, 0, 2, 0])
+        buffer_pool.write(client=self.file, block_id=3, block='new:3')
+        buffer_pool.write(client=self.file, block_id=4, block='new:4')
+        self._fetch(buffer_pool=buffer_pool, block_ids=[5])
+        self.assertEqual(buffer_pool.stats(), {
+            'frames': 2, 'used_frames': 2, 'hits': 2, 'misses': 4, 'evictions': 4, 'write_backs': 1,
+        })
+        buffer_pool.reset_stats()
+        self.assertEqual(buffer_pool.stats(), {
+            'frames': 2, 'used_frames': 2, 'hits': 0, 'misses': 0, 'evictions': 0, 'write_backs': 0,
+        })
+
+    def test_invalid_pools_are_refused(self):
+        with self.assertRaisesRegex(Exception, 'Number of frames must be positive'):
+            Buffer_Pool(number_of_frames=0)
+        with self.assertRaisesRegex(Exception, 'Replacement policy nonexistent'):
+            Buffer_Pool(replacement_policy='fifo')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+"""
+Testes do Hash Extensível: divisão de buckets e duplicação do diretório, profundidades locais e global, persistência do
+diretório no arquivo `<tabela>_Directory.txt`, deleções com índices secundários e o limite de profundidade do diretório.
+"""
+
+import os
+import tempfile
+import unittest
+
+import Extendible_Hash as extendible_hash_module
+from Buffer_Pool import Buffer_Pool
+from Extendible_Hash import Extendible_Hash
+from Schema import Schema
+
+# Four records per bucket
+BLOCK_SIZE = 64
+NUMBER_OF_RECORDS = 20
+CSV_FILEPATH = './dataset/Extendible.csv'
+TXT_FILEPATH = './dataset/Extendible.txt'
+DIRECTORY_FILEPATH = './dataset/Extendible_Directory.txt'
+SCHEMA = Schema(field_names=['transaction_id', 'product'], field_types=['int', 'string'], field_sizes=[5, 8])
+
+def record(key):
+    return f'{key},product{key % 3}\n'
+
+class Test_Extendible_Hash(unittest.TestCase):
+    def setUp(self):
+        # Each test builds its table in a directory of its own, with a buffer pool of its own
+        self.previous_dir = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        os.mkdir('./dataset')
+        with open(CSV_FILEPATH, 'w') as csv_file:
+            csv_file.write('transaction_id,product\n')
+            for key in range(1, NUMBER_OF_RECORDS + 1):
+                csv_file.write(record(key=key))
+        self.buffer_pool = Buffer_Pool()
+        self.engine = self._engine()
+        self.engine.from_csv_to_txt(CSV_FILEPATH, schema=SCHEMA)
+
+    def tearDown(self):
+        os.chdir(self.previous_dir)
+        self.temp_dir.cleanup()
+
+    def _engine(self):
+        return Extendible_Hash(block_size=BLOCK_SIZE, buffer_pool=self.buffer_pool)
+
+    def _keys_of_bucket(self, bucket_id, number_of_keys, first_key=1000):
+        # New keys that the directory of the engine sends to the bucket
+        keys = []
+        key = first_key
+        while len(keys) < number_of_keys:
+            if self.engine._bucket_id(key=str(key)) == bucket_id:
+                keys.append(key)
+            key += 1
+        return keys
+
+    def _bucket_sizes(self, engine):
+        file = engine._read_txt_file(txt_filepath=TXT_FILEPATH)
+        bucket_sizes = [0] * engine.number_of_blocks
+        for (i, j, table_record) in engine._scan_records():
+            bucket_sizes[i] += 1
+        engine._close_txt_file(file=file, txt_filepath=TXT_FILEPATH, modified=False)
+        return bucket_sizes
+
+    def _assert_consistent(self, number_of_records):
+        # Read by a new engine, each record is in the bucket of its key, and each bucket of local depth l is pointed
+        # by 2^(global depth - l) entries of the directory
+        engine = self._engine()
+        file = engine._read_txt_file(txt_filepath=TXT_FILEPATH)
+        self.assertEqual(len(engine.directory), 2 ** engine.global_depth)
+        self.assertEqual(len(engine.local_depths), engine.number_of_blocks)
+        entries = [0] * engine.number_of_blocks
+        for bucket_id in engine.directory:
+            entries[bucket_id] += 1
+        for block_id in range(0, engine.number_of_blocks):
+            self.assertLessEqual(engine.local_depths[block_id], engine.global_depth)
+            self.assertEqual(entries[block_id], 2 ** (engine.global_depth - engine.local_depths[block_id]))
+        table_records = list(engine._scan_records())
+        for (i, j, table_record) in table_records:
+            self.assertEqual(engine._bucket_id(key=table_record.split(',')[0].strip()), i)
+        engine._close_txt_file(file=file, txt_filepath=TXT_FILEPATH, modified=False)
+        self.assertEqual(len(table_records), number_of_records)
+        self.assertEqual(engine.number_of_records, number_of_records)
+
+    def test_split_doubles_the_directory(self):
+        global_depth = self.engine.global_depth
+        number_of_blocks = self.engine.number_of_blocks
+        # A bucket whose local depth is the global depth is split by doubling the directory
+        keys = self._keys_of_bucket(bucket_id=0, number_of_keys=self.engine.blocking_factor + 1)
+        self.engine.insert_multiple_records(TXT_FILEPATH, [record(key=key) for key in keys])
+        # The keys may all stay on one side of a split, which then doubles the directory again
+        self.assertGreater(self.engine.global_depth, global_depth)
+        self.assertEqual(len(self.engine.directory), 2 ** self.engine.global_depth)
+        self.assertGreater(self.engine.number_of_blocks, number_of_blocks)
+        self.assertGreater(self.engine.local_depths[0], global_depth)
+        self.assertEqual(self.engine.local_depths[-1], self.engine.global_depth)
+        # The other buckets keep their local depth, below the new global depth
+        self.assertEqual(self.engine.local_depths[1:number_of_blocks], [global_depth] * (number_of_blocks - 1))
+        self._assert_consistent(number_of_records=NUMBER_OF_RECORDS + len(keys))
+        for key in keys:
+            self.assertEqual(self.engine.select_by_single_primary_key(TXT_FILEPATH, str(key))[0].split(',')[0].strip(), str(key))
+
+    def test_split_below_the_global_depth_keeps_the_directory(self):
+        keys = self._keys_of_bucket(bucket_id=0, number_of_keys=self.engine.blocking_factor + 1)
+        self.engine.insert_multiple_records(TXT_FILEPATH, [record(key=key) for key in keys])
+        global_depth = self.engine.global_depth
+        # Every other bucket now has a local depth below the global depth, so splitting it keeps the directory size
+        bucket_id = 1
+        self.assertLess(self.engine.local_depths[bucket_id], global_depth)
+        number_of_entries = self.engine.directory.tolist().count(bucket_id)
+        free_slots = self.engine.blocking_factor - self._bucket_sizes(engine=self.engine)[bucket_id]
+        more_keys = self._keys_of_bucket(bucket_id=bucket_id, number_of_keys=free_slots + 1, first_key=keys[-1] + 1)
+        self.engine.insert_multiple_records(TXT_FILEPATH, [record(key=key) for key in more_keys])
+        self.assertEqual(self.engine.global_depth, global_depth)
+        self.assertEqual(len(self.engine.directory), 2 ** global_depth)
+        # The entries of the bucket are shared with the new bucket
+        self.assertEqual(self.engine.directory.tolist().count(bucket_id), number_of_entries // 2)
+        self.assertEqual(self.engine.directory.tolist().count(self.engine.number_of_blocks - 1), number_of_entries // 2)
+        self._assert_consistent(number_of_records=NUMBER_OF_RECORDS + len(keys) + len(more_keys))
+
+    def test_directory_is_kept_and_reused(self):
+        keys = self._keys_of_bucket(bucket_id=0, number_of_keys=self.engine.blocking_factor + 1)
+        self.engine.insert_multiple_records(TXT_FILEPATH, [record(key=key) for key in keys])
+        # The directory file has the prefix and the local depth of each bucket
+        with open(DIRECTORY_FILEPATH) as directory_file:
+            buckets = [line.strip().split(',') for line in directory_file]
+        self.assertEqual([int(prefix) for (prefix, local_depth) in buckets], self.engine.bucket_prefixes)
+        self.assertEqual([int(local_depth) for (prefix, local_depth) in buckets], self.engine.local_depths)
+        # A new engine reads it, and keeps it between operations while the file is not rewritten
+        engine = self._engine()
+        engine.select_by_single_primary_key(TXT_FILEPATH, str(keys[0]))
+        directory = engine.directory
+        self.assertEqual(directory, self.engine.directory)
+        engine.select_by_single_primary_key(TXT_FILEPATH, str(keys[1]))
+        self.assertIs(engine.directory, directory)
+        # The directory rewritten by another engine is read again
+        more_keys = self._keys_of_bucket(bucket_id=0, number_of_keys=self.engine.blocking_factor + 1, first_key=keys[-1] + 1)
+        self.engine.insert_multiple_records(TXT_FILEPATH, [record(key=key) for key in more_keys])
+        engine.select_by_single_primary_key(TXT_FILEPATH, str(more_keys[-1]))
+        self.assertIsNot(engine.directory, directory)
+        self.assertEqual(engine.directory, self.engine.directory)
+        # An open table writes its directory when it is closed
+        engine.open_table(TXT_FILEPATH)
+        last_keys = self._keys_of_bucket(bucket_id=engine._bucket_id(key=str(more_keys[0])), number_of_keys=self.engine.blocking_factor + 1, first_key=more_keys[-1] + 1)
+        engine.insert_multiple_records(TXT_FILEPATH, [record(key=key) for key in last_keys])
+        engine.close_table()
+        self._assert_consistent(number_of_records=NUMBER_OF_RECORDS + len(keys) + len(more_keys) + len(last_keys))
+
+    def test_deletions_move_the_index_entries(self):
+        self.engine.create_index(TXT_FILEPATH, 'product')
+        keys = self._keys_of_bucket(bucket_id=0, number_of_keys=2 * self.engine.blocking_factor)
+        self.engine.insert_multiple_records(TXT_FILEPATH, [record(key=key) for key in keys])
+        # Deleting the first records of buckets moves the following records of the same buckets back one slot
+        for key in [keys[0], keys[3], 1, 2]:
+            self.engine.delete_record_by_primary_key(TXT_FILEPATH, str(key))
+        self.engine.delete_record_by_criterion(TXT_FILEPATH, 'product', 'product1')
+        remaining_keys = [key for key in list(range(1, NUMBER_OF_RECORDS + 1)) + keys if key not in [keys[0], keys[3], 1, 2] and key % 3 != 1]
+        self._assert_consistent(number_of_records=len(remaining_keys))
+        # Each position given by the index holds a record with the value
+        for value in [0, 2]:
+            selected_records = self.engine.select_by_single_field_value(TXT_FILEPATH, 'product', f'product{value}')
+            self.assertEqual(sorted(int(selected_record.split(',')[0]) for selected_record in selected_records), sorted(key for key in remaining_keys if key % 3 == value))
+        with self.assertRaisesRegex(Exception, 'Field Value nonexistent'):
+            self.engine.select_by_single_field_value(TXT_FILEPATH, 'product', 'product1')
+
+    def test_directory_depth_is_limited(self):
+        # With a limit close to the initial depth, the buckets fill up and can not be split anymore
+        max_global_depth = extendible_hash_module.MAX_GLOBAL_DEPTH
+        limit = self.engine.global_depth + 1
+        extendible_hash_module.MAX_GLOBAL_DEPTH = limit
+        try:
+            with self.assertRaisesRegex(Exception, 'Bucket can not be split'):
+                for key in range(1000, 2000):
+                    self.engine.insert_single_record(TXT_FILEPATH, record(key=key))
+        finally:
+            extendible_hash_module.MAX_GLOBAL_DEPTH = max_global_depth
+        self.assertEqual(self.engine.global_depth, limit)
+        self.assertEqual(len(self.engine.directory), 2 ** limit)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Testes da ordenação externa e da reorganização do Arquivo Ordenado: intercalação em mais de uma passada quando há mais
+corridas que MERGE_FAN_IN, estabilidade para chaves iguais, arquivos temporários fechados e removidos com sucesso ou
+com erro, e as cercas e os índices secundários refeitos depois da reorganização.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import External_Sort as external_sort_module
+from Buffer_Pool import Buffer_Pool
+from External_Sort import external_sort, MERGE_FAN_IN
+from Ordered_File import Ordered_File
+from Schema import Schema
+
+NUMBER_OF_RECORDS = 300
+BLOCK_SIZE = 128
+CSV_FILEPATH = './dataset/Ordered.csv'
+TXT_FILEPATH = './dataset/Ordered.txt'
+FENCE_FILEPATH = './dataset/Ordered_Fence.txt'
+SCHEMA = Schema(field_names=['transaction_id', 'product'], field_types=['int', 'string'], field_sizes=[5, 9])
+
+def sort_key(record):
+    return int(record.split(',')[0])
+
+def record(key):
+    return f'{key},product{key % 10}\n'
+
+class Test_External_Sort(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # Every run file created by the sort, to check that they are all closed
+        self.run_files = []
+        temporary_file = tempfile.TemporaryFile
+        def tracked_temporary_file(*args, **kwargs):
+            run_file = temporary_file(*args, **kwargs)
+            self.run_files.append(run_file)
+            return run_file
+        patcher = mock.patch.object(external_sort_module.tempfile, 'TemporaryFile', side_effect=tracked_temporary_file)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _records(self):
+        # Repeated keys, each record knowing its position in the input
+        keys = [random.Random(i).randrange(0, 50) for i in range(0, NUMBER_OF_RECORDS)]
+        return [f'{keys[i]},{i}' for i in range(0, NUMBER_OF_RECORDS)]
+
+    def _assert_runs_removed(self):
+        self.assertTrue(all(run_file.closed for run_file in self.run_files))
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+
+    def test_records_in_memory_are_not_written(self):
+        records = self._records()
+        self.assertEqual(list(external_sort(records=records, key=sort_key, temp_dir=self.temp_dir.name)), sorted(records, key=sort_key))
+        self.assertEqual(self.run_files, [])
+
+    def test_merge_in_several_passes(self):
+        # A budget of one byte makes each record a run, more runs than are merged at once
+        records = self._records()
+        sorted_records = list(external_sort(records=iter(records), key=sort_key, memory_budget=1, temp_dir=self.temp_dir.name))
+        self.assertGreater(NUMBER_OF_RECORDS, MERGE_FAN_IN)
+        number_of_merged_runs = (NUMBER_OF_RECORDS + MERGE_FAN_IN - 1) // MERGE_FAN_IN
+        self.assertEqual(len(self.run_files), NUMBER_OF_RECORDS + number_of_merged_runs)
+        # Records with the same key keep the order in which they were given, as sorted does
+        self.assertEqual(sorted_records, sorted(records, key=sort_key))
+        self._assert_runs_removed()
+
+    def test_smaller_fan_in(self):
+        # With a fan in of four, the runs of a few records each are merged in several passes before the last merge
+        records = self._records()
+        with mock.patch.object(external_sort_module, 'MERGE_FAN_IN', 4):
+            sorted_records = list(external_sort(records=records, key=sort_key, memory_budget=1024, temp_dir=self.temp_dir.name))
+        self.assertEqual(sorted_records, sorted(records, key=sort_key))
+        self._assert_runs_removed()
+
+    def test_encoded_records(self):
+        records = [(int(text.split(',')[0]), text) for text in self._records()]
+        sorted_records = list(external_sort(
+            records=records, key=lambda item: item[0], memory_budget=1024, temp_dir=self.temp_dir.name,
+            encode=lambda item: item[1], decode=lambda text: (int(text.split(',')[0]), text)
+        ))
+        self.assertEqual(sorted_records, sorted(records, key=lambda item: item[0]))
+        self._assert_runs_removed()
+
+    def test_runs_are_removed_on_errors(self):
+        # The key of a record fails after some runs were written
+        def failing_key(record):
+            if record.endswith(',200'):
+                raise ValueError('Failed key.')
+            return sort_key(record=record)
+        with self.assertRaisesRegex(ValueError, 'Failed key'):
+            list(external_sort(records=self._records(), key=failing_key, memory_budget=1, temp_dir=self.temp_dir.name))
+        self.assertEqual(len(self.run_files), 200)
+        self._assert_runs_removed()
+        # The records fail while they are read
+        def failing_records():
+            for table_record in self._records()[:150]:
+                yield table_record
+            raise IOError('Failed read.')
+        with self.assertRaisesRegex(IOError, 'Failed read'):
+            list(external_sort(records=failing_records(), key=sort_key, memory_budget=1, temp_dir=self.temp_dir.name))
+        self._assert_runs_removed()
+
+    def test_runs_are_removed_when_not_read_to_the_end(self):
+        sorted_records = external_sort(records=self._records(), key=sort_key, memory_budget=1, temp_dir=self.temp_dir.name)
+        first_records = [next(sorted_records) for _ in range(0, 10)]
+        self.assertEqual(first_records, sorted(self._records(), key=sort_key)[:10])
+        self.assertFalse(all(run_file.closed for run_file in self.run_files))
+        sorted_records.close()
+        self._assert_runs_removed()
+
+class Test_Ordered_File_Reordering(unittest.TestCase):
+    def setUp(self):
+        # Each test builds its table in a directory of its own, with a buffer pool of its own
+        self.previous_dir = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        os.mkdir('./dataset')
+        keys = list(range(1, NUMBER_OF_RECORDS + 1))
+        random.Random(0).shuffle(keys)
+        with open(CSV_FILEPATH, 'w') as csv_file:
+            csv_file.write('transaction_id,product\n')
+            for key in keys:
+                csv_file.write(record(key=key))
+        self.buffer_pool = Buffer_Pool()
+
+    def tearDown(self):
+        os.chdir(self.previous_dir)
+        self.temp_dir.cleanup()
+
+    def test_reordering_rebuilds_the_fences_and_the_indexes(self):
+        # A budget of a few records makes both the load and the reordering sort in runs on disk
+        engine = Ordered_File(block_size=BLOCK_SIZE, memory_budget=2048, buffer_pool=self.buffer_pool)
+        engine.from_csv_to_txt(CSV_FILEPATH, schema=SCHEMA)
+        engine.create_index(TXT_FILEPATH, 'product')
+        # Inserted records go to the extension file until the reordering merges them into the txt blocks
+        inserted_keys = list(range(NUMBER_OF_RECORDS + 100, NUMBER_OF_RECORDS, -2))
+        engine.insert_multiple_records(TXT_FILEPATH, [record(key=key) for key in inserted_keys])
+        engine.delete_record_by_criterion(TXT_FILEPATH, 'product', 'product3')
+        engine.delete_record_by_criterion(TXT_FILEPATH, 'product', 'product7')
+        keys = sorted(key for key in list(range(1, NUMBER_OF_RECORDS + 1)) + inserted_keys if key % 10 not in [3, 7])
+        # The blocks read by a new engine hold the remaining records in order, without the extension blocks
+        engine = Ordered_File(block_size=BLOCK_SIZE, buffer_pool=self.buffer_pool)
+        engine.open_table(TXT_FILEPATH)
+        self.assertEqual(engine.number_of_deleted_records, 0)
+        self.assertEqual(len(engine.ext_blocks), 0)
+        scanned_records = list(engine._scan_records())
+        self.assertEqual([sort_key(record=table_record) for (i, j, table_record) in scanned_records], keys)
+        self.assertEqual(len(engine.blocks), (len(keys) + engine.blocking_factor - 1) // engine.blocking_factor)
+        # The fence of each block is the key of its first record
+        fences = [(i, sort_key(record=table_record)) for (i, j, table_record) in scanned_records if j == 0]
+        with open(FENCE_FILEPATH) as fence_file:
+            self.assertEqual([tuple(int(field) for field in line.strip().split(',')) for line in fence_file], fences)
+        self.assertEqual(list(zip(engine.fence_block_ids, engine.fence_keys)), fences)
+        # The index has the value and the new position of every record
+        field_id = engine.field_names.index('product')
+        entries = list(engine.secondary_indexes.indexes[field_id]._entries())
+        self.assertEqual(entries, sorted(
+            (engine.secondary_indexes._key(field_id=field_id, record=table_record), i, j) for (i, j, table_record) in scanned_records
+        ))
+        engine.close_table()
+        for key in [1, keys[-1], NUMBER_OF_RECORDS + 2]:
+            self.assertEqual(sort_key(record=engine.select_by_single_primary_key(TXT_FILEPATH, str(key))[0]), key)
+
+if __name__ == '__main__':
+    unittest.main()
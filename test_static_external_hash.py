@@ -0,0 +1,120 @@
+"""
+Testes do Hash Externo Estático quando os buckets e os buckets de overflow enchem: a inserção que não cabe é recusada
+sem alterar a tabela, e uma operação que falha no meio mantém o cabeçalho, a lista de buckets de overflow livres e as
+cadeias consistentes entre si. Uma carga a partir do csv que falha também mantém a tabela anterior com o mesmo nome.
+"""
+
+import os
+import tempfile
+import unittest
+
+from Buffer_Pool import Buffer_Pool
+from Schema import Schema
+from Static_External_Hash import Static_External_Hash
+
+# Two records per bucket
+BLOCK_SIZE = 32
+NUMBER_OF_RECORDS = 60
+CSV_FILEPATH = './dataset/Overflow.csv'
+TXT_FILEPATH = './dataset/Overflow.txt'
+SCHEMA = Schema(field_names=['transaction_id', 'product'], field_types=['int', 'string'], field_sizes=[4, 8])
+
+def record(key):
+    return f'{key},product{key % 10}\n'
+
+class Test_Static_External_Hash_Overflow(unittest.TestCase):
+    def setUp(self):
+        # Each test builds its table in a directory of its own, with a buffer pool of its own
+        self.previous_dir = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        os.mkdir('./dataset')
+        with open(CSV_FILEPATH, 'w') as csv_file:
+            csv_file.write('transaction_id,product\n')
+            for key in range(1, NUMBER_OF_RECORDS + 1):
+                csv_file.write(record(key=key))
+        self.buffer_pool = Buffer_Pool()
+        self.engine = self._engine()
+        self.engine.from_csv_to_txt(CSV_FILEPATH, schema=SCHEMA)
+
+    def tearDown(self):
+        os.chdir(self.previous_dir)
+        self.temp_dir.cleanup()
+
+    def _colliding_records(self, first_key, number_of_records):
+        # Records whose keys are all hashed to the bucket of first_key, so that they fill the overflow buckets
+        return [record(key=first_key + i * self.engine.number_of_buckets) for i in range(0, number_of_records)]
+
+    def _engine(self):
+        return Static_External_Hash(block_size=BLOCK_SIZE, buffer_pool=self.buffer_pool)
+
+    def _assert_consistent(self, number_of_records):
+        # The header, the chains and the free list read by a new engine agree with each other
+        engine = self._engine()
+        diagnostics = engine.hash_diagnostics(TXT_FILEPATH)
+        self.assertEqual(engine.number_of_records, number_of_records)
+        self.assertEqual(diagnostics['records'], number_of_records)
+        self.assertGreaterEqual(diagnostics['free_overflow_buckets'], 0)
+        file = engine._read_txt_file(txt_filepath=TXT_FILEPATH)
+        free_overflow_buckets = engine._count_free_overflow_buckets(limit=engine.number_of_overflow_buckets + 1)
+        engine._close_txt_file(file=file, txt_filepath=TXT_FILEPATH, modified=False)
+        self.assertEqual(free_overflow_buckets, diagnostics['free_overflow_buckets'])
+
+    def test_batch_that_does_not_fit_is_refused(self):
+        records = self._colliding_records(first_key=1000, number_of_records=60)
+        with self.assertRaisesRegex(Exception, 'Buckets and overflow buckets full'):
+            self.engine.insert_multiple_records(TXT_FILEPATH, records)
+        self._assert_consistent(number_of_records=NUMBER_OF_RECORDS)
+        self.assertEqual(self._engine().chain_statistics(TXT_FILEPATH)['used_overflow_buckets'], 0)
+
+    def test_single_inserts_until_full(self):
+        number_of_records = NUMBER_OF_RECORDS
+        with self.assertRaisesRegex(Exception, 'Buckets and overflow buckets full'):
+            for single_record in self._colliding_records(first_key=1000, number_of_records=60):
+                self.engine.insert_single_record(TXT_FILEPATH, single_record)
+                number_of_records += 1
+        self._assert_consistent(number_of_records=number_of_records)
+        self.assertEqual(self._engine().chain_statistics(TXT_FILEPATH)['free_overflow_buckets'], 0)
+        # An overflow bucket emptied by deletions returns to the free list and is taken again
+        number_of_deleted_records = len(self.engine.select_by_single_field_value(TXT_FILEPATH, 'product', 'product0'))
+        self.engine.delete_record_by_criterion(TXT_FILEPATH, 'product', 'product0')
+        self._assert_consistent(number_of_records=number_of_records - number_of_deleted_records)
+        self._engine().insert_single_record(TXT_FILEPATH, record(key=3000))
+        self._assert_consistent(number_of_records=number_of_records - number_of_deleted_records + 1)
+
+    def test_failed_batch_keeps_the_free_list(self):
+        # The batch fits, but fails after some of its records took overflow buckets
+        records = self._colliding_records(first_key=1000, number_of_records=20)
+        format_record = self.engine._format_record
+        formatted_records = []
+        def failing_format_record(record):
+            if len(formatted_records) == 10:
+                raise Exception('WriteError: Failed.')
+            formatted_records.append(record)
+            return format_record(record)
+        self.engine._format_record = failing_format_record
+        with self.assertRaisesRegex(Exception, 'WriteError'):
+            self.engine.insert_multiple_records(TXT_FILEPATH, records)
+        self.assertGreater(self._engine().chain_statistics(TXT_FILEPATH)['used_overflow_buckets'], 0)
+        self._assert_consistent(number_of_records=NUMBER_OF_RECORDS + 10)
+        # The next insertions take free overflow buckets, and not the ones already in the chains
+        engine = self._engine()
+        for single_record in records[10:]:
+            engine.insert_single_record(TXT_FILEPATH, single_record)
+        self._assert_consistent(number_of_records=NUMBER_OF_RECORDS + 20)
+
+    def test_failed_load_keeps_the_previous_table(self):
+        # The second csv has a product longer than its size in the schema, which is only found while it is loaded
+        with open(CSV_FILEPATH, 'w') as csv_file:
+            csv_file.write('transaction_id,product\n')
+            for key in range(1, NUMBER_OF_RECORDS + 1):
+                csv_file.write(record(key=key) if key != 30 else f'{key},product_too_long\n')
+        for bulk_load in [True, False]:
+            with self.assertRaises(Exception):
+                self._engine().from_csv_to_txt(CSV_FILEPATH, bulk_load=bulk_load, schema=SCHEMA)
+            self.assertFalse(os.path.exists('./dataset/Overflow_Load.txt'))
+            self._assert_consistent(number_of_records=NUMBER_OF_RECORDS)
+            self.assertEqual(len(self._engine().select_by_single_primary_key(TXT_FILEPATH, '30')), 1)
+
+if __name__ == '__main__':
+    unittest.main()